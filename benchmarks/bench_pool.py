@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Compare per-call connections with the pooled CircleClient transport.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_pool --requests 2000
+"""
+
+import argparse
+import time
+
+import requests
+
+from circleclient import circleclient
+from benchmarks.stubserver import StubServer
+
+
+def bench_unpooled(endpoint, count):
+    """Open a fresh connection for every call, like requests.get does."""
+    url = endpoint + '/project/qba73/nc/1?circle-token=token'
+    start = time.time()
+    for _ in range(count):
+        requests.get(url, headers={'Accept': 'application/json'}).json()
+    return count / (time.time() - start)
+
+
+def bench_pooled(endpoint, count):
+    """Reuse keep-alive connections from the client pool."""
+    client = circleclient.CircleClient('token', endpoint=endpoint)
+    start = time.time()
+    for _ in range(count):
+        client.build.status('qba73', 'nc', 1)
+    elapsed = time.time() - start
+    client.close()
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+
+    with StubServer() as server:
+        unpooled = bench_unpooled(server.endpoint, args.requests)
+        pooled = bench_pooled(server.endpoint, args.requests)
+
+    print('unpooled: {0:8.1f} req/s'.format(unpooled))
+    print('pooled:   {0:8.1f} req/s'.format(pooled))
+    print('speedup:  {0:8.2f}x'.format(pooled / unpooled))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Compare memory held by build dictionaries and slotted BuildRecords.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_records --builds 20000
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from circleclient.records import BuildRecord
+from benchmarks.payloads import encoded_builds
+
+
+def measure(decode, payload):
+    """Return (bytes retained, result) of decoding payload."""
+    gc.collect()
+    tracemalloc.start()
+    result = decode(payload)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def as_dicts(payload):
+    return json.loads(payload)
+
+
+def as_records(payload):
+    return [BuildRecord.from_dict(build) for build in json.loads(payload)]
+
+
+def compare(count):
+    """Return bytes per build retained by each representation."""
+    payload = encoded_builds(count)
+    dicts, _ = measure(as_dicts, payload)
+    records, _ = measure(as_records, payload)
+    return {'builds': count,
+            'dict_bytes_per_build': dicts // count,
+            'record_bytes_per_build': records // count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--builds', type=int, default=20000)
+    args = parser.parse_args()
+
+    result = compare(args.builds)
+    print('dict:   {0:6d} bytes/build'.format(result['dict_bytes_per_build']))
+    print('record: {0:6d} bytes/build'.format(
+        result['record_bytes_per_build']))
+    print('ratio:  {0:6.2f}x'.format(result['dict_bytes_per_build'] /
+                                     float(result['record_bytes_per_build'])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Cold start time of the command line interface.
+
+Compares ``python -m circleclient --version`` with a bare interpreter
+start, and lists heavy modules imported before any request is made.
+"""
+
+import json
+import subprocess
+import sys
+import time
+
+
+HEAVY = ('requests', 'urllib3', 'asyncio', 'aiohttp', 'numpy', 'sqlite3',
+         'concurrent.futures')
+
+PROBE = ('import sys, json; from circleclient import cli; cli.make_parser(); '
+         'print(json.dumps([m for m in {0!r} if m in sys.modules]))')
+
+
+def best_of(argv, runs):
+    best = None
+    for _ in range(runs):
+        start = time.time()
+        subprocess.check_call(argv, stdout=subprocess.DEVNULL)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def heavy_imports():
+    """Return heavy modules imported by loading the CLI."""
+    output = subprocess.check_output(
+        [sys.executable, '-c', PROBE.format(HEAVY)])
+    return json.loads(output.decode('utf-8'))
+
+
+def measure(runs=10):
+    """Return best-of-runs start-up times in milliseconds."""
+    bare = best_of([sys.executable, '-c', 'pass'], runs)
+    cli = best_of([sys.executable, '-m', 'circleclient', '--version'], runs)
+    return {'runs': runs, 'interpreter_ms': bare * 1000.0,
+            'cli_ms': cli * 1000.0, 'overhead_ms': (cli - bare) * 1000.0,
+            'heavy_imports': heavy_imports()}
+
+
+if __name__ == '__main__':
+    print(json.dumps(measure(), indent=2, sort_keys=True))
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Synthetic CircleCI v1.1 payloads shaped like real API responses."""
+
+import json
+
+
+def build(build_num, username='qba73', project='nc', branch='master',
+          steps=4):
+    """Return a build summary with the keys the v1.1 API sends."""
+    status = 'failed' if build_num % 7 == 0 else 'success'
+    return {
+        'build_num': build_num,
+        'username': username,
+        'reponame': project,
+        'branch': branch,
+        'status': status,
+        'outcome': status,
+        'lifecycle': 'finished',
+        'vcs_revision': '{0:040x}'.format(build_num * 7919),
+        'vcs_url': 'https://github.com/{0}/{1}'.format(username, project),
+        'vcs_type': 'github',
+        'subject': 'Merge pull request #{0} from feature'.format(build_num),
+        'body': '',
+        'committer_name': 'Jakub Jarosz',
+        'committer_email': 'jakub.jarosz@postpro.net',
+        'committer_date': '2015-09-01T10:00:00.000Z',
+        'author_name': 'Jakub Jarosz',
+        'author_email': 'jakub.jarosz@postpro.net',
+        'author_date': '2015-09-01T10:00:00.000Z',
+        'why': 'github',
+        'dont_build': None,
+        'queued_at': '2015-09-01T10:00:{0:02d}.000Z'.format(build_num % 60),
+        'start_time': '2015-09-01T10:01:00.000Z',
+        'stop_time': '2015-09-01T10:05:00.000Z',
+        'build_time_millis': 240000 + build_num % 1000,
+        'usage_queued_at': '2015-09-01T10:00:00.000Z',
+        'build_url': 'https://circleci.com/gh/{0}/{1}/{2}'.format(
+            username, project, build_num),
+        'compare': None,
+        'retry_of': None,
+        'previous': {'build_num': build_num - 1, 'status': 'success',
+                     'build_time_millis': 239000},
+        'all_commit_details': [],
+        'user': {'is_user': True, 'login': username, 'name': 'Jakub Jarosz'},
+        'node': None,
+        'parallel': 1,
+        'platform': '2.0',
+        'failed': status == 'failed',
+        'infrastructure_fail': False,
+        'timedout': False,
+        'canceled': False,
+        'oss': True,
+        'ssh_enabled': None,
+        'is_first_green_build': False,
+        'job_name': None,
+        'steps': [{
+            'name': 'step {0}'.format(step),
+            'actions': [{
+                'name': 'step {0}'.format(step),
+                'index': 0,
+                'step': step,
+                'status': 'success',
+                'failed': None,
+                'exit_code': 0,
+                'start_time': '2015-09-01T10:01:00.000Z',
+                'end_time': '2015-09-01T10:02:00.000Z',
+                'run_time_millis': 60000,
+                'has_output': True,
+                'output_url': 'https://circle-production-action-output.'
+                              's3.amazonaws.com/{0}-{1}'.format(build_num,
+                                                                step),
+                'bash_command': 'make test',
+                'type': 'test',
+            }],
+        } for step in range(steps)],
+    }
+
+
+def builds(count, offset=0, **options):
+    """Return count builds, newest first."""
+    return [build(num, **options)
+            for num in range(offset + count, offset, -1)]
+
+
+def encoded_builds(count, **options):
+    return json.dumps(builds(count, **options)).encode('utf-8')
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Benchmark suite for circleclient against a local stub CircleCI API.
+
+Run from the repository root::
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline results.json --tolerance 0.2
+
+Results are written as JSON. With --baseline, every throughput metric
+(keys ending in ``_per_sec``) is compared with the baseline and the run
+exits with status 1 when one dropped by more than the tolerance.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from circleclient import circleclient
+from benchmarks import bench_records, bench_startup
+from benchmarks.stubserver import StubServer
+
+
+def percentiles(samples, qs=(50, 99)):
+    """Return {'p50': ..., 'p99': ...} of samples in milliseconds."""
+    samples = sorted(samples)
+    result = {}
+    for q in qs:
+        last = len(samples) - 1
+        index = min(last, int(round(q / 100.0 * last)))
+        result['p{0}_ms'.format(q)] = samples[index] * 1000.0
+    return result
+
+
+def bench_status(client, count):
+    """Serial Build.status calls over one pooled connection."""
+    samples = []
+    start = time.time()
+    for num in range(count):
+        begin = time.time()
+        client.build.status('qba73', 'nc', num % 100 + 1)
+        samples.append(time.time() - begin)
+    result = {'requests': count,
+              'requests_per_sec': count / (time.time() - start)}
+    result.update(percentiles(samples))
+    return result
+
+
+def bench_status_many(client, count, concurrency):
+    """Build.status_many over a bounded worker pool."""
+    keys = [('qba73', 'nc', num % 100 + 1) for num in range(count)]
+    start = time.time()
+    results = client.build.status_many(keys, concurrency=concurrency)
+    elapsed = time.time() - start
+    return {'requests': count, 'concurrency': concurrency,
+            'errors': sum(1 for result in results if not result.ok),
+            'requests_per_sec': count / elapsed}
+
+
+def bench_gather(endpoint, count, concurrency):
+    """AsyncCircleClient.gather, skipped without aiohttp."""
+    try:
+        import asyncio
+        from circleclient import aio
+    except ImportError:
+        return {'skipped': 'aiohttp not installed'}
+
+    async def main():
+        async with aio.AsyncCircleClient('token', endpoint=endpoint) as client:
+            start = time.time()
+            await client.gather((client.build.status('qba73', 'nc',
+                                                     num % 100 + 1)
+                                 for num in range(count)),
+                                concurrency=concurrency)
+            return time.time() - start
+
+    elapsed = asyncio.run(main())
+    return {'requests': count, 'concurrency': concurrency,
+            'requests_per_sec': count / elapsed}
+
+
+def bench_pagination(client, history, prefetch):
+    """Walk the whole history of a project with Build.iter_recent."""
+    start = time.time()
+    count = sum(1 for _ in client.build.iter_recent('qba73', 'nc',
+                                                    prefetch=prefetch))
+    elapsed = time.time() - start
+    return {'builds': count, 'prefetch': prefetch,
+            'builds_per_sec': count / elapsed}
+
+
+def bench_mixed(client, rounds):
+    """Cycle through every User, Projects, Build and Cache endpoint."""
+    calls = [
+        lambda: client.user.info(),
+        lambda: client.projects.list_projects(),
+        lambda: client.build.recent('qba73', 'nc', limit=30),
+        lambda: client.build.recent_all_projects(limit=30),
+        lambda: client.build.status('qba73', 'nc', 42),
+        lambda: client.build.artifacts('qba73', 'nc', 42),
+        lambda: client.build.trigger('qba73', 'nc', 'master'),
+        lambda: client.build.retry('qba73', 'nc', 42),
+        lambda: client.build.cancel('qba73', 'nc', 42),
+        lambda: client.cache.clear('qba73', 'nc'),
+    ]
+    samples = []
+    start = time.time()
+    for _ in range(rounds):
+        for call in calls:
+            begin = time.time()
+            call()
+            samples.append(time.time() - begin)
+    result = {'requests': len(samples),
+              'requests_per_sec': len(samples) / (time.time() - start)}
+    result.update(percentiles(samples))
+    return result
+
+
+def run(args):
+    results = {}
+    with StubServer(latency=args.latency, history=args.history,
+                    steps=args.steps) as server:
+        with circleclient.CircleClient(
+                'token', endpoint=server.endpoint,
+                pool_maxsize=args.concurrency) as client:
+            results['status'] = bench_status(client, args.requests)
+            results['status_many'] = bench_status_many(
+                client, args.requests, args.concurrency)
+            results['async_gather'] = bench_gather(
+                server.endpoint, args.requests, args.concurrency)
+            results['pagination'] = bench_pagination(client, args.history,
+                                                     prefetch=False)
+            results['pagination_prefetch'] = bench_pagination(
+                client, args.history, prefetch=True)
+            results['mixed'] = bench_mixed(client, max(1, args.requests // 10))
+    results['memory_10k_builds'] = bench_records.compare(10000)
+    results['cold_start'] = bench_startup.measure()
+    return {
+        'meta': {
+            'circleclient': circleclient.__version__,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'config': vars(args).copy(),
+        },
+        'results': results,
+    }
+
+
+def regressions(report, baseline, tolerance):
+    """Return descriptions of throughput metrics worse than the baseline."""
+    found = []
+    for name, metrics in baseline['results'].items():
+        current = report['results'].get(name, {})
+        for key, old in metrics.items():
+            if not key.endswith('_per_sec') or key not in current:
+                continue
+            if current[key] < old * (1 - tolerance):
+                found.append('{0}.{1}: {2:.1f} < {3:.1f}'.format(
+                    name, key, current[key], old))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds the stub server waits per request')
+    parser.add_argument('--history', type=int, default=2000,
+                        help='builds per project served by the stub')
+    parser.add_argument('--steps', type=int, default=4,
+                        help='steps per build, controls payload size')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    for key in ('output', 'baseline'):
+        report['meta']['config'].pop(key)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            found = regressions(report, json.load(baseline), args.tolerance)
+        for line in found:
+            sys.stderr.write('regression: ' + line + '\n')
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""Local stub of the CircleCI v1.1 API used by the benchmarks.
+
+The server answers the endpoints used by User, Projects, Build and Cache
+with synthetic payloads from benchmarks.payloads. Payload size, history
+depth and per-request latency are configurable.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks import payloads
+
+
+PREFIX = '/api/v1.1'
+
+BUILD = re.compile(r'^/project/([^/]+)/([^/]+)/(\d+)$')
+BUILD_ACTION = re.compile(
+    r'^/project/([^/]+)/([^/]+)/(\d+)/(artifacts|cancel|retry)$')
+PROJECT = re.compile(r'^/project/([^/]+)/([^/]+)(?:/tree/(.+))?$')
+CACHE = re.compile(r'^/project/([^/]+)/([^/]+)/build-cache$')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Route requests to the stub API over keep-alive connections."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        api = self.server
+        if api.latency:
+            time.sleep(api.latency)
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        path = url.path[len(PREFIX):] if url.path.startswith(PREFIX) else None
+        body = None if path is None else api.route(self.command, path, query)
+        api.requests += 1
+        if body is None:
+            self.send_response(404)
+            body = b'{"message": "Not Found"}'
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_DELETE = _reply
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    """Threaded stub CircleCI API listening on a random local port.
+
+    Attributes:
+        requests: Number of requests answered so far.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, history=1000,
+                 steps=4, projects=10):
+        """Create stub server.
+
+        Args:
+            latency (float): Seconds slept before answering each request.
+            history (int): Number of builds of every project.
+            steps (int): Steps per build, controls payload size.
+            projects (int): Number of followed projects.
+        """
+        HTTPServer.__init__(self, (host, port), StubHandler)
+        self.latency = latency
+        self.history = history
+        self.steps = steps
+        self.projects = projects
+        self.requests = 0
+        self.thread = None
+        self._encoded = {}
+
+    @property
+    def endpoint(self):
+        return 'http://{0}:{1}{2}'.format(self.server_address[0],
+                                          self.server_address[1], PREFIX)
+
+    def encoded_build(self, username, project, build_num, branch='master'):
+        key = (username, project, build_num, branch)
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            encoded = self._encoded[key] = json.dumps(payloads.build(
+                build_num, username, project, branch,
+                self.steps)).encode('utf-8')
+        return encoded
+
+    def page(self, username, project, query, branch='master'):
+        limit = int(query.get('limit', ['30'])[0])
+        offset = int(query.get('offset', ['0'])[0])
+        first = self.history - offset
+        nums = range(first, max(first - limit, 0), -1)
+        return b'[' + b','.join(self.encoded_build(username, project, num,
+                                                   branch)
+                                for num in nums) + b']'
+
+    def route(self, method, path, query):
+        """Return encoded response body for request, None if unknown."""
+        if path == '/me':
+            return b'{"login": "qba73", "basic_email_prefs": "smart"}'
+        if path == '/projects':
+            projects = [{'username': 'qba73',
+                         'reponame': 'project{0}'.format(num),
+                         'vcs_url': 'https://github.com/qba73/'
+                                    'project{0}'.format(num),
+                         'branches': {'master': {}}}
+                        for num in range(self.projects)]
+            return json.dumps(projects).encode('utf-8')
+        if path == '/recent-builds':
+            return self.page('qba73', 'nc', query)
+        match = CACHE.match(path)
+        if match and method == 'DELETE':
+            return b'{"status": "build caches deleted"}'
+        match = BUILD_ACTION.match(path)
+        if match:
+            username, project, build_num, action = match.groups()
+            if action == 'artifacts':
+                return json.dumps([{
+                    'path': 'reports/junit{0}.xml'.format(index),
+                    'pretty_path': 'reports/junit{0}.xml'.format(index),
+                    'node_index': 0,
+                    'url': 'https://circle-artifacts.com/{0}'.format(index)}
+                    for index in range(3)]).encode('utf-8')
+            return self.encoded_build(username, project, self.history + 1)
+        match = BUILD.match(path)
+        if match:
+            username, project, build_num = match.groups()
+            return self.encoded_build(username, project, int(build_num))
+        match = PROJECT.match(path)
+        if match:
+            username, project, branch = match.groups()
+            if method == 'POST':
+                return self.encoded_build(username, project,
+                                          self.history + 1, branch)
+            return self.page(username, project, query, branch or 'master')
+        return None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
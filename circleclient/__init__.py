@@ -1 +1,10 @@
-from .circleclient import __version__ 
+__version__ = '0.1.6'
+
+
+def __getattr__(name):
+    # Import the client module on first access, keeping startup light.
+    if name == 'circleclient':
+        import importlib
+        return importlib.import_module('.circleclient', __name__)
+    raise AttributeError(
+        'module {0!r} has no attribute {1!r}'.format(__name__, name))
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""Allow ``python -m circleclient``."""
+
+import sys
+
+from .cli import main
+
+
+sys.exit(main())
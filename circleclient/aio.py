@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""asyncio client for CircleCI API.
+
+Requires the optional ``aiohttp`` dependency
+(``pip install circleclient[async]``).
+"""
+
+import asyncio
+import datetime
+import inspect
+import json
+
+import aiohttp
+
+from .bulk import Result
+from .circleclient import (User, ProjectEndpoints, BuildEndpoints, Cache,
+                           CircleClientError, TransportError, error_for,
+                           is_finished, decode_fields, project_fields,
+                           _as_utc, _bound_fields, _build_key)
+from .records import ArtifactRecord, BuildRecord, make_records
+from .retry import RetryPolicy
+from .singleflight import AsyncSingleFlight
+
+
+class AsyncCircleClient(object):
+    """Represents asyncio CircleCI client.
+
+    Mirrors the API methods of CircleClient, but every one of them returns
+    an awaitable. All requests share one pooled aiohttp session, which is
+    created lazily inside the running event loop.
+
+    Helpers built on worker threads, such as waiters, artifact downloads,
+    log searches and the project catalog, are only available on
+    CircleClient.
+
+    Attributes:
+        api_token: CircleCI API token for the client.
+    """
+    def __init__(self, api_token=None, endpoint=None, limit=100,
+                 limit_per_host=0, keepalive_timeout=15, concurrency=50,
+                 build_store=None, retry_policy=None, rate_limiter=None,
+                 records=False, json_loads=None, coalesce=True,
+                 build_states=None):
+        """Create asyncio client.
+
+        Args:
+            api_token (str): CircleCI API token.
+            endpoint (str): API root, defaults to the public v1.1 API.
+            limit (int): Total number of pooled connections.
+            limit_per_host (int): Connections per host, 0 means no limit.
+            keepalive_timeout (float): Seconds an idle connection is kept.
+            concurrency (int): Default bound for gather().
+            build_store (BuildStore): Optional persistent store serving
+                status and artifacts of finished builds.
+            retry_policy (RetryPolicy): Retry policy for transient errors,
+                defaults to RetryPolicy().
+            rate_limiter (RateLimiter): Optional limiter consulted before
+                every request, retries included.
+            records (bool): Return slotted records instead of dictionaries.
+            json_loads: Callable decoding response bodies, defaults to
+                json.loads.
+            coalesce (bool): Share one request between concurrent
+                identical GETs instead of sending each of them.
+            build_states (BuildStates): Optional webhook-fed build states
+                answering status lookups of notified builds.
+        """
+        self.api_token = api_token
+        if endpoint is None:
+            endpoint = 'https://circleci.com/api/v1.1'
+        self.endpoint = endpoint
+        self.headers = {'Content-Type': 'application/json',
+                        'Accept': 'application/json'}
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.concurrency = concurrency
+        self.build_store = build_store
+        self.build_states = build_states
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.records = records
+        self.json_loads = json.loads if json_loads is None else json_loads
+        self.inflight = AsyncSingleFlight() if coalesce else None
+        self._session = None
+        self.user = AsyncUser(self)
+        self.projects = AsyncProjects(self)
+        self.build = AsyncBuild(self)
+        self.cache = AsyncCache(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def session(self):
+        """Return the pooled aiohttp session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  headers=self.headers)
+        return self._session
+
+    async def close(self):
+        """Close the session and all pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def make_url(self, path):
+        return self.endpoint + path
+
+    def make_records(self, json_data, record_type, fields=None):
+        """Shape payload, or the result of an awaitable, like CircleClient."""
+        if fields is None and not self.records:
+            return json_data
+        if inspect.isawaitable(json_data):
+            return self._make_records(json_data, record_type, fields)
+        if fields is not None:
+            json_data = project_fields(json_data, fields)
+        if not self.records:
+            return json_data
+        return make_records(json_data, record_type)
+
+    async def _make_records(self, aw, record_type, fields):
+        return self.make_records(await aw, record_type, fields)
+
+    @property
+    def coalesced(self):
+        """Number of GETs answered by a concurrent identical request."""
+        return self.inflight.coalesced if self.inflight is not None else 0
+
+    async def request(self, method, url, **kwargs):
+        """Send request and return decoded JSON.
+
+        Concurrent identical GETs share the response body of the first
+        one in flight, like CircleClient.request.
+        """
+        data = json.dumps(kwargs) if method == 'POST' else None
+        if method == 'GET' and self.inflight is not None:
+            content = await self.inflight.do(url, self.send, method, url)
+        else:
+            content = await self.send(method, url, data)
+        return self.json_loads(content)
+
+    async def request_fields(self, url, fields):
+        """Send GET request and decode only fields of the payload."""
+        if self.inflight is not None:
+            content = await self.inflight.do(url, self.send, 'GET', url)
+        else:
+            content = await self.send('GET', url)
+        return decode_fields(content, fields)
+
+    async def send(self, method, url, data=None):
+        """Send request, retrying transient failures, and return the body."""
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve(method, url)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                return await self.send_once(method, url, data)
+            except CircleClientError as error:
+                if not policy.is_retryable(method, error, attempt):
+                    raise
+                await asyncio.sleep(policy.backoff(attempt, error))
+                attempt += 1
+
+    async def send_once(self, method, url, data=None):
+        """Send request once and return the response body."""
+        try:
+            async with self.session.request(method, self.make_url(url),
+                                            data=data) as response:
+                if response.status >= 400:
+                    raise error_for(response.status, response.reason,
+                                    response.headers)
+                return await response.read()
+        except (aiohttp.ClientConnectionError,
+                aiohttp.ClientPayloadError, asyncio.TimeoutError) as error:
+            raise TransportError(str(error))
+
+    async def gather(self, aws, concurrency=None, return_exceptions=False):
+        """Await many API calls with bounded concurrency.
+
+        Args:
+            aws: Iterable of awaitables, e.g. client.build.status(...) calls.
+            concurrency (int): Maximum number of calls in flight,
+                defaults to the client concurrency.
+            return_exceptions (bool): Return exceptions as results instead
+                of raising the first one.
+
+        Returns:
+            A list of results in the order of aws.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def bounded(aw):
+            async with semaphore:
+                return await aw
+
+        return await asyncio.gather(*[bounded(aw) for aw in aws],
+                                    return_exceptions=return_exceptions)
+
+    async def run_many(self, func, keys, concurrency=None):
+        """Await func(*key) for every key with bounded concurrency.
+
+        The asyncio counterpart of bulk.run_many(): errors are captured
+        per key and never abort the batch.
+
+        Returns:
+            A list of Result tuples in the order of keys.
+        """
+        async def call(key):
+            try:
+                return Result(key, await func(*key), None)
+            except Exception as error:
+                return Result(key, None, error)
+
+        return await self.gather([call(tuple(key)) for key in keys],
+                                 concurrency)
+
+
+class AsyncUser(User):
+    """Represent a CircleCI authenticated user with awaitable methods."""
+
+
+class AsyncProjects(ProjectEndpoints):
+    """Represent a project in CircleCI with awaitable methods."""
+
+
+class AsyncBuild(BuildEndpoints):
+    """Represent CircleCI builds with awaitable methods."""
+
+    def __init__(self, client):
+        BuildEndpoints.__init__(self, client)
+        self.triggers = AsyncSingleFlight()
+
+    async def artifacts(self, username, project, build_num):
+        """Return artifacts produced by given build."""
+        store = self.client.build_store
+        if store is not None:
+            json_data = store.get(username, project, build_num, 'artifacts')
+            if json_data is not None:
+                return self.client.make_records(json_data, ArtifactRecord)
+        method = 'GET'
+        url = ('/project/{username}/{project}/{build_num}/artifacts?'
+               'circle-token={token}'.format(username=username,
+                                             project=project,
+                                             build_num=build_num,
+                                             token=self.client.api_token))
+        json_data = await self.client.request(method, url)
+        if store is not None and store.contains(username, project, build_num):
+            store.put(username, project, build_num, json_data, 'artifacts')
+        return self.client.make_records(json_data, ArtifactRecord)
+
+    async def tests(self, username, project, build_num):
+        """Return test metadata collected by given build."""
+        store = self.client.build_store
+        if store is not None:
+            json_data = store.get(username, project, build_num, 'tests')
+            if json_data is not None:
+                return json_data.get('tests', [])
+        method = 'GET'
+        url = ('/project/{username}/{project}/{build_num}/tests?'
+               'circle-token={token}'.format(username=username,
+                                             project=project,
+                                             build_num=build_num,
+                                             token=self.client.api_token))
+        json_data = await self.client.request(method, url)
+        if store is not None and store.contains(username, project, build_num):
+            store.put(username, project, build_num, json_data, 'tests')
+        return json_data.get('tests', [])
+
+    async def status(self, username, project, build_num):
+        """Return summary of given build number."""
+        json_data = self.local_status(username, project, build_num)
+        if json_data is not None:
+            return self.client.make_records(json_data, BuildRecord)
+        store = self.client.build_store
+        method = 'GET'
+        url = ('/project/{username}/{project}/{build_num}?'
+               'circle-token={token}'.format(username=username,
+                                             project=project,
+                                             build_num=build_num,
+                                             token=self.client.api_token))
+        json_data = await self.client.request(method, url)
+        if store is not None and is_finished(json_data):
+            store.put(username, project, build_num, json_data)
+        return self.client.make_records(json_data, BuildRecord)
+
+    async def trigger_many(self, items, concurrency=None):
+        """Trigger builds of many projects and branches concurrently.
+
+        Identical triggers in flight at the same time start a single
+        build, like Build.trigger_many().
+
+        Args:
+            items: Iterable of (username, project, branch, build_params)
+                tuples; build_params is a dictionary or None.
+            concurrency (int): Maximum number of requests in flight,
+                defaults to the client concurrency.
+
+        Returns:
+            A list of Result tuples in the order of items.
+        """
+        async def trigger(username, project, branch, build_params=None):
+            params = build_params or {}
+            key = (username, project, branch,
+                   json.dumps(params, sort_keys=True))
+            return await self.triggers.do(key, self.trigger, username,
+                                          project, branch, **params)
+
+        return await self.client.run_many(trigger, items, concurrency)
+
+    async def status_many(self, keys, concurrency=None):
+        """Return summaries of many builds fetched concurrently.
+
+        Args:
+            keys: Iterable of (username, project, build_num) tuples.
+            concurrency (int): Maximum number of requests in flight,
+                defaults to the client concurrency.
+
+        Returns:
+            A list of Result tuples in the order of keys.
+        """
+        return await self.client.run_many(self.status, keys, concurrency)
+
+    async def artifacts_many(self, keys, concurrency=None):
+        """Return artifacts of many builds fetched concurrently."""
+        return await self.client.run_many(self.artifacts, keys, concurrency)
+
+    async def tests_many(self, keys, concurrency=None):
+        """Return test metadata of many builds fetched concurrently."""
+        return await self.client.run_many(self.tests, keys, concurrency)
+
+    def iter_recent(self, username, project, branch=None, status_filter="",
+                    since=None, until=None, page_size=100, prefetch=True,
+                    shallow=False, fields=None):
+        """Iterate asynchronously over builds of given project, newest first.
+
+        Takes the same arguments as Build.iter_recent().
+
+        Returns:
+            An async generator of dictionaries.
+        """
+        fields = _bound_fields(fields)
+
+        def fetch(offset):
+            return self.recent(username, project, limit=page_size,
+                               offset=offset, branch=branch,
+                               status_filter=status_filter,
+                               shallow=shallow, fields=fields)
+        return _aiter_pages(fetch, page_size, since, until, prefetch)
+
+    def iter_recent_all_projects(self, since=None, until=None, page_size=100,
+                                 prefetch=True, shallow=False, fields=None):
+        """Iterate asynchronously over recent builds across all projects.
+
+        Takes the same arguments as Build.iter_recent_all_projects().
+
+        Returns:
+            An async generator of dictionaries.
+        """
+        for bound in (since, until):
+            if bound is not None and not isinstance(bound, datetime.datetime):
+                raise TypeError('since and until must be datetimes')
+
+        fields = _bound_fields(fields)
+
+        def fetch(offset):
+            return self.recent_all_projects(limit=page_size, offset=offset,
+                                            shallow=shallow, fields=fields)
+        return _aiter_pages(fetch, page_size, since, until, prefetch)
+
+
+class AsyncCache(Cache):
+    """Represent CircleCI build cache with awaitable methods."""
+
+
+async def _aiter_pages(fetch, page_size, since=None, until=None,
+                       prefetch=True):
+    """Yield builds from offset paginated fetch(offset) awaitables.
+
+    The asyncio counterpart of circleclient._iter_pages(); the next page
+    is fetched in a task while the current one is consumed.
+    """
+    since, until = _as_utc(since), _as_utc(until)
+    pending = None
+    try:
+        offset = 0
+        page = await fetch(offset)
+        while page:
+            offset += len(page)
+            last = len(page) < page_size
+            if prefetch and not last:
+                pending = asyncio.ensure_future(fetch(offset))
+            for build in page:
+                if until is not None:
+                    key = _build_key(build, until)
+                    if key is not None and key > until:
+                        continue
+                if since is not None:
+                    key = _build_key(build, since)
+                    if key is not None and key < since:
+                        return
+                yield build
+            if last:
+                return
+            if pending is not None:
+                page, pending = await pending, None
+            else:
+                page = await fetch(offset)
+    finally:
+        if pending is not None:
+            pending.cancel()
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""Columnar analytics over build history.
+
+Builds are loaded once into columns: category codes for project, branch
+and status, and float epoch seconds for timestamps. Aggregations then run
+as whole-column passes with NumPy when it is installed, falling back to
+plain Python otherwise, so a million builds stay interactive.
+"""
+
+import bisect
+import calendar
+import math
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - exercised by patching
+    numpy = None
+
+
+FAILED_STATUSES = frozenset(['failed', 'infrastructure_fail', 'timedout'])
+COUNTED_STATUSES = FAILED_STATUSES | frozenset(['success', 'fixed',
+                                                'no_tests'])
+
+NAN = float('nan')
+
+GROUP_COLUMNS = ('project', 'branch', 'status')
+
+
+def epoch(value):
+    """Return seconds since epoch of a CircleCI timestamp, NaN if missing.
+
+    Timestamps are UTC; the zone suffix ('Z' or '+00:00') is ignored.
+    """
+    if not value:
+        return NAN
+    seconds = calendar.timegm((int(value[0:4]), int(value[5:7]),
+                               int(value[8:10]), int(value[11:13]),
+                               int(value[14:16]), int(value[17:19])))
+    if len(value) > 20 and value[19] == '.':
+        seconds += int(value[20:23]) / 1000.0
+    return seconds
+
+
+class Categories(object):
+    """Encode repeated strings as small integer codes."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def percentile(values, q):
+    """Return q-th percentile of sorted values with linear interpolation."""
+    if not values:
+        return NAN
+    position = (len(values) - 1) * q / 100.0
+    low = int(math.floor(position))
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+class BuildFrame(object):
+    """Build history held column by column.
+
+    Attributes:
+        categories: Categories of every grouping column.
+        columns: Dictionary of columns; NumPy arrays when NumPy is
+            installed, lists otherwise.
+    """
+
+    def __init__(self, columns, categories):
+        self.columns = columns
+        self.categories = categories
+
+    @classmethod
+    def from_builds(cls, builds):
+        """Load builds (dictionaries or records) in a single pass."""
+        categories = dict((name, Categories()) for name in GROUP_COLUMNS)
+        project, branch, status = (categories[name].encode
+                                   for name in GROUP_COLUMNS)
+        columns = dict((name, []) for name in GROUP_COLUMNS + (
+            'build_num', 'queued', 'start', 'stop', 'millis'))
+        append = [columns[name].append for name in (
+            'project', 'branch', 'status', 'build_num', 'queued', 'start',
+            'stop', 'millis')]
+        for build in builds:
+            get = build.get
+            append[0](project((get('username'), get('reponame'))))
+            append[1](branch(get('branch')))
+            append[2](status(get('status')))
+            append[3](get('build_num') or 0)
+            append[4](get('queued_at') or get('usage_queued_at'))
+            append[5](get('start_time'))
+            append[6](get('stop_time'))
+            append[7](get('build_time_millis'))
+        categories['project'].values = ['{0}/{1}'.format(*key) for key in
+                                        categories['project'].values]
+        categories['project'].codes = dict(
+            (value, code) for code, value in
+            enumerate(categories['project'].values))
+        if numpy is not None:
+            for name in GROUP_COLUMNS + ('build_num',):
+                columns[name] = numpy.asarray(columns[name], dtype=numpy.int64)
+            for name in ('queued', 'start', 'stop'):
+                columns[name] = _epochs(columns[name])
+            millis = numpy.array(columns.pop('millis'), dtype=numpy.float64)
+            columns['duration'] = numpy.where(
+                numpy.isnan(millis), columns['stop'] - columns['start'],
+                millis / 1000.0)
+        else:
+            for name in ('queued', 'start', 'stop'):
+                columns[name] = [epoch(value) for value in columns[name]]
+            columns['duration'] = [
+                millis / 1000.0 if millis is not None else stop - start
+                for millis, start, stop in zip(columns.pop('millis'),
+                                               columns['start'],
+                                               columns['stop'])]
+        return cls(columns, categories)
+
+    def __len__(self):
+        return len(self.columns['build_num'])
+
+    def _status_mask(self, statuses):
+        known = self.categories['status'].codes
+        codes = [code for value, code in known.items() if value in statuses]
+        if numpy is not None:
+            return numpy.isin(self.columns['status'], codes)
+        codes = set(codes)
+        return [code in codes for code in self.columns['status']]
+
+    def filter(self, since=None, until=None, **equals):
+        """Return frame of builds queued in [since, until) and matching.
+
+        Args:
+            since (float): Epoch seconds, inclusive.
+            until (float): Epoch seconds, exclusive.
+            equals: Column values to keep, e.g. project='qba73/nc'.
+        """
+        n = len(self)
+        if numpy is not None:
+            mask = numpy.ones(n, dtype=bool)
+            queued = self.columns['queued']
+            if since is not None:
+                mask &= queued >= since
+            if until is not None:
+                mask &= queued < until
+            for name, value in equals.items():
+                code = self.categories[name].codes.get(value, -1)
+                mask &= self.columns[name] == code
+            columns = dict((name, column[mask])
+                           for name, column in self.columns.items())
+            return BuildFrame(columns, self.categories)
+        keep = list(range(n))
+        queued = self.columns['queued']
+        if since is not None:
+            keep = [i for i in keep if queued[i] >= since]
+        if until is not None:
+            keep = [i for i in keep if queued[i] < until]
+        for name, value in equals.items():
+            code = self.categories[name].codes.get(value, -1)
+            column = self.columns[name]
+            keep = [i for i in keep if column[i] == code]
+        columns = dict((name, [column[i] for i in keep])
+                       for name, column in self.columns.items())
+        return BuildFrame(columns, self.categories)
+
+    def group_codes(self, by):
+        """Return one combined integer group code per build and a decoder.
+
+        Returns:
+            A (codes, decode) tuple, decode maps a code to a key tuple.
+        """
+        sizes = [len(self.categories[name].values) or 1 for name in by]
+        if numpy is not None:
+            codes = numpy.zeros(len(self), dtype=numpy.int64)
+            for name, size in zip(by, sizes):
+                codes = codes * size + self.columns[name]
+        else:
+            codes = [0] * len(self)
+            for name, size in zip(by, sizes):
+                column = self.columns[name]
+                codes = [code * size + value
+                         for code, value in zip(codes, column)]
+
+        def decode(code):
+            key = []
+            for name, size in reversed(list(zip(by, sizes))):
+                code, value = divmod(int(code), size)
+                key.append(self.categories[name].values[value])
+            return tuple(reversed(key))
+        return codes, decode
+
+    def _percentiles(self, values, by, q):
+        codes, decode = self.group_codes(by)
+        if numpy is not None:
+            valid = ~numpy.isnan(values)
+            values, codes = values[valid], codes[valid]
+            if not len(values):
+                return {}
+            order = numpy.lexsort((values, codes))
+            values, codes = values[order], codes[order]
+            groups, starts, counts = numpy.unique(codes, return_index=True,
+                                                  return_counts=True)
+            result = []
+            for quantile in q:
+                position = starts + (counts - 1) * quantile / 100.0
+                low = numpy.floor(position).astype(numpy.int64)
+                high = numpy.minimum(low + 1, starts + counts - 1)
+                result.append(values[low] + (values[high] - values[low]) *
+                              (position - low))
+            return dict((decode(group), tuple(float(column[i])
+                                              for column in result))
+                        for i, group in enumerate(groups))
+        grouped = {}
+        for code, value in zip(codes, values):
+            if value == value:
+                grouped.setdefault(code, []).append(value)
+        return dict((decode(code), tuple(percentile(sorted(values), quantile)
+                                         for quantile in q))
+                    for code, values in grouped.items())
+
+    def duration_percentiles(self, by=('project',), q=(50, 95)):
+        """Return build duration percentiles in seconds per group.
+
+        Returns:
+            A dictionary mapping group key tuples to percentile tuples.
+        """
+        return self._percentiles(self.columns['duration'], by, q)
+
+    def queue_times(self, by=('project',), q=(50, 95)):
+        """Return percentiles of seconds spent queued before start."""
+        queued, start = self.columns['queued'], self.columns['start']
+        if numpy is not None:
+            waits = start - queued
+        else:
+            waits = [b - a for a, b in zip(queued, start)]
+        return self._percentiles(waits, by, q)
+
+    def failure_rates(self, by=('project',)):
+        """Return (failed, finished, rate) per group.
+
+        Only builds that ran to a verdict count; canceled, retried and
+        not run builds are ignored.
+        """
+        counted = self._status_mask(COUNTED_STATUSES)
+        failed = self._status_mask(FAILED_STATUSES)
+        codes, decode = self.group_codes(by)
+        if numpy is not None:
+            totals = numpy.bincount(codes[counted])
+            failures = numpy.bincount(codes[failed], minlength=len(totals))
+            groups = numpy.nonzero(totals)[0]
+            return dict((decode(group),
+                         (int(failures[group]), int(totals[group]),
+                          float(failures[group]) / totals[group]))
+                        for group in groups)
+        totals = {}
+        failures = {}
+        for code, is_counted, is_failed in zip(codes, counted, failed):
+            if is_counted:
+                totals[code] = totals.get(code, 0) + 1
+            if is_failed:
+                failures[code] = failures.get(code, 0) + 1
+        return dict((decode(code), (failures.get(code, 0), total,
+                                    failures.get(code, 0) / float(total)))
+                    for code, total in totals.items())
+
+    def rolling_failure_rate(self, window=7 * 86400, step=86400,
+                             by=('project',)):
+        """Return failure rate over a sliding time window per group.
+
+        Args:
+            window (float): Window length in seconds.
+            step (float): Distance between window ends in seconds.
+
+        Returns:
+            A dictionary mapping group keys to lists of (window end epoch,
+            rate) tuples; windows without finished builds are skipped.
+        """
+        counted = self._status_mask(COUNTED_STATUSES)
+        failed = self._status_mask(FAILED_STATUSES)
+        codes, decode = self.group_codes(by)
+        queued = self.columns['queued']
+        width = int(math.ceil(window / float(step)))
+        if numpy is not None:
+            keep = counted & ~numpy.isnan(queued)
+            if not keep.any():
+                return {}
+            times, codes, failed = queued[keep], codes[keep], failed[keep]
+            origin = times.min()
+            buckets = ((times - origin) // step).astype(numpy.int64)
+            groups, inverse = numpy.unique(codes, return_inverse=True)
+            shape = (len(groups), int(buckets.max()) + 1)
+            totals = numpy.zeros(shape)
+            failures = numpy.zeros(shape)
+            numpy.add.at(totals, (inverse, buckets), 1)
+            numpy.add.at(failures, (inverse, buckets), failed)
+            totals = _moving_sum(totals, width)
+            failures = _moving_sum(failures, width)
+            ends = origin + (numpy.arange(shape[1]) + 1) * step
+            result = {}
+            for row, group in enumerate(groups):
+                present = totals[row] > 0
+                rates = failures[row][present] / totals[row][present]
+                result[decode(group)] = list(zip(ends[present].tolist(),
+                                                 rates.tolist()))
+            return result
+        rows = [(code, time, is_failed) for code, time, is_counted, is_failed
+                in zip(codes, queued, counted, failed)
+                if is_counted and time == time]
+        if not rows:
+            return {}
+        origin = min(row[1] for row in rows)
+        last = int((max(row[1] for row in rows) - origin) // step)
+        series = {}
+        for code, time, is_failed in rows:
+            bucket = int((time - origin) // step)
+            counts = series.setdefault(code, {})
+            total, failures = counts.get(bucket, (0, 0))
+            counts[bucket] = (total + 1, failures + (1 if is_failed else 0))
+        result = {}
+        for code, counts in series.items():
+            buckets = sorted(counts)
+            points = []
+            for bucket in range(last + 1):
+                first = bisect.bisect_left(buckets, bucket - width + 1)
+                stop = bisect.bisect_right(buckets, bucket)
+                total = sum(counts[b][0] for b in buckets[first:stop])
+                if total:
+                    failures = sum(counts[b][1] for b in buckets[first:stop])
+                    points.append((origin + (bucket + 1) * step,
+                                   failures / float(total)))
+            result[decode(code)] = points
+        return result
+
+    def failure_rate_change(self, now, recent=7 * 86400, baseline=30 * 86400,
+                            by=('project',)):
+        """Compare failure rate of the recent period with the baseline.
+
+        Returns:
+            A dictionary mapping group keys to (baseline rate, recent
+            rate, change) tuples, sorted by largest increase first.
+        """
+        before = self.filter(since=now - baseline, until=now - recent)
+        after = self.filter(since=now - recent, until=now)
+        old = before.failure_rates(by)
+        new = after.failure_rates(by)
+        changes = []
+        for key, (_, _, rate) in new.items():
+            base = old.get(key, (0, 0, 0.0))[2]
+            changes.append((key, (base, rate, rate - base)))
+        changes.sort(key=lambda item: item[1][2], reverse=True)
+        return dict(changes)
+
+
+def _epochs(values):
+    """Vectorized epoch() returning a float array, NaN for missing."""
+    # numpy warns about, or rejects, zone suffixes; cut them like epoch().
+    stamps = numpy.array([(value[:23] if value[19:20] == '.' else value[:19])
+                          if value else 'NaT' for value in values],
+                         dtype='datetime64[ms]')
+    seconds = stamps.astype(numpy.int64) / 1000.0
+    seconds[numpy.isnat(stamps)] = numpy.nan
+    return seconds
+
+
+def _moving_sum(counts, width):
+    """Sum counts over the last width columns of every row."""
+    total = numpy.cumsum(counts, axis=1)
+    total[:, width:] = total[:, width:] - total[:, :-width]
+    return total
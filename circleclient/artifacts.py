@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""Stream build artifacts to disk."""
+
+import fnmatch
+import os
+import time
+from collections import namedtuple
+
+from urllib.parse import urlencode
+
+from .bulk import run_many
+from .circleclient import CircleClientError
+
+
+class Download(namedtuple('Download', ['path', 'url', 'bytes', 'seconds',
+                                       'resumed', 'error'])):
+    """Outcome of one artifact download.
+
+    Attributes:
+        path: Local file the artifact was written to.
+        url: Artifact URL.
+        bytes: Bytes transferred by this download.
+        seconds: Wall time spent downloading.
+        resumed: True if a partial file was continued with a Range request.
+        error: Raised exception, None if the download succeeded.
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def throughput(self):
+        """Transfer rate in bytes per second."""
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+def local_path(dest, artifact):
+    """Return path inside dest for given artifact.
+
+    Artifacts of parallel containers are kept apart under a directory
+    named after their node_index, as containers may save the same path.
+
+    Raises:
+        ValueError: Artifact path would escape dest.
+    """
+    relative = artifact.get('pretty_path') or artifact['path']
+    relative = relative.replace('$CIRCLE_ARTIFACTS', '').lstrip('/\\')
+    if artifact.get('node_index') is not None:
+        relative = os.path.join(str(artifact['node_index']), relative)
+    root = os.path.abspath(dest)
+    path = os.path.abspath(os.path.join(root, relative))
+    if not path.startswith(root + os.sep):
+        raise ValueError('artifact path escapes destination: ' + relative)
+    return path
+
+
+class ArtifactDownloader(object):
+    """Download artifacts concurrently with constant memory.
+
+    Every artifact is streamed in chunks to a '.part' file which is
+    renamed once complete. A download interrupted by a broken connection,
+    or by a previous run, continues from the end of the partial file
+    with an HTTP Range request.
+    """
+
+    def __init__(self, client, concurrency=4, chunk_size=1024 * 1024):
+        """Create downloader.
+
+        Args:
+            client: An instance of CircleClient object.
+            concurrency (int): Number of files downloaded in parallel.
+            chunk_size (int): Bytes read into memory at a time.
+        """
+        self.client = client
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+
+    def download(self, artifacts, dest, pattern='*'):
+        """Download artifacts whose path matches glob pattern into dest.
+
+        Returns:
+            A list of Download tuples, failed files do not stop the others.
+        """
+        selected = [(artifact,) for artifact in artifacts
+                    if fnmatch.fnmatch(artifact['path'], pattern)]
+        results = run_many(lambda artifact: self.fetch(artifact, dest),
+                           selected, self.concurrency)
+        return [result.value if result.ok else
+                Download(None, result.key[0].get('url'), 0, 0.0, False,
+                         result.error)
+                for result in results]
+
+    def fetch(self, artifact, dest):
+        """Download single artifact, retrying broken transfers."""
+        path = local_path(dest, artifact)
+        url = artifact['url']
+        if os.path.exists(path):
+            return Download(path, url, 0, 0.0, False, None)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        policy = self.client.retry_policy
+        start = time.time()
+        transferred = 0
+        resumed = False
+        attempt = 0
+        while True:
+            try:
+                written, continued = self.stream(url, path + '.part')
+                transferred += written
+                resumed = resumed or continued
+                break
+            except CircleClientError as error:
+                if not policy.is_retryable('GET', error, attempt):
+                    raise
+                policy.sleep(policy.backoff(attempt, error))
+                attempt += 1
+        os.rename(path + '.part', path)
+        return Download(path, url, transferred, time.time() - start,
+                        resumed, None)
+
+    def stream(self, url, part):
+        """Append remaining bytes of url to part file.
+
+        Returns:
+            A (bytes written, resumed) tuple.
+        """
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {'Range': 'bytes={0}-'.format(offset)} if offset else {}
+        if self.client.api_token:
+            url += ('&' if '?' in url else '?') + urlencode(
+                {'circle-token': self.client.api_token})
+        written = 0
+        try:
+            response = self.client.stream(url, headers)
+        except CircleClientError as error:
+            if getattr(error, 'status_code', None) == 416 and offset:
+                return 0, True
+            raise
+        with response:
+            resumed = response.status_code == 206
+            with open(part, 'ab' if resumed else 'wb') as output:
+                for chunk in response.iter_content(self.chunk_size):
+                    output.write(chunk)
+                    written += len(chunk)
+        return written, resumed
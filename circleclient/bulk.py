@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Run many blocking API calls on a bounded worker pool."""
+
+from collections import namedtuple
+
+
+class Result(namedtuple('Result', ['key', 'value', 'error'])):
+    """Outcome of one call in a batch.
+
+    Attributes:
+        key: Arguments the call was made with.
+        value: Returned value, None if the call failed.
+        error: Raised exception, None if the call succeeded.
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _call(func, key):
+    try:
+        return Result(key, func(*key), None)
+    except Exception as error:
+        return Result(key, None, error)
+
+
+def run_many(func, keys, concurrency=8, ordered=True):
+    """Call func(*key) for every key using at most concurrency threads.
+
+    Errors are captured per key and never abort the batch.
+
+    Args:
+        func: Callable taking the unpacked key.
+        keys: Iterable of argument tuples.
+        concurrency (int): Number of worker threads.
+        ordered (bool): Return a list in the order of keys. Otherwise
+            return a generator yielding results as they complete.
+
+    Returns:
+        A list or generator of Result tuples.
+    """
+    # concurrent.futures is imported on first use to keep start-up cheap.
+    from concurrent.futures import ThreadPoolExecutor
+    keys = [tuple(key) for key in keys]
+    if ordered:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(lambda key: _call(func, key), keys))
+    return _run_unordered(func, keys, concurrency)
+
+
+def _run_unordered(func, keys, concurrency):
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = [executor.submit(_call, func, key) for key in keys]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=False)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Indexed, periodically refreshed catalog of followed projects."""
+
+import threading
+from collections import namedtuple
+from urllib.parse import unquote, urlparse
+
+
+CatalogDiff = namedtuple('CatalogDiff', ['added', 'removed'])
+CatalogDiff.__doc__ = """Project keys added and removed by a refresh."""
+
+
+VCS_HOSTS = {
+    'github.com': 'github',
+    'bitbucket.org': 'bitbucket',
+}
+
+
+def project_key(project):
+    """Return (vcs_type, username, reponame) of a project payload."""
+    vcs_type = project.get('vcs_type')
+    if not vcs_type:
+        host = urlparse(project.get('vcs_url') or '').netloc
+        vcs_type = VCS_HOSTS.get(host, host)
+    return (vcs_type, project['username'], project['reponame'])
+
+
+def _as_key(key):
+    if isinstance(key, tuple):
+        return key
+    return tuple(key.split('/', 2))
+
+
+class _Index(object):
+    """Immutable lookup tables built from one list_projects payload."""
+
+    __slots__ = ('projects', 'branches')
+
+    def __init__(self, projects=()):
+        self.projects = {}
+        self.branches = {}
+        for project in projects:
+            key = project_key(project)
+            self.projects[key] = project
+            for branch in project.get('branches') or {}:
+                self.branches.setdefault(unquote(branch), []).append(key)
+
+
+class ProjectCatalog(object):
+    """Followed projects indexed by key and by branch.
+
+    Projects are keyed by (vcs_type, username, reponame); lookups also
+    accept the 'vcs_type/username/reponame' form. Each refresh builds new
+    indexes and swaps them in at once, so lookups never block and never
+    see a half-refreshed catalog.
+
+    Attributes:
+        diff: CatalogDiff of the last refresh.
+        error: Exception raised by the last background refresh, if any.
+    """
+
+    def __init__(self, client, interval=300, callback=None):
+        """Create catalog; call refresh() or start() to fill it.
+
+        Args:
+            client: An instance of CircleClient object.
+            interval (float): Seconds between background refreshes.
+            callback: Called with the CatalogDiff of every refresh that
+                added or removed projects.
+        """
+        self.client = client
+        self.interval = interval
+        self.callback = callback
+        self.diff = CatalogDiff([], [])
+        self.error = None
+        self.refreshes = 0
+        self._index = _Index()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._index.projects)
+
+    def __iter__(self):
+        return iter(list(self._index.projects))
+
+    def __contains__(self, key):
+        return _as_key(key) in self._index.projects
+
+    def __getitem__(self, key):
+        return self._index.projects[_as_key(key)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def get(self, key, default=None):
+        """Return project payload for key, or default."""
+        return self._index.projects.get(_as_key(key), default)
+
+    def branch(self, key, branch, default=None):
+        """Return branch summary of project key, or default."""
+        project = self.get(key)
+        if project is None:
+            return default
+        branches = project.get('branches') or {}
+        for name in (branch, branch.replace('/', '%2F')):
+            if name in branches:
+                return branches[name]
+        return default
+
+    def with_branch(self, branch):
+        """Return keys of projects that have given branch."""
+        return list(self._index.branches.get(branch, ()))
+
+    def refresh(self):
+        """Fetch followed projects, swap in new indexes, return CatalogDiff."""
+        index = _Index(self.client.projects.list_projects())
+        old, new = set(self._index.projects), set(index.projects)
+        self._index = index
+        self.diff = CatalogDiff(sorted(new - old), sorted(old - new))
+        self.refreshes += 1
+        if self.callback is not None and (self.diff.added or
+                                          self.diff.removed):
+            self.callback(self.diff)
+        return self.diff
+
+    def start(self):
+        """Fill catalog if empty, then refresh it in a daemon thread."""
+        if self._thread is not None:
+            return self
+        if not self.refreshes:
+            self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name='circleclient-catalog')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop background refreshes and wait for the thread to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+                self.error = None
+            except Exception as error:
+                # Keep serving the last good catalog until the next tick.
+                self.error = error
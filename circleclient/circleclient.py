@@ -1,10 +1,78 @@
 # -*- coding: utf-8 -*-
 
+import datetime
+import importlib
 import json
-import requests
+import re
+import time
 
+from . import __version__  # noqa: F401
+from .bulk import run_many
+from .metrics import RequestEvent, download_route, route_template
+from .records import (ArtifactRecord, BuildRecord, ProjectRecord,
+                      make_records)
+from .singleflight import SingleFlight
 
-__version__ = '0.1.6'
+
+UTC = datetime.timezone.utc
+
+_SEPARATORS = re.compile(r'[\s,]*')
+_decoder = json.JSONDecoder()
+
+FINISHED_STATUSES = frozenset([
+    'success', 'fixed', 'failed', 'canceled', 'infrastructure_fail',
+    'timedout', 'not_run', 'no_tests', 'retried'])
+
+
+class CircleClientError(Exception):
+    """Base class for errors raised by circleclient."""
+
+
+class TransportError(CircleClientError):
+    """Request failed before a response was received."""
+
+
+class HTTPError(CircleClientError):
+    """CircleCI answered with an error status.
+
+    Attributes:
+        status_code: HTTP status code of the response.
+        reason: HTTP reason phrase of the response.
+        retry_after: Seconds to wait advertised by the server, or None.
+    """
+
+    def __init__(self, status_code, reason, retry_after=None):
+        CircleClientError.__init__(
+            self, '{status}: {reason}.\nCircleCI Status NOT OK'.format(
+                status=status_code, reason=reason))
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ClientError(HTTPError):
+    """Request was rejected with a 4xx status."""
+
+
+class RateLimitError(ClientError):
+    """Request was throttled with 429 Too Many Requests."""
+
+
+class ServerError(HTTPError):
+    """CircleCI failed with a 5xx status."""
+
+
+def error_for(status_code, reason, headers=None):
+    """Return HTTPError subclass instance matching given status code."""
+    from .retry import parse_retry_after
+    retry_after = parse_retry_after((headers or {}).get('Retry-After'))
+    if status_code == 429:
+        cls = RateLimitError
+    elif status_code >= 500:
+        cls = ServerError
+    else:
+        cls = ClientError
+    return cls(status_code, reason, retry_after)
 
 
 class CircleClient(object):
@@ -13,10 +81,63 @@ class CircleClient(object):
     Attributes:
         api_token: CircleCI API token for the client.
     """
-    def __init__(self, api_token=None, endpoint=None):
+    def __init__(self, api_token=None, endpoint=None, pool_connections=10,
+                 pool_maxsize=10, pool_block=False, keep_alive=True,
+                 response_cache=None, build_store=None, retry_policy=None,
+                 rate_limiter=None, records=False, json_loads=None,
+                 coalesce=True, build_states=None, transport=None):
+        """Create a client backed by a pooled keep-alive HTTP transport.
+
+        Args:
+            api_token (str): CircleCI API token.
+            endpoint (str): API root, defaults to the public v1.1 API.
+            pool_connections (int): Number of per-host pools to keep.
+            pool_maxsize (int): Maximum connections kept open per host.
+            pool_block (bool): Block when the per-host pool is exhausted
+                instead of opening an extra, non-pooled connection.
+            keep_alive (bool): Reuse connections between requests.
+            response_cache (ResponseCache): Optional cache for GET responses.
+            build_store (BuildStore): Optional persistent store serving
+                status and artifacts of finished builds.
+            retry_policy (RetryPolicy): Retry policy for transient errors,
+                defaults to RetryPolicy().
+            rate_limiter (RateLimiter): Optional limiter consulted before
+                every request, retries included.
+            records (bool): Return slotted BuildRecord, ProjectRecord and
+                ArtifactRecord objects instead of dictionaries.
+            json_loads: Callable decoding response bodies, defaults to
+                json.loads; see fast_json_loads().
+            coalesce (bool): Share one request between concurrent
+                identical GETs instead of sending each of them.
+            build_states (BuildStates): Optional webhook-fed build states
+                answering status lookups and waits for notified builds.
+            transport (Transport): Object sending the HTTP requests,
+                defaults to a RequestsTransport using the pool options.
+        """
+        from .retry import RetryPolicy
+        from .transport import RequestsTransport
         self.api_token = api_token
-        self.endpoint = 'https://circleci.com/api/v1.1' if endpoint is None else endpoint
+        if endpoint is None:
+            endpoint = 'https://circleci.com/api/v1.1'
+        self.endpoint = endpoint
+        self.keep_alive = keep_alive
+        self.response_cache = response_cache
+        self.build_store = build_store
+        self.build_states = build_states
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.records = records
+        self.json_loads = json.loads if json_loads is None else json_loads
+        self.inflight = SingleFlight() if coalesce else None
+        self.before_hooks = []
+        self.after_hooks = []
         self.headers = self.make_headers()
+        if transport is None:
+            transport = RequestsTransport(pool_connections, pool_maxsize,
+                                          pool_block)
+        self.transport = transport
         self.user = User(self)
         self.projects = Projects(self)
         self.build = Build(self)
@@ -27,44 +148,229 @@ class CircleClient(object):
             "DELETE": self.client_delete
         }
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def adapter(self):
+        """Return the connection pool adapter of the requests transport."""
+        return self.transport.adapter
+
+    @property
+    def session(self):
+        """Return the requests session bound to the calling thread.
+
+        Every thread gets its own session, so cookie and header state is
+        never shared, but all sessions are mounted on the same adapter and
+        draw keep-alive connections from one thread-safe pool.
+        """
+        return self.transport.session
+
+    def close(self):
+        """Close all pooled connections."""
+        self.transport.close()
+
     def make_headers(self):
-        return {'Content-Type': 'application/json',
-                'Accept': 'application/json'}
+        headers = {'Content-Type': 'application/json',
+                   'Accept': 'application/json'}
+        if not self.keep_alive:
+            headers['Connection'] = 'close'
+        return headers
 
     def make_url(self, path):
         return self.endpoint + path
 
+    def add_hook(self, before=None, after=None):
+        """Register instrumentation hooks.
+
+        Args:
+            before: Callable receiving (method, route) before a request.
+            after: Callable receiving a RequestEvent once the request
+                succeeded or finally failed.
+        """
+        if before is not None:
+            self.before_hooks.append(before)
+        if after is not None:
+            self.after_hooks.append(after)
+
+    def remove_hook(self, hook):
+        """Unregister a hook added with add_hook()."""
+        for hooks in (self.before_hooks, self.after_hooks):
+            if hook in hooks:
+                hooks.remove(hook)
+
+    def send(self, method, url, data=None, headers=None):
+        """Send request, retrying transient failures, and return response.
+
+        Raises:
+            HTTPError: Response status was not OK.
+            TransportError: Connection failed or timed out.
+        """
+        instrumented = self.before_hooks or self.after_hooks
+        if instrumented:
+            route = route_template(url)
+            for hook in self.before_hooks:
+                hook(method, route)
+            start = time.time()
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(method, url)
+            try:
+                response = self.send_once(method, url, data, headers)
+            except CircleClientError as error:
+                if policy.is_retryable(method, error, attempt):
+                    policy.sleep(policy.backoff(attempt, error))
+                    attempt += 1
+                    continue
+                if instrumented:
+                    self.emit(RequestEvent(
+                        method, route, getattr(error, 'status_code', None),
+                        time.time() - start, 0, attempt, error))
+                raise
+            if instrumented:
+                self.emit(RequestEvent(
+                    method, route, response.status_code, time.time() - start,
+                    len(response.content), attempt, None))
+            return response
+
+    def stream(self, url, headers=None):
+        """Open GET of an absolute URL, such as an artifact, for streaming.
+
+        Goes through the rate limiter and the instrumentation hooks like
+        send(), but is sent only once: callers retry, or resume,
+        interrupted downloads themselves. The after-request hooks see the
+        time until the response headers arrived and the Content-Length.
+
+        Returns:
+            A response of Transport.stream(); the caller must close it.
+
+        Raises:
+            HTTPError: Response status was not OK.
+            TransportError: Connection failed or timed out.
+        """
+        instrumented = self.before_hooks or self.after_hooks
+        if instrumented:
+            route = download_route(url)
+            for hook in self.before_hooks:
+                hook('GET', route)
+            start = time.time()
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire('GET', url)
+        try:
+            response = self.transport.stream('GET', url, headers)
+            if not response.ok:
+                response.close()
+                raise error_for(response.status_code, response.reason,
+                                response.headers)
+        except CircleClientError as error:
+            if instrumented:
+                self.emit(RequestEvent(
+                    'GET', route, getattr(error, 'status_code', None),
+                    time.time() - start, 0, 0, error))
+            raise
+        if instrumented:
+            self.emit(RequestEvent(
+                'GET', route, response.status_code, time.time() - start,
+                int(response.headers.get('Content-Length') or 0), 0, None))
+        return response
+
+    def emit(self, event):
+        """Pass RequestEvent to every after-request hook."""
+        for hook in self.after_hooks:
+            hook(event)
+
+    def send_once(self, method, url, data=None, headers=None):
+        """Send request through the transport and return the response."""
+        if headers:
+            headers = dict(self.headers, **headers)
+        response = self.transport.send(method, self.make_url(url), data,
+                                       headers or self.headers)
+        if not response.ok:
+            raise error_for(response.status_code, response.reason,
+                            response.headers)
+        return response
+
     def client_get(self, url, **kwargs):
         """Send GET request with given url."""
-        response = requests.get(self.make_url(url), headers=self.headers)
-        if not response.ok:
-            raise Exception(
-                '{status}: {reason}.\nCircleCI Status NOT OK'.format(
-                    status=response.status_code, reason=response.reason))
-        return response.json()
+        return self.json_loads(self.send('GET', url).content)
+
+    def cached_get(self, url):
+        """Send GET request through the response cache."""
+        return self.json_loads(self.cached_content(url))
+
+    def cached_content(self, url):
+        """Return GET response body, served or revalidated by the cache."""
+        cache = self.response_cache
+        entry = cache.lookup(url)
+        if entry is not None and entry.is_fresh():
+            return entry.content
+        headers = entry.conditional_headers() if entry is not None else None
+        response = self.send('GET', url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            cache.revalidated(url, entry)
+            return entry.content
+        cache.store(url, response)
+        return response.content
+
+    def get_content(self, url):
+        """Return GET response body, through the response cache if any."""
+        if self.response_cache is not None:
+            return self.cached_content(url)
+        return self.send('GET', url).content
 
     def client_post(self, url, **kwargs):
         """Send POST request with given url and keyword args."""
-        response = requests.post(self.make_url(url),
-                                 data=json.dumps(kwargs),
-                                 headers=self.headers)
-        if not response.ok:
-            raise Exception(
-                '{status}: {reason}.\nCircleCI Status NOT OK'.format(
-                    status=response.status_code, reason=response.reason))
-        return response.json()
+        response = self.send('POST', url, data=json.dumps(kwargs))
+        return self.json_loads(response.content)
 
     def client_delete(self, url, **kwargs):
-        """Send POST request with given url."""
-        response = requests.delete(self.make_url(url), headers=self.headers)
-        if not response.ok:
-            raise Exception(
-                '{status}: {reason}.\nCircleCI Status NOT OK'.format(
-                    status=response.status_code, reason=response.reason))
-        return response.json()
+        """Send DELETE request with given url."""
+        return self.json_loads(self.send('DELETE', url).content)
+
+    def make_records(self, json_data, record_type, fields=None):
+        """Shape payload into the configured result type.
+
+        Keys not listed in fields are dropped, then the payload is wrapped
+        in record_type objects when records are enabled.
+        """
+        if fields is not None:
+            json_data = project_fields(json_data, fields)
+        if not self.records:
+            return json_data
+        return make_records(json_data, record_type)
+
+    @property
+    def coalesced(self):
+        """Number of GETs answered by a concurrent identical request."""
+        return self.inflight.coalesced if self.inflight is not None else 0
+
+    def request_fields(self, url, fields):
+        """Send GET request and decode only fields of the payload.
+
+        See decode_fields(); the response is shared with concurrent
+        identical GETs like in request().
+        """
+        if self.inflight is None:
+            return decode_fields(self.get_content(url), fields)
+        return decode_fields(self.inflight.do(url, self.get_content, url),
+                             fields)
 
     def request(self, method, url, **kwargs):
-        return self.dispatch[method](url, **kwargs)
+        """Send request and return decoded JSON.
+
+        Concurrent identical GETs share the response body of the first
+        one in flight; each caller still decodes its own copy.
+        """
+        if method != 'GET':
+            return self.dispatch[method](url, **kwargs)
+        if self.inflight is None:
+            return self.json_loads(self.get_content(url))
+        return self.json_loads(self.inflight.do(url, self.get_content, url))
 
 
 class User(object):
@@ -85,7 +391,7 @@ class User(object):
         return json_data
 
 
-class Projects(object):
+class ProjectEndpoints(object):
     """Represent a project in CircleCI.
 
     Attributes:
@@ -100,10 +406,29 @@ class Projects(object):
         url = '/projects?circle-token={token}'.format(
             token=self.client.api_token)
         json_data = self.client.request(method, url)
-        return json_data
+        return self.client.make_records(json_data, ProjectRecord)
+
+
+class Projects(ProjectEndpoints):
+    """Project endpoints with the project catalog helper."""
 
+    def catalog(self, **options):
+        """Return a ProjectCatalog of followed projects, already filled."""
+        from .catalog import ProjectCatalog
+        catalog = ProjectCatalog(self.client, **options)
+        catalog.refresh()
+        return catalog
 
-class Build(object):
+
+class BuildEndpoints(object):
+    """Build endpoints of CircleCI API.
+
+    Every method maps to one API call, so the class is shared by the
+    blocking and the asyncio client.
+
+    Attributes:
+        client: An instance of CircleClient object.
+    """
 
     def __init__(self, client):
         self.client = client
@@ -121,7 +446,7 @@ class Build(object):
                                             build_parameters=build_params)
         else:
             json_data = self.client.request(method, url)
-        return json_data
+        return self.client.make_records(json_data, BuildRecord)
 
     def cancel(self, username, project, build_num):
         """Cancel the build and return its summary."""
@@ -132,7 +457,7 @@ class Build(object):
                                              build_num=build_num,
                                              token=self.client.api_token))
         json_data = self.client.request(method, url)
-        return json_data
+        return self.client.make_records(json_data, BuildRecord)
 
     def retry(self, username, project, build_num):
         """Retry the build and return a summary of the new build."""
@@ -143,13 +468,20 @@ class Build(object):
                                              build_num=build_num,
                                              token=self.client.api_token))
         json_data = self.client.request(method, url)
-        return json_data
+        return self.client.make_records(json_data, BuildRecord)
 
     def artifacts(self, username, project, build_num):
         """Return artifacts produced by given build.
 
         Return information about artifacts as a list of dictionaries.
+        Artifacts of builds known to be finished are served from the
+        client build store, if one is configured.
         """
+        store = self.client.build_store
+        if store is not None:
+            json_data = store.get(username, project, build_num, 'artifacts')
+            if json_data is not None:
+                return self.client.make_records(json_data, ArtifactRecord)
         method = 'GET'
         url = ('/project/{username}/{project}/{build_num}/artifacts?'
                'circle-token={token}'.format(username=username,
@@ -157,10 +489,60 @@ class Build(object):
                                              build_num=build_num,
                                              token=self.client.api_token))
         json_data = self.client.request(method, url)
-        return json_data
+        if store is not None and store.contains(username, project, build_num):
+            store.put(username, project, build_num, json_data, 'artifacts')
+        return self.client.make_records(json_data, ArtifactRecord)
+
+    def tests(self, username, project, build_num):
+        """Return test metadata collected by given build.
+
+        Return a list of dictionaries with classname, file, name, result
+        and run_time of every test. Like artifacts, tests of builds known
+        to be finished are served from the client build store.
+        """
+        store = self.client.build_store
+        if store is not None:
+            json_data = store.get(username, project, build_num, 'tests')
+            if json_data is not None:
+                return json_data.get('tests', [])
+        method = 'GET'
+        url = ('/project/{username}/{project}/{build_num}/tests?'
+               'circle-token={token}'.format(username=username,
+                                             project=project,
+                                             build_num=build_num,
+                                             token=self.client.api_token))
+        json_data = self.client.request(method, url)
+        if store is not None and store.contains(username, project, build_num):
+            store.put(username, project, build_num, json_data, 'tests')
+        return json_data.get('tests', [])
+
+    def local_status(self, username, project, build_num):
+        """Return summary of a finished build known without a request.
+
+        Looks in the client build states, fed by webhook notifications,
+        then in the client build store. Returns None if neither knows the
+        build as finished.
+        """
+        states = self.client.build_states
+        if states is not None:
+            json_data = states.get(username, project, build_num)
+            if json_data is not None and is_finished(json_data):
+                return json_data
+        store = self.client.build_store
+        if store is not None:
+            return store.get(username, project, build_num)
+        return None
 
     def status(self, username, project, build_num):
-        """Return summary of given build number."""
+        """Return summary of given build number.
+
+        Finished builds never change, so they are served from webhook
+        notifications or the client build store, if configured.
+        """
+        json_data = self.local_status(username, project, build_num)
+        if json_data is not None:
+            return self.client.make_records(json_data, BuildRecord)
+        store = self.client.build_store
         method = 'GET'
         url = ('/project/{username}/{project}/{build_num}?'
                'circle-token={token}'.format(username=username,
@@ -168,14 +550,21 @@ class Build(object):
                                              build_num=build_num,
                                              token=self.client.api_token))
         json_data = self.client.request(method, url)
-        return json_data
+        if store is not None and is_finished(json_data):
+            store.put(username, project, build_num, json_data)
+        return self.client.make_records(json_data, BuildRecord)
 
-    def recent_all_projects(self, limit=30, offset=0):
+    def recent_all_projects(self, limit=30, offset=0, shallow=False,
+                            fields=None):
         """Return information about recent builds across all projects.
 
         Args:
             limit (int), Number of builds to return, max=100, defaults=30.
             offset (int): Builds returned from this point, default=0.
+            shallow (bool): Ask the API for a shallow listing without
+                steps and commit details.
+            fields (list): Keep only these keys of each build; the
+                others are dropped while the listing is decoded.
 
         Returns:
             A list of dictionaries.
@@ -185,10 +574,16 @@ class Build(object):
                'offset={offset}'.format(token=self.client.api_token,
                                         limit=limit,
                                         offset=offset))
-        json_data = self.client.request(method, url)
-        return json_data
+        if shallow:
+            url += '&shallow=true'
+        if fields is not None:
+            json_data = self.client.request_fields(url, fields)
+        else:
+            json_data = self.client.request(method, url)
+        return self.client.make_records(json_data, BuildRecord)
 
-    def recent(self, username, project, limit=1, offset=0, branch=None, status_filter=""):
+    def recent(self, username, project, limit=1, offset=0, branch=None,
+               status_filter="", shallow=False, fields=None):
         """Return status of recent builds for given project.
 
         Retrieves build statuses for given project and branch. If branch is
@@ -201,9 +596,14 @@ class Build(object):
              offset (int): Returns builds starting from given offset.
              branch (str): Optional branch name as string. If specified only
                  builds from given branch are returned.
-             status_filter (str): Restricts which builds are returned. Set to 
-                 "completed", "successful", "failed", "running", or defaults 
+             status_filter (str): Restricts which builds are returned. Set to
+                 "completed", "successful", "failed", "running", or defaults
                  to no filter.
+             shallow (bool): Ask the API for a shallow listing without
+                 steps and commit details.
+             fields (list): Keep only these keys of each build, dropping
+                 the others while the listing is decoded, e.g.
+                 ['build_num', 'status', 'branch', 'vcs_revision'].
 
         Returns:
             A list of dictionaries with information about each build.
@@ -211,18 +611,240 @@ class Build(object):
         method = 'GET'
         if branch is not None:
             url = ('/project/{username}/{project}/tree/{branch}?'
-                   'circle-token={token}&limit={limit}&offset={offset}&filter={status_filter}'.format(
+                   'circle-token={token}&limit={limit}&offset={offset}'
+                   '&filter={status_filter}'.format(
                        username=username, project=project, branch=branch,
                        token=self.client.api_token, limit=limit,
                        offset=offset, status_filter=status_filter))
         else:
             url = ('/project/{username}/{project}?'
-                   'circle-token={token}&limit={limit}&offset={offset}&filter={status_filter}'.format(
+                   'circle-token={token}&limit={limit}&offset={offset}'
+                   '&filter={status_filter}'.format(
                        username=username, project=project,
                        token=self.client.api_token, limit=limit,
                        offset=offset, status_filter=status_filter))
-        json_data = self.client.request(method, url)
-        return json_data
+        if shallow:
+            url += '&shallow=true'
+        if fields is not None:
+            json_data = self.client.request_fields(url, fields)
+        else:
+            json_data = self.client.request(method, url)
+        return self.client.make_records(json_data, BuildRecord)
+
+
+class Build(BuildEndpoints):
+    """Build endpoints with bulk, iteration and waiting helpers.
+
+    The helpers run blocking calls on worker threads and are only
+    available on CircleClient.
+    """
+
+    def __init__(self, client):
+        BuildEndpoints.__init__(self, client)
+        self.triggers = SingleFlight()
+
+    def trigger_many(self, items, concurrency=8, ordered=True, rate=None):
+        """Trigger builds of many projects and branches concurrently.
+
+        Identical triggers, same project, branch and parameters, that are
+        in flight at the same time, within this batch or from another
+        thread using the client, start a single build and share its
+        summary.
+
+        Args:
+            items: Iterable of (username, project, branch, build_params)
+                tuples; build_params is a dictionary or None.
+            concurrency (int): Maximum number of requests in flight.
+            ordered (bool): Return a list in the order of items, otherwise
+                a generator yielding results as they complete.
+            rate (float): Optional cap of triggers per second.
+
+        Returns:
+            Result tuples of (item, build summary, error).
+        """
+        from .ratelimit import TokenBucket
+        bucket = TokenBucket(rate, capacity=1) if rate else None
+
+        def trigger(username, project, branch, build_params=None):
+            params = build_params or {}
+            key = (username, project, branch,
+                   json.dumps(params, sort_keys=True))
+
+            def start():
+                if bucket is not None:
+                    bucket.acquire()
+                return self.trigger(username, project, branch, **params)
+            return self.triggers.do(key, start)
+
+        return run_many(trigger, items, concurrency, ordered)
+
+    def download_artifacts(self, username, project, build_num, dest,
+                           pattern='*', concurrency=4, chunk_size=1024 * 1024):
+        """Download artifacts of given build into dest directory.
+
+        Files are streamed to disk in chunks, several at a time, and
+        partially downloaded files are resumed.
+
+        Args:
+            dest (str): Directory the artifact paths are created under,
+                in a subdirectory per container node_index.
+            pattern (str): Glob matched against artifact paths.
+            concurrency (int): Number of files downloaded in parallel.
+            chunk_size (int): Bytes read into memory at a time.
+
+        Returns:
+            A list of Download tuples with per-file size, time and error.
+        """
+        from .artifacts import ArtifactDownloader
+        artifacts = self.artifacts(username, project, build_num)
+        downloader = ArtifactDownloader(self.client, concurrency, chunk_size)
+        return downloader.download(artifacts, dest, pattern)
+
+    def logs(self, **options):
+        """Return a LogFetcher streaming step logs with given options."""
+        from .logs import LogFetcher
+        return LogFetcher(self.client, **options)
+
+    def search_logs(self, keys, pattern, failed=False, concurrency=8):
+        """Yield LogMatch for lines of step logs matching pattern.
+
+        Args:
+            keys: Iterable of (username, project, build_num) tuples.
+            pattern: Regular expression, as a string or compiled.
+            failed (bool): Only search actions that failed.
+            concurrency (int): Number of logs streamed in parallel.
+        """
+        return self.logs(concurrency=concurrency).search(keys, pattern, failed)
+
+    def status_many(self, keys, concurrency=8, ordered=True):
+        """Return summaries of many builds fetched concurrently.
+
+        Args:
+            keys: Iterable of (username, project, build_num) tuples.
+            concurrency (int): Maximum number of requests in flight.
+            ordered (bool): Return a list in the order of keys, otherwise
+                a generator yielding results as they complete.
+
+        Returns:
+            Result tuples of (key, value, error); a failed build does not
+            abort the batch.
+        """
+        return run_many(self.status, keys, concurrency, ordered)
+
+    def artifacts_many(self, keys, concurrency=8, ordered=True):
+        """Return artifacts of many builds fetched concurrently.
+
+        Takes the same arguments and returns the same results as
+        status_many().
+        """
+        return run_many(self.artifacts, keys, concurrency, ordered)
+
+    def tests_many(self, keys, concurrency=8, ordered=True):
+        """Return test metadata of many builds fetched concurrently.
+
+        Takes the same arguments and returns the same results as
+        status_many().
+        """
+        return run_many(self.tests, keys, concurrency, ordered)
+
+    def test_results(self, path, **options):
+        """Return a TestResults aggregate stored in SQLite file path."""
+        from .testresults import TestResults
+        return TestResults(self.client, path, **options)
+
+    def waiter(self, **options):
+        """Return a BuildWaiter polling with given options."""
+        from .waiter import BuildWaiter
+        return BuildWaiter(self.client, **options)
+
+    def wait_for(self, username, project, build_num, timeout=None,
+                 callback=None, **options):
+        """Block until given build finished and return its summary.
+
+        Args:
+            timeout (float): Give up after this many seconds and raise
+                WaitTimeout.
+            callback: Optional callable receiving every status Transition.
+            options: BuildWaiter options, e.g. min_interval, max_interval.
+        """
+        key = (username, project, build_num)
+        return self.waiter(**options).wait_all([key], timeout, callback)[key]
+
+    def wait_all(self, keys, timeout=None, callback=None, **options):
+        """Block until all (username, project, build_num) builds finished.
+
+        Returns:
+            A dictionary of final build summaries keyed by key.
+        """
+        return self.waiter(**options).wait_all(keys, timeout, callback)
+
+    def wait_any(self, keys, timeout=None, callback=None, **options):
+        """Block until one of (username, project, build_num) builds finished.
+
+        Returns:
+            A (key, build summary) tuple of the first finished build.
+        """
+        return self.waiter(**options).wait_any(keys, timeout, callback)
+
+    def watch(self, keys, timeout=None, **options):
+        """Yield status Transitions of given builds until all finished."""
+        return self.waiter(**options).watch(keys, timeout)
+
+    def iter_recent(self, username, project, branch=None, status_filter="",
+                    since=None, until=None, page_size=100, prefetch=True,
+                    shallow=False, fields=None):
+        """Iterate over builds of given project, newest first.
+
+        Pages are fetched lazily; while one page is consumed the next one
+        is fetched in the background, so only two pages are held in memory.
+
+        Args:
+             username (str): Name of the user.
+             project (str): Name of the project.
+             branch (str): Optional branch name.
+             status_filter (str): Same as in recent().
+             since (int or datetime): Stop at builds older than this build
+                 number or queue date.
+             until (int or datetime): Skip builds newer than this build
+                 number or queue date.
+             page_size (int): Builds fetched per request, max=100.
+             prefetch (bool): Fetch the next page in the background.
+             shallow (bool): Same as in recent().
+             fields (list): Same as in recent(); keys needed to check the
+                 since and until bounds are always kept.
+
+        Returns:
+            A generator of dictionaries.
+        """
+        fields = _bound_fields(fields)
+
+        def fetch(offset):
+            return self.recent(username, project, limit=page_size,
+                               offset=offset, branch=branch,
+                               status_filter=status_filter,
+                               shallow=shallow, fields=fields)
+        return _iter_pages(fetch, page_size, since, until, prefetch)
+
+    def iter_recent_all_projects(self, since=None, until=None, page_size=100,
+                                 prefetch=True, shallow=False, fields=None):
+        """Iterate over recent builds across all projects, newest first.
+
+        Build numbers are not comparable across projects, so since and
+        until must be datetimes.
+
+        Returns:
+            A generator of dictionaries.
+        """
+        for bound in (since, until):
+            if bound is not None and not isinstance(bound, datetime.datetime):
+                raise TypeError('since and until must be datetimes')
+
+        fields = _bound_fields(fields)
+
+        def fetch(offset):
+            return self.recent_all_projects(limit=page_size, offset=offset,
+                                            shallow=shallow, fields=fields)
+        return _iter_pages(fetch, page_size, since, until, prefetch)
 
 
 class Cache(object):
@@ -239,3 +861,115 @@ class Cache(object):
                                              token=self.client.api_token))
         json_data = self.client.request(method, url)
         return json_data
+
+
+def fast_json_loads():
+    """Return the fastest installed JSON decoder: orjson, ujson or json."""
+    for name in ('orjson', 'ujson'):
+        try:
+            return importlib.import_module(name).loads
+        except ImportError:
+            pass
+    return json.loads
+
+
+def project_fields(json_data, fields):
+    """Return payload, or each item of a list payload, with only fields."""
+    if isinstance(json_data, list):
+        return [project_fields(item, fields) for item in json_data]
+    return dict((key, json_data[key]) for key in fields if key in json_data)
+
+
+def decode_fields(content, fields):
+    """Decode JSON payload keeping only fields of it, or of each list item.
+
+    List payloads are decoded one item at a time, and every item is
+    projected before the next one is decoded, so the whole listing is
+    never held in memory at once. Each item is still decoded in full, so
+    decoding takes as long as with json.loads().
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    pos = len(content) - len(content.lstrip())
+    if not content.startswith('[', pos):
+        return project_fields(json.loads(content), fields)
+    items = []
+    pos += 1
+    while True:
+        pos = _SEPARATORS.match(content, pos).end()
+        if pos == len(content):
+            raise ValueError('truncated JSON array')
+        if content[pos] == ']':
+            return items
+        item, pos = _decoder.raw_decode(content, pos)
+        items.append(project_fields(item, fields))
+
+
+def is_finished(build):
+    """Return True if build reached a terminal state and will not change."""
+    return (build.get('lifecycle') == 'finished' or
+            build.get('status') in FINISHED_STATUSES)
+
+
+def parse_time(value):
+    """Parse CircleCI ISO 8601 timestamp into an aware UTC datetime."""
+    if value is None:
+        return None
+    value = value.rstrip('Z').split('.')[0]
+    parsed = datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S')
+    return parsed.replace(tzinfo=UTC)
+
+
+def _build_key(build, bound):
+    """Return the build attribute comparable with given bound."""
+    if isinstance(bound, datetime.datetime):
+        return parse_time(build.get('queued_at') or build.get('start_time'))
+    return build.get('build_num')
+
+
+def _bound_fields(fields):
+    if fields is None:
+        return None
+    return list(fields) + ['build_num', 'queued_at', 'start_time']
+
+
+def _as_utc(bound):
+    if isinstance(bound, datetime.datetime) and bound.tzinfo is None:
+        return bound.replace(tzinfo=UTC)
+    return bound
+
+
+def _iter_pages(fetch, page_size, since=None, until=None, prefetch=True):
+    """Yield builds from offset paginated fetch(offset) calls.
+
+    Builds are expected newest first. Iteration stops at the first build
+    older than since or when a short page signals the end of history.
+    """
+    since, until = _as_utc(since), _as_utc(until)
+    from concurrent.futures import ThreadPoolExecutor
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        offset = 0
+        page = fetch(offset)
+        while page:
+            offset += len(page)
+            last = len(page) < page_size
+            pending = None
+            if executor is not None and not last:
+                pending = executor.submit(fetch, offset)
+            for build in page:
+                if until is not None:
+                    key = _build_key(build, until)
+                    if key is not None and key > until:
+                        continue
+                if since is not None:
+                    key = _build_key(build, since)
+                    if key is not None and key < since:
+                        return
+                yield build
+            if last:
+                return
+            page = pending.result() if pending is not None else fetch(offset)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""Command line interface streaming CircleCI API results as NDJSON.
+
+Every command takes one or more targets, or '-' to read them from
+standard input, and prints one JSON line per target as soon as it
+completes::
+
+    circleclient status qba73/nc/42 qba73/nc/43
+    circleclient recent qba73/nc --limit 5
+    circleclient trigger qba73/nc/release -p DEPLOY=true
+    circleclient cache clear qba73/nc qba73/bs
+
+The API token is read from --token or the CIRCLE_TOKEN environment
+variable. The exit status is 1 if any target failed.
+
+Only argparse and json are imported at start-up; the client and its
+HTTP stack are imported once arguments are parsed.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+
+def build_target(text):
+    """Parse 'username/project/build_num'."""
+    parts = text.split('/')
+    if len(parts) != 3 or not parts[2].isdigit():
+        raise ValueError('expected username/project/build_num: ' + text)
+    return parts[0], parts[1], int(parts[2])
+
+
+def project_target(text):
+    """Parse 'username/project'."""
+    parts = text.split('/')
+    if len(parts) != 2 or not all(parts):
+        raise ValueError('expected username/project: ' + text)
+    return parts[0], parts[1]
+
+
+def branch_target(text):
+    """Parse 'username/project/branch'; the branch may contain slashes."""
+    parts = text.split('/', 2)
+    if len(parts) != 3 or not all(parts):
+        raise ValueError('expected username/project/branch: ' + text)
+    return parts[0], parts[1], parts[2]
+
+
+def status(client, target, args):
+    return client.build.status(*target)
+
+
+def artifacts(client, target, args):
+    return client.build.artifacts(*target)
+
+
+def retry(client, target, args):
+    return client.build.retry(*target)
+
+
+def cancel(client, target, args):
+    return client.build.cancel(*target)
+
+
+def recent(client, target, args):
+    return client.build.recent(target[0], target[1], limit=args.limit,
+                               offset=args.offset, branch=args.branch,
+                               status_filter=args.filter,
+                               shallow=args.shallow)
+
+
+def trigger(client, target, args):
+    return client.build.trigger(*target, **dict(args.params))
+
+
+def cache_clear(client, target, args):
+    return client.cache.clear(*target)
+
+
+COMMANDS = {
+    'status': (status, build_target),
+    'artifacts': (artifacts, build_target),
+    'retry': (retry, build_target),
+    'cancel': (cancel, build_target),
+    'recent': (recent, project_target),
+    'trigger': (trigger, branch_target),
+    'cache-clear': (cache_clear, project_target),
+}
+
+
+def build_param(text):
+    key, sep, value = text.partition('=')
+    if not sep or not key:
+        raise argparse.ArgumentTypeError('expected KEY=VALUE: ' + text)
+    return key, value
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        prog='circleclient',
+        description='Query CircleCI and stream results as NDJSON.')
+    parser.add_argument('--version', action='store_true',
+                        help='print version and exit')
+    parser.add_argument('--token', default=os.environ.get('CIRCLE_TOKEN'),
+                        help='API token, defaults to $CIRCLE_TOKEN')
+    parser.add_argument('--endpoint', help='API root URL')
+    parser.add_argument('-j', '--concurrency', type=int, default=8,
+                        help='targets processed in parallel (default 8)')
+    parser.add_argument('--ordered', action='store_true',
+                        help='print results in target order')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    def command(name, target, help, **options):
+        sub = commands.add_parser(name, help=help, **options)
+        sub.add_argument('targets', nargs='+', metavar=target,
+                         help="one or more targets, '-' reads stdin")
+        return sub
+
+    command('status', 'USER/PROJECT/NUM', 'build summaries')
+    command('artifacts', 'USER/PROJECT/NUM', 'build artifacts')
+    command('retry', 'USER/PROJECT/NUM', 'retry builds')
+    command('cancel', 'USER/PROJECT/NUM', 'cancel builds')
+    sub = command('recent', 'USER/PROJECT', 'recent builds of projects')
+    sub.add_argument('--limit', type=int, default=30)
+    sub.add_argument('--offset', type=int, default=0)
+    sub.add_argument('--branch')
+    sub.add_argument('--filter', default='',
+                     choices=['', 'completed', 'successful', 'failed',
+                              'running'])
+    sub.add_argument('--shallow', action='store_true')
+    sub = command('trigger', 'USER/PROJECT/BRANCH', 'trigger new builds')
+    sub.add_argument('-p', '--param', dest='params', action='append',
+                     type=build_param, default=[], metavar='KEY=VALUE',
+                     help='build parameter, may be repeated')
+    cache = commands.add_parser('cache', help='build caches')
+    actions = cache.add_subparsers(dest='action', metavar='action')
+    sub = actions.add_parser('clear', help='clear build caches of projects')
+    sub.add_argument('targets', nargs='+', metavar='USER/PROJECT',
+                     help="one or more targets, '-' reads stdin")
+    return parser
+
+
+def read_targets(texts, stdin):
+    targets = []
+    for text in texts:
+        if text == '-':
+            targets.extend(stdin.read().split())
+        else:
+            targets.append(text)
+    return targets
+
+
+def emit(stdout, target, value=None, error=None):
+    line = {'target': target}
+    if error is None:
+        line['result'] = value
+    else:
+        line['error'] = str(error)
+        line['type'] = type(error).__name__
+    from .records import json_default
+    stdout.write(json.dumps(line, separators=(',', ':'),
+                            default=json_default) + '\n')
+    stdout.flush()
+
+
+def main(argv=None, stdin=None, stdout=None):
+    """Run the command line interface and return the exit status."""
+    stdin = sys.stdin if stdin is None else stdin
+    stdout = sys.stdout if stdout is None else stdout
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    if args.version:
+        from . import __version__
+        stdout.write(__version__ + '\n')
+        return 0
+    name = args.command
+    if name == 'cache':
+        name = 'cache-clear' if args.action == 'clear' else None
+    if name is None:
+        parser.print_usage(sys.stderr)
+        return 2
+    if not args.token:
+        parser.error('API token required: pass --token or set CIRCLE_TOKEN')
+    func, parse = COMMANDS[name]
+    texts = read_targets(args.targets, stdin)
+    try:
+        targets = [parse(text) for text in texts]
+    except ValueError as error:
+        parser.error(str(error))
+
+    from .bulk import run_many
+    from .circleclient import CircleClient
+
+    client = CircleClient(args.token, endpoint=args.endpoint,
+                          pool_maxsize=max(1, args.concurrency))
+    labels = dict(zip(targets, texts))
+    failed = 0
+    with client:
+        if len(targets) == 1:
+            # A single target runs on this thread, without a worker pool.
+            try:
+                emit(stdout, texts[0], func(client, targets[0], args))
+            except Exception as error:
+                emit(stdout, texts[0], error=error)
+                failed += 1
+        else:
+            results = run_many(lambda *target: func(client, target, args),
+                               targets, args.concurrency, args.ordered)
+            for result in results:
+                emit(stdout, labels[result.key], result.value, result.error)
+                failed += 0 if result.ok else 1
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""Export complete build histories across a pool of processes."""
+
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .bulk import run_many
+from .circleclient import CircleClient
+from .records import as_dict, json_default
+
+
+FORMATS = {
+    'ndjson': '.ndjson',
+    'columns': '.columns.ndjson',
+}
+
+CHECKPOINT = 'checkpoint.json'
+
+
+Shard = namedtuple('Shard', ['username', 'project', 'low', 'high', 'offset'])
+Shard.__doc__ = """Builds low < build_num <= high of a project.
+
+offset is where the shard is expected to start in Build.recent pages.
+"""
+
+CrawlResult = namedtuple('CrawlResult', ['shards', 'builds', 'requests',
+                                         'failed'])
+CrawlResult.__doc__ = """Outcome of a crawl.
+
+failed holds (shard, error) pairs; those shards are retried on resume.
+"""
+
+
+def plan_project(username, project, top, shard_size):
+    """Split builds 1..top of project into shards, newest first."""
+    return [Shard(username, project, max(0, high - shard_size), high,
+                  top - high)
+            for high in range(top, 0, -shard_size)]
+
+
+def write_ndjson(output, builds):
+    output.write(''.join(json.dumps(build, separators=(',', ':'),
+                                    default=json_default) + '\n'
+                         for build in builds))
+
+
+def write_columns(output, builds):
+    """Write builds as one block of columns, keyed by field name."""
+    if not builds:
+        return
+    builds = [as_dict(build) for build in builds]
+    names = sorted(set().union(*builds))
+    block = dict((name, [build.get(name) for build in builds])
+                 for name in names)
+    output.write(json.dumps(block, separators=(',', ':')) + '\n')
+
+
+WRITERS = {
+    'ndjson': write_ndjson,
+    'columns': write_columns,
+}
+
+
+def read_builds(path):
+    """Yield builds of a crawler output file in either format."""
+    with open(path) as lines:
+        for line in lines:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if path.endswith(FORMATS['columns']):
+                names = list(data)
+                for values in zip(*(data[name] for name in names)):
+                    yield dict(zip(names, values))
+            else:
+                yield data
+
+
+def crawl_shard(client, shard, path, format='ndjson', page_size=100,
+                shallow=False):
+    """Fetch one shard, appending every page to path as it arrives.
+
+    Pages are written to path + '.part', which is renamed to path once
+    the shard is complete, so a finished file always holds a whole shard.
+
+    Returns:
+        A (builds written, requests sent) tuple.
+    """
+    write = WRITERS[format]
+    offset = shard.offset
+    started = False
+    written = requests = 0
+    part = path + '.part'
+    with open(part, 'w') as output:
+        while True:
+            page = client.build.recent(shard.username, shard.project,
+                                       limit=page_size, offset=offset,
+                                       shallow=shallow)
+            requests += 1
+            if not page:
+                break
+            nums = [build['build_num'] for build in page]
+            if not started and offset > 0 and max(nums) < shard.high:
+                # Started past the shard because build numbers have gaps.
+                offset = max(0, offset - max(page_size,
+                                             shard.high - max(nums)))
+                continue
+            started = True
+            builds = [build for build in page
+                      if shard.low < build['build_num'] <= shard.high]
+            write(output, builds)
+            output.flush()
+            written += len(builds)
+            if min(nums) <= shard.low or len(page) < page_size:
+                break
+            offset += len(page)
+    os.rename(part, path)
+    return written, requests
+
+
+_worker_client = None
+
+
+def _init_worker(client_options):
+    global _worker_client
+    _worker_client = CircleClient(**client_options)
+
+
+def _run_shard(shard, path, format, page_size, shallow):
+    return crawl_shard(_worker_client, shard, path, format, page_size,
+                       shallow)
+
+
+class HistoryCrawler(object):
+    """Crawl build histories of many projects into a directory.
+
+    Each project is split into shards of shard_size build numbers, which
+    are fetched by a pool of processes, each with its own pooled client.
+    Every shard is streamed to its own file under
+    directory/username/project/. Completed shards are recorded in a
+    checkpoint file, so running the same crawl again resumes it.
+    """
+
+    def __init__(self, api_token, directory, endpoint=None, processes=None,
+                 shard_size=1000, page_size=100, format='ndjson',
+                 shallow=False, client_options=None):
+        """Create crawler.
+
+        Args:
+            api_token (str): CircleCI API token.
+            directory (str): Output directory, created if missing.
+            endpoint (str): API root, defaults to the public v1.1 API.
+            processes (int): Worker processes, defaults to CPU count.
+            shard_size (int): Build numbers per shard.
+            page_size (int): Builds fetched per request, max=100.
+            format (str): 'ndjson' for one build per line, or 'columns'
+                for one block of columns per page.
+            shallow (bool): Fetch shallow build summaries.
+            client_options (dict): Extra CircleClient keyword arguments
+                for the worker clients; values must be picklable.
+        """
+        if format not in FORMATS:
+            raise ValueError('unknown format {0!r}'.format(format))
+        self.directory = directory
+        self.processes = processes
+        self.shard_size = shard_size
+        self.page_size = page_size
+        self.format = format
+        self.shallow = shallow
+        self.client_options = dict(client_options or {},
+                                   api_token=api_token, endpoint=endpoint)
+        self.checkpoint_path = os.path.join(directory, CHECKPOINT)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def shard_path(self, shard):
+        """Return output file of shard."""
+        name = '{0:010d}-{1:010d}{2}'.format(shard.low, shard.high,
+                                             FORMATS[self.format])
+        return os.path.join(self.directory,
+                            shard.username.replace(os.sep, '_'),
+                            shard.project.replace(os.sep, '_'), name)
+
+    def load_checkpoint(self):
+        """Return (planned shards, completed shards) of previous runs."""
+        if not os.path.exists(self.checkpoint_path):
+            return [], set()
+        with open(self.checkpoint_path) as data:
+            checkpoint = json.load(data)
+        return ([Shard(*shard) for shard in checkpoint['shards']],
+                set(Shard(*shard) for shard in checkpoint['done']))
+
+    def save_checkpoint(self, shards, done):
+        partial = self.checkpoint_path + '.part'
+        with open(partial, 'w') as data:
+            json.dump({'shards': shards, 'done': sorted(done)}, data)
+        os.replace(partial, self.checkpoint_path)
+
+    def plan(self, projects, client=None):
+        """Return shards of (username, project) pairs not planned before.
+
+        The newest build number of every project is looked up once, so
+        builds started after planning are left for the next crawl.
+        """
+        client = client or CircleClient(**self.client_options)
+
+        def top(username, project):
+            page = client.build.recent(username, project, limit=1,
+                                       shallow=True)
+            return page[0]['build_num'] if page else 0
+
+        shards = []
+        for result in run_many(top, [tuple(key) for key in projects]):
+            if not result.ok:
+                raise result.error
+            shards.extend(plan_project(result.key[0], result.key[1],
+                                       result.value, self.shard_size))
+        return shards
+
+    def crawl(self, projects, callback=None):
+        """Crawl projects, resuming from the checkpoint; return CrawlResult.
+
+        Args:
+            projects: Iterable of (username, project) pairs.
+            callback: Called with (shard, builds written) as shards finish.
+        """
+        shards, done = self.load_checkpoint()
+        planned = set((shard.username, shard.project) for shard in shards)
+        shards.extend(self.plan([key for key in projects
+                                 if tuple(key) not in planned]))
+        self.save_checkpoint(shards, done)
+        pending = [shard for shard in shards if shard not in done]
+        builds = requests = 0
+        failed = []
+        for shard in pending:
+            directory = os.path.dirname(self.shard_path(shard))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+        with ProcessPoolExecutor(self.processes, initializer=_init_worker,
+                                 initargs=(self.client_options,)) as pool:
+            futures = dict((pool.submit(_run_shard, shard,
+                                        self.shard_path(shard), self.format,
+                                        self.page_size, self.shallow), shard)
+                           for shard in pending)
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    written, sent = future.result()
+                except Exception as error:
+                    failed.append((shard, error))
+                    continue
+                builds += written
+                requests += sent
+                done.add(shard)
+                self.save_checkpoint(shards, done)
+                if callback is not None:
+                    callback(shard, written)
+        return CrawlResult(len(pending), builds, requests, failed)
+
+    def paths(self):
+        """Return output files of completed shards, newest builds first."""
+        shards, done = self.load_checkpoint()
+        return [self.shard_path(shard) for shard in shards if shard in done]
+
+    def iter_builds(self):
+        """Yield every crawled build, e.g. into BuildFrame.from_builds()."""
+        for path in self.paths():
+            for build in read_builds(path):
+                yield build
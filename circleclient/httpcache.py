@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""In-memory HTTP response cache for CircleClient GET requests."""
+
+import fnmatch
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheEntry(object):
+    """Cached response body with its freshness and validators."""
+
+    __slots__ = ('content', 'etag', 'last_modified', 'expires')
+
+    def __init__(self, content, etag=None, last_modified=None, expires=0):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    @property
+    def size(self):
+        return len(self.content)
+
+    def is_fresh(self, now=None):
+        return (time.time() if now is None else now) < self.expires
+
+    def conditional_headers(self):
+        """Return headers revalidating this entry with the server."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache(object):
+    """Memory-bounded LRU cache of GET response bodies.
+
+    Entries are fresh for a per-endpoint TTL. Stale entries carrying an
+    ETag or Last-Modified header are kept and revalidated with a
+    conditional request, so an unchanged resource costs a 304 and no body.
+
+    Attributes:
+        hits: Requests served from a fresh entry.
+        misses: Requests that went to the network.
+        revalidations: Stale entries confirmed by a 304 response.
+        evictions: Entries dropped to stay under max_bytes.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, default_ttl=30, ttls=None):
+        """Create response cache.
+
+        Args:
+            max_bytes (int): Upper bound for the total size of cached bodies.
+            default_ttl (float): Seconds a response stays fresh.
+            ttls (dict): Per-endpoint TTLs keyed by path glob, e.g.
+                {'/me': 300, '/project/*/*/*/artifacts': 3600}. The
+                first matching pattern wins, a TTL of 0 disables caching.
+        """
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = list((ttls or {}).items())
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ttl(self, url):
+        """Return TTL in seconds for given API url."""
+        path = url.split('?', 1)[0]
+        for pattern, ttl in self.ttls:
+            if fnmatch.fnmatchcase(path, pattern):
+                return ttl
+        return self.default_ttl
+
+    def lookup(self, url):
+        """Return cached entry for url, fresh or awaiting revalidation."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and entry.is_fresh():
+                self._entries.move_to_end(url)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def store(self, url, response):
+        """Cache body of a successful response."""
+        ttl = self.ttl(url)
+        headers = response.headers
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if 'no-store' in headers.get('Cache-Control', ''):
+            return
+        if ttl <= 0 and not (etag or last_modified):
+            return
+        entry = CacheEntry(response.content, etag, last_modified,
+                           time.time() + ttl)
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(url)
+            self._entries[url] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+                self.evictions += 1
+
+    def revalidated(self, url, entry):
+        """Mark entry fresh again after a 304 Not Modified response."""
+        with self._lock:
+            entry.expires = time.time() + self.ttl(url)
+            if self._entries.get(url) is entry:
+                self._entries.move_to_end(url)
+            self.revalidations += 1
+
+    def invalidate(self, url=None):
+        """Drop entry for url, or every entry if url is None."""
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+                self.size = 0
+            else:
+                self._discard(url)
+
+    def stats(self):
+        """Return cache counters as a dictionary."""
+        return {'hits': self.hits, 'misses': self.misses,
+                'revalidations': self.revalidations,
+                'evictions': self.evictions,
+                'entries': len(self._entries), 'bytes': self.size}
+
+    def _discard(self, url):
+        entry = self._entries.pop(url, None)
+        if entry is not None:
+            self.size -= entry.size
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""Fetch and search build step logs concurrently with bounded memory."""
+
+import codecs
+import json
+import os
+import queue
+import re
+import threading
+from collections import namedtuple
+
+from .bulk import run_many
+from .circleclient import CircleClientError
+
+
+FAILED_ACTION_STATUSES = frozenset(['failed', 'timedout',
+                                    'infrastructure_fail'])
+
+_SEPARATORS = re.compile(r'[\s,]*')
+_STRUCTURE = re.compile(r'["{}\[\]]')
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_SCALAR_END = re.compile(r'[\s,\]]')
+
+
+ActionLog = namedtuple('ActionLog', ['key', 'step', 'index', 'status', 'url'])
+ActionLog.__doc__ = """Log of one action of a build step.
+
+Attributes:
+    key: (username, project, build_num) of the build.
+    step: Step name.
+    index: Action index, i.e. the container that ran the step.
+    status: Action status.
+    url: Pre-signed URL of the JSON encoded output.
+"""
+
+LogMatch = namedtuple('LogMatch', ['log', 'line_number', 'line', 'match'])
+LogMatch.__doc__ = """Log line matching a search pattern.
+
+Attributes:
+    log: ActionLog the line was found in.
+    line_number: 1-based line number within the action output.
+    line: Matching line without trailing newline.
+    match: re match object of the pattern on line.
+"""
+
+
+def is_failed(action):
+    """Return True if action failed, timed out or hit an infrastructure
+    error."""
+    return bool(action.get('failed') or action.get('timedout') or
+                action.get('status') in FAILED_ACTION_STATUSES)
+
+
+def action_logs(key, build, failed=False):
+    """Return ActionLog of every action of build that has output."""
+    logs = []
+    for step in build.get('steps') or []:
+        for action in step.get('actions') or []:
+            if (not action.get('has_output', True) or
+                    not action.get('output_url')):
+                continue
+            if failed and not is_failed(action):
+                continue
+            logs.append(ActionLog(tuple(key), step.get('name'),
+                                  action.get('index'), action.get('status'),
+                                  action['output_url']))
+    return logs
+
+
+class _ElementScanner(object):
+    """Find the end of one JSON value fed to it piece by piece.
+
+    Every character is looked at once: runs of string content and of
+    text between brackets are skipped by regular expressions, so
+    scanning is linear in the size of the value.
+    """
+
+    __slots__ = ('scalar', 'depth', 'in_string', 'escaped', 'pieces')
+
+    def __init__(self, first):
+        self.scalar = first not in '{["'
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.pieces = []
+
+    def scan(self, text, pos):
+        """Return end of the value in text, None if it continues."""
+        if self.scalar:
+            match = _SCALAR_END.search(text, pos)
+            return match.start() if match else None
+        end = len(text)
+        while pos < end:
+            if self.escaped:
+                pos += 1
+                self.escaped = False
+            elif self.in_string:
+                pos = _STRING_BODY.match(text, pos).end()
+                if pos == end:
+                    break
+                if text[pos] == '\\':
+                    # A backslash ending the piece escapes the next one.
+                    self.escaped = True
+                    break
+                pos += 1
+                self.in_string = False
+                if self.depth == 0:
+                    return pos
+            else:
+                match = _STRUCTURE.search(text, pos)
+                if match is None:
+                    break
+                pos = match.end()
+                char = match.group()
+                if char == '"':
+                    self.in_string = True
+                elif char in '{[':
+                    self.depth += 1
+                else:
+                    self.depth -= 1
+                    if self.depth == 0:
+                        return pos
+        return None
+
+
+def iter_json_array(chunks):
+    """Yield elements of a JSON array read from an iterable of byte chunks.
+
+    Every chunk is scanned once for the end of the current element, which
+    is decoded as soon as it is complete, so decoding time is linear in
+    the input size. Only the current chunk and the element being read are
+    held in memory: arrays of any length are decoded in bounded space,
+    but a single large element, such as one huge log message, is held in
+    full.
+
+    Raises:
+        ValueError: Input is not a JSON array or ends prematurely.
+    """
+    utf8 = codecs.getincrementaldecoder('utf-8')('replace')
+    started = False
+    element = None
+    chunks = iter(chunks)
+    for chunk in chunks:
+        text = utf8.decode(chunk)
+        pos = 0
+        if not started:
+            text = text.lstrip()
+            if not text:
+                continue
+            if text[0] != '[':
+                raise ValueError('expected a JSON array')
+            pos, started = 1, True
+        while True:
+            if element is None:
+                pos = _SEPARATORS.match(text, pos).end()
+                if pos == len(text):
+                    break
+                if text[pos] == ']':
+                    # Read to the end, so the connection can be reused.
+                    for chunk in chunks:
+                        pass
+                    return
+                element = _ElementScanner(text[pos])
+            start = pos
+            pos = element.scan(text, pos)
+            if pos is None:
+                element.pieces.append(text[start:])
+                break
+            element.pieces.append(text[start:pos])
+            value = json.loads(''.join(element.pieces))
+            element = None
+            yield value
+    if started:
+        raise ValueError('truncated JSON array')
+
+
+def iter_lines(messages):
+    """Yield output lines of log messages, joining lines split across them."""
+    partial = ''
+    for message in messages:
+        text = partial + (message.get('message') or '')
+        lines = text.split('\n')
+        partial = lines.pop()
+        for line in lines:
+            yield line.rstrip('\r')
+    if partial:
+        yield partial.rstrip('\r')
+
+
+class LogFetcher(object):
+    """Stream action logs of builds and search them concurrently.
+
+    Action outputs are JSON arrays of messages which are decoded while
+    they download, one chunk at a time.
+
+    Attributes:
+        errors: (key or ActionLog, exception) pairs of builds and logs
+            that could not be fetched during the last search or save.
+    """
+
+    def __init__(self, client, concurrency=8, chunk_size=64 * 1024,
+                 queue_size=1000):
+        """Create fetcher.
+
+        Args:
+            client: An instance of CircleClient object.
+            concurrency (int): Number of logs streamed in parallel.
+            chunk_size (int): Bytes read into memory at a time.
+            queue_size (int): Matches buffered before workers pause.
+        """
+        self.client = client
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.errors = []
+
+    def logs(self, keys, failed=False):
+        """Return ActionLogs of many builds, fetching statuses concurrently.
+
+        Args:
+            keys: Iterable of (username, project, build_num) tuples.
+            failed (bool): Only actions that failed.
+        """
+        logs = []
+        for result in run_many(self.client.build.status, keys,
+                               self.concurrency, ordered=True):
+            if result.ok:
+                logs.extend(action_logs(result.key, result.value, failed))
+            else:
+                self.errors.append((result.key, result.error))
+        return logs
+
+    def open(self, url):
+        """Return streaming response of url, retrying transient failures."""
+        policy = self.client.retry_policy
+        attempt = 0
+        while True:
+            try:
+                return self.client.stream(url)
+            except CircleClientError as error:
+                if not policy.is_retryable('GET', error, attempt):
+                    raise
+                policy.sleep(policy.backoff(attempt, error))
+                attempt += 1
+
+    def messages(self, log):
+        """Yield messages of one action log as they are downloaded."""
+        with self.open(log.url) as response:
+            for message in iter_json_array(
+                    response.iter_content(self.chunk_size)):
+                yield message
+
+    def lines(self, log):
+        """Yield output lines of one action log as they are downloaded."""
+        return iter_lines(self.messages(log))
+
+    def search(self, keys, pattern, failed=False, flags=0):
+        """Yield LogMatch for every matching line, as soon as it is found.
+
+        Logs are streamed by concurrency worker threads; matches from
+        different logs interleave. Workers pause while queue_size matches
+        wait to be consumed, and stop when the generator is closed.
+
+        Args:
+            keys: Iterable of (username, project, build_num) tuples.
+            pattern: Regular expression, as a string or compiled.
+            failed (bool): Only search actions that failed.
+            flags (int): re flags used to compile a string pattern.
+        """
+        self.errors = []
+        regex = pattern
+        if isinstance(pattern, str):
+            regex = re.compile(pattern, flags)
+        logs = self.logs(keys, failed)
+        found = queue.Queue(self.queue_size)
+        pending = queue.Queue()
+        for log in logs:
+            pending.put(log)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    found.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def work():
+            try:
+                while not stop.is_set():
+                    try:
+                        log = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        for number, line in enumerate(self.lines(log), 1):
+                            if stop.is_set():
+                                return
+                            match = regex.search(line)
+                            if match and not put(LogMatch(log, number, line,
+                                                          match)):
+                                return
+                    except Exception as error:
+                        self.errors.append((log, error))
+            finally:
+                put(done)
+
+        workers = [threading.Thread(target=work)
+                   for _ in range(min(self.concurrency, len(logs)))]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        try:
+            running = len(workers)
+            while running:
+                item = found.get()
+                if item is done:
+                    running -= 1
+                else:
+                    yield item
+        finally:
+            stop.set()
+
+    def save(self, keys, dest, failed=False):
+        """Write decoded action logs of builds to text files under dest.
+
+        Files are named username/project/build_num/step-index.log.
+
+        Returns:
+            A list of written paths.
+        """
+        self.errors = []
+
+        def write(log):
+            username, project, build_num = log.key
+            name = '{0}-{1}.log'.format(
+                re.sub(r'[^\w.-]+', '_', log.step or 'step'), log.index)
+            directory = os.path.join(dest, username, project, str(build_num))
+            if not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    if not os.path.isdir(directory):
+                        raise
+            path = os.path.join(directory, name)
+            with open(path, 'w') as output:
+                for line in self.lines(log):
+                    output.write(line + '\n')
+            return path
+
+        paths = []
+        calls = [(log,) for log in self.logs(keys, failed)]
+        for result in run_many(write, calls, self.concurrency):
+            if result.ok:
+                paths.append(result.value)
+            else:
+                self.errors.append((result.key[0], result.error))
+        return paths
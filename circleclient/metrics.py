@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""Request instrumentation hooks and metric collectors."""
+
+import bisect
+import re
+import threading
+from collections import namedtuple
+
+
+RequestEvent = namedtuple('RequestEvent', ['method', 'route', 'status',
+                                           'latency', 'response_size',
+                                           'retries', 'error'])
+RequestEvent.__doc__ = """Outcome of one API request, retries included.
+
+Attributes:
+    method: HTTP method.
+    route: URL template without query string and token, e.g.
+        '/project/{username}/{project}/{build_num}'.
+    status: HTTP status code, None if no response was received.
+    latency: Seconds from the first attempt to the final outcome.
+    response_size: Bytes of the final response body.
+    retries: Number of attempts after the first one.
+    error: Raised exception, None on success.
+"""
+
+ROUTES = [
+    (re.compile(r'^/project/[^/]+/[^/]+/tree/.+$'),
+     '/project/{username}/{project}/tree/{branch}'),
+    (re.compile(r'^/project/[^/]+/[^/]+/build-cache$'),
+     '/project/{username}/{project}/build-cache'),
+    (re.compile(r'^/project/[^/]+/[^/]+/\d+/([a-z-]+)$'),
+     '/project/{username}/{project}/{build_num}/\\1'),
+    (re.compile(r'^/project/[^/]+/[^/]+/\d+$'),
+     '/project/{username}/{project}/{build_num}'),
+    (re.compile(r'^/project/[^/]+/[^/]+$'),
+     '/project/{username}/{project}'),
+]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+
+def route_template(url):
+    """Return route template of an API url, dropping the query string."""
+    path = url.split('?', 1)[0]
+    for pattern, template in ROUTES:
+        if pattern.match(path):
+            return pattern.sub(template, path)
+    return path
+
+
+def download_route(url):
+    """Return route template of an absolute download URL, e.g. an artifact."""
+    scheme, _, rest = url.partition('://')
+    return '{0}://{1}/{{path}}'.format(scheme, rest.split('/', 1)[0])
+
+
+def _labels(labels):
+    return ','.join('{0}="{1}"'.format(name, str(value).replace('"', '\\"'))
+                    for name, value in labels)
+
+
+class MetricsCollector(object):
+    """Count requests and record latency histograms per route.
+
+    Install it as an after-request hook::
+
+        client.add_hook(after=MetricsCollector())
+
+    Attributes:
+        buckets: Upper bounds of the latency histogram in seconds.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='circleclient'):
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._requests = {}
+        self._bytes = {}
+        self._retries = {}
+        self._latency = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        """Record a RequestEvent."""
+        route = (('method', event.method), ('route', event.route))
+        status = route + (('status', str(event.status or 'error')),)
+        index = bisect.bisect_left(self.buckets, event.latency)
+        with self._lock:
+            self._requests[status] = self._requests.get(status, 0) + 1
+            self._bytes[route] = (self._bytes.get(route, 0) +
+                                  (event.response_size or 0))
+            self._retries[route] = self._retries.get(route, 0) + event.retries
+            histogram = self._latency.get(route)
+            if histogram is None:
+                histogram = self._latency[route] = [
+                    [0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][index] += 1
+            histogram[1] += event.latency
+
+    def reset(self):
+        with self._lock:
+            self._requests.clear()
+            self._bytes.clear()
+            self._retries.clear()
+            self._latency.clear()
+
+    def snapshot(self):
+        """Return current metric values as plain dictionaries.
+
+        Counters are keyed by (method, route) or (method, route, status)
+        tuples; histograms hold cumulative bucket counts, sum and count.
+        """
+        with self._lock:
+            latency = {}
+            for route, (counts, total) in self._latency.items():
+                cumulative = []
+                running = 0
+                for count in counts:
+                    running += count
+                    cumulative.append(running)
+                latency[tuple(v for _, v in route)] = {
+                    'buckets': dict(zip(self.buckets + (float('inf'),),
+                                        cumulative)),
+                    'sum': total, 'count': running}
+            return {
+                'requests': dict((tuple(v for _, v in key), value)
+                                 for key, value in self._requests.items()),
+                'response_bytes': dict((tuple(v for _, v in key), value)
+                                       for key, value in self._bytes.items()),
+                'retries': dict((tuple(v for _, v in key), value)
+                                for key, value in self._retries.items()),
+                'latency': latency,
+            }
+
+    def to_prometheus(self):
+        """Return metrics in the Prometheus text exposition format."""
+        name = self.prefix
+        lines = []
+        with self._lock:
+            lines.append('# HELP {0}_requests_total API requests '
+                         'made.'.format(name))
+            lines.append('# TYPE {0}_requests_total counter'.format(name))
+            for labels, value in sorted(self._requests.items()):
+                lines.append('{0}_requests_total{{{1}}} {2}'.format(
+                    name, _labels(labels), value))
+            lines.append('# HELP {0}_response_bytes_total Response body bytes '
+                         'received.'.format(name))
+            lines.append('# TYPE {0}_response_bytes_total '
+                         'counter'.format(name))
+            for labels, value in sorted(self._bytes.items()):
+                lines.append('{0}_response_bytes_total{{{1}}} {2}'.format(
+                    name, _labels(labels), value))
+            lines.append('# HELP {0}_retries_total Requests sent again after '
+                         'a transient failure.'.format(name))
+            lines.append('# TYPE {0}_retries_total counter'.format(name))
+            for labels, value in sorted(self._retries.items()):
+                lines.append('{0}_retries_total{{{1}}} {2}'.format(
+                    name, _labels(labels), value))
+            lines.append('# HELP {0}_request_duration_seconds Request latency '
+                         'including retries.'.format(name))
+            lines.append('# TYPE {0}_request_duration_seconds '
+                         'histogram'.format(name))
+            for labels, (counts, total) in sorted(self._latency.items()):
+                running = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    running += count
+                    lines.append('{0}_request_duration_seconds_bucket'
+                                 '{{{1}}} {2}'.format(
+                                     name, _labels(labels + (('le', bound),)),
+                                     running))
+                lines.append('{0}_request_duration_seconds_sum'
+                             '{{{1}}} {2}'.format(
+                                 name, _labels(labels), total))
+                lines.append('{0}_request_duration_seconds_count'
+                             '{{{1}}} {2}'.format(
+                                 name, _labels(labels), running))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""Incrementally synced local mirror of build history."""
+
+import json
+import sqlite3
+import threading
+from collections import namedtuple
+
+from .bulk import run_many
+from .circleclient import is_finished
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    username TEXT NOT NULL,
+    project TEXT NOT NULL,
+    build_num INTEGER NOT NULL,
+    finished INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (username, project, build_num)
+);
+CREATE INDEX IF NOT EXISTS builds_unfinished
+    ON builds (username, project, finished);
+CREATE TABLE IF NOT EXISTS synced (
+    username TEXT NOT NULL,
+    project TEXT NOT NULL,
+    build_num INTEGER NOT NULL,
+    PRIMARY KEY (username, project)
+);
+"""
+
+
+SyncResult = namedtuple('SyncResult', ['username', 'project', 'added',
+                                       'updated', 'requests'])
+SyncResult.__doc__ = """Outcome of syncing one project."""
+
+
+def _as_dict(build):
+    return build.to_dict() if hasattr(build, 'to_dict') else build
+
+
+class BuildMirror(object):
+    """Local SQLite index of the build history of many projects.
+
+    A sync only downloads builds newer than the synced watermark, the
+    highest build number below which the whole history is mirrored, plus
+    builds that were still running at the last sync. Syncing an
+    up-to-date project costs a single Build.recent page. The watermark
+    only moves once a sync reached it or the end of history, so a sync
+    that was interrupted is completed by the next one.
+    """
+
+    def __init__(self, client, path, page_size=100):
+        """Open (or create) mirror.
+
+        Args:
+            client: An instance of CircleClient object.
+            path (str): SQLite database file.
+            page_size (int): Builds fetched per request, max=100.
+        """
+        self.client = client
+        self.path = path
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def __len__(self):
+        with self._lock:
+            cursor = self._db.execute('SELECT COUNT(*) FROM builds')
+            return cursor.fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def highest(self, username, project):
+        """Return highest mirrored build number of project, 0 if none."""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT MAX(build_num) FROM builds WHERE username=? AND '
+                'project=?', (username, project)).fetchone()
+        return row[0] or 0
+
+    def synced(self, username, project):
+        """Return build number the whole history is mirrored up to, or 0."""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT build_num FROM synced WHERE username=? AND '
+                'project=?', (username, project)).fetchone()
+        return row[0] if row else 0
+
+    def unfinished(self, username, project):
+        """Return numbers of mirrored builds that were still running."""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT build_num FROM builds WHERE username=? AND project=? '
+                'AND finished=0', (username, project)).fetchall()
+        return [row[0] for row in rows]
+
+    def builds(self, username, project, since=None):
+        """Yield mirrored builds of project, newest first.
+
+        Args:
+            since (int): Only builds with this or a higher build number.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT payload FROM builds WHERE username=? AND project=? '
+                'AND build_num>=? ORDER BY build_num DESC',
+                (username, project, since or 0)).fetchall()
+        for row in rows:
+            yield json.loads(row[0])
+
+    def save(self, username, project, builds):
+        """Insert or replace given builds, return number of new ones."""
+        rows = [(username, project, build['build_num'],
+                 1 if is_finished(build) else 0, json.dumps(build))
+                for build in (_as_dict(build) for build in builds)]
+        with self._lock:
+            with self._db:
+                before = self._db.total_changes
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO builds VALUES (?, ?, ?, ?, ?)',
+                    rows)
+                added = self._db.total_changes - before
+                self._db.executemany(
+                    'UPDATE builds SET finished=?, payload=? WHERE '
+                    'username=? AND project=? AND build_num=?',
+                    [(row[3], row[4]) + row[:3] for row in rows])
+        return added
+
+    def sync_project(self, username, project):
+        """Bring one project up to date and return its SyncResult."""
+        synced = self.synced(username, project)
+        unfinished = set(self.unfinished(username, project))
+        added = updated = requests = 0
+        offset = 0
+        newest = oldest = None
+        while True:
+            page = self.client.build.recent(username, project,
+                                            limit=self.page_size,
+                                            offset=offset)
+            requests += 1
+            if not page:
+                break
+            page = [_as_dict(build) for build in page]
+            added += self.save(username, project, page)
+            nums = [build['build_num'] for build in page]
+            updated += len(unfinished.intersection(nums))
+            unfinished.difference_update(nums)
+            if newest is None:
+                newest = max(nums)
+            oldest = min(nums)
+            offset += len(page)
+            if oldest <= synced or len(page) < self.page_size:
+                break
+        if newest is not None and newest > synced:
+            with self._lock:
+                with self._db:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO synced VALUES (?, ?, ?)',
+                        (username, project, newest))
+        stale = [(username, project, num) for num in sorted(unfinished)
+                 if oldest is None or num < oldest]
+        for result in run_many(self.client.build.status, stale):
+            requests += 1
+            if result.ok:
+                self.save(username, project, [result.value])
+                updated += 1
+        return SyncResult(username, project, added, updated, requests)
+
+    def sync(self, projects, concurrency=4):
+        """Sync (username, project) pairs, several projects at a time.
+
+        Returns:
+            A list of Result tuples holding a SyncResult per project.
+        """
+        return run_many(self.sync_project, projects, concurrency)
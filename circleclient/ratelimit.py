@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""Client-side rate limiting of CircleCI API requests."""
+
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket.
+
+    Callers reserve tokens up front, even when the bucket is empty, and
+    then sleep off the deficit. Waiting callers are therefore spaced
+    exactly 1/rate apart instead of waking up together and retrying, so
+    throughput stays flat just under the limit.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """Create bucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Burst size, defaults to one second of rate.
+        """
+        self.rate = float(rate)
+        self.capacity = float(rate if capacity is None else capacity)
+        self._tokens = self.capacity
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Take tokens and return seconds to wait before using them."""
+        with self._lock:
+            self._tokens, self._updated, delay = self._take(
+                self._tokens, self._updated, tokens)
+        return delay
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _take(self, available, updated, tokens):
+        now = time.time()
+        available = min(self.capacity,
+                        available + (now - updated) * self.rate) - tokens
+        delay = -available / self.rate if available < 0 else 0.0
+        return available, now, delay
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket shared by processes through a locked state file.
+
+    Every process using the same path draws from one bucket. The file
+    holds the token count and update time and is guarded by flock, so it
+    requires a POSIX system.
+    """
+
+    _state = struct.Struct('dd')
+
+    def __init__(self, path, rate, capacity=None):
+        TokenBucket.__init__(self, rate, capacity)
+        self.path = path
+        self._fd = None
+        self._pid = None
+
+    @classmethod
+    def for_token(cls, api_token, rate, capacity=None, directory=None):
+        """Return bucket shared by every process using given API token."""
+        digest = hashlib.sha256(api_token.encode('utf-8')).hexdigest()[:16]
+        path = os.path.join(directory or tempfile.gettempdir(),
+                            'circleclient-{0}.bucket'.format(digest))
+        return cls(path, rate, capacity)
+
+    def reserve(self, tokens=1):
+        import fcntl
+        with self._lock:
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(fd, self._state.size, 0)
+                if len(data) == self._state.size:
+                    available, updated = self._state.unpack(data)
+                else:
+                    available, updated = self.capacity, time.time()
+                available, updated, delay = self._take(available, updated,
+                                                       tokens)
+                os.pwrite(fd, self._state.pack(available, updated), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        return delay
+
+    def close(self):
+        if self._fd is not None and self._pid == os.getpid():
+            os.close(self._fd)
+        self._fd = None
+
+    def _open(self):
+        # A forked child must not share the parent's open file description,
+        # flock would treat both processes as the lock owner.
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+
+def classify(method, url):
+    """Return endpoint class of a request: 'trigger', 'write' or 'read'."""
+    if method == 'GET':
+        return 'read'
+    if method == 'POST' and '/tree/' in url.split('?', 1)[0]:
+        return 'trigger'
+    return 'write'
+
+
+class RateLimiter(object):
+    """Pace requests made with one API token.
+
+    Every request takes a token from the default bucket and, if one is
+    configured for its endpoint class, from the class bucket as well.
+    Share one limiter between all clients using a token; use
+    FileTokenBucket to extend the limit across processes.
+    """
+
+    def __init__(self, default=None, classes=None, classify=classify):
+        """Create rate limiter.
+
+        Args:
+            default (TokenBucket): Bucket shared by all requests.
+            classes (dict): Buckets keyed by endpoint class, e.g.
+                {'trigger': TokenBucket(0.5)}.
+            classify: Callable mapping (method, url) to an endpoint class.
+        """
+        self.default = default
+        self.classes = classes or {}
+        self.classify = classify
+
+    def reserve(self, method, url):
+        """Take tokens for the request and return seconds to wait."""
+        delay = 0.0
+        if self.default is not None:
+            delay = self.default.reserve()
+        bucket = self.classes.get(self.classify(method, url))
+        if bucket is not None:
+            delay = max(delay, bucket.reserve())
+        return delay
+
+    def acquire(self, method, url):
+        """Block until the request may be sent."""
+        delay = self.reserve(method, url)
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Compact slotted records for builds, projects and artifacts.
+
+Records keep frequently used fields in ``__slots__`` and the rest of the
+payload as one compact JSON string that is decoded only when such a field
+is accessed. Low-cardinality strings such as statuses, branch and project
+names are interned, so 200k builds of one project share a handful of
+string objects.
+"""
+
+import json
+import sys
+
+
+class Record(object):
+    """Base class of slotted API records.
+
+    A record supports attribute access for every field of the payload,
+    and the read-only dict interface (``record['status']``,
+    ``record.get('steps')``, ``'why' in record``) so code written for
+    plain dictionaries keeps working. Slots of fields missing from the
+    payload stay unset: the dict interface treats them as absent, while
+    attribute access returns None.
+    """
+
+    __slots__ = ('_extra',)
+
+    fields = ()
+    interned = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        """Return record holding given API payload."""
+        record = cls.__new__(cls)
+        known = cls._known
+        for name in cls.fields:
+            if name not in data:
+                continue
+            value = data[name]
+            if name in cls._interned and value.__class__ is str:
+                value = sys.intern(value)
+            setattr(record, name, value)
+        extra = dict((key, value) for key, value in data.items()
+                     if key not in known)
+        record._extra = (json.dumps(extra, separators=(',', ':'))
+                         if extra else None)
+        return record
+
+    def extra(self):
+        """Return decoded rarely used fields as a new dictionary."""
+        return json.loads(self._extra) if self._extra else {}
+
+    def to_dict(self):
+        """Return the full payload as a plain dictionary."""
+        data = self.extra()
+        data.update(self._slotted())
+        return data
+
+    def _slotted(self):
+        # Yield (name, value) of the slots that were set.
+        for name in self.fields:
+            try:
+                yield name, object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+
+    def __getattr__(self, name):
+        # Only called for names missing from the slots or left unset.
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name in self._known:
+            return None
+        try:
+            return self.extra()[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if key in self._known:
+            try:
+                return object.__getattribute__(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        return self.extra()[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        values = ', '.join('{0}={1!r}'.format(name, getattr(self, name))
+                           for name in self.fields[:3])
+        return '{0}({1})'.format(self.__class__.__name__, values)
+
+
+def _record_class(name, fields, interned, doc):
+    cls = type(name, (Record,), {'__slots__': fields, '__doc__': doc,
+                                 'fields': fields, 'interned': interned})
+    cls._known = frozenset(fields)
+    cls._interned = frozenset(interned)
+    return cls
+
+
+BuildRecord = _record_class(
+    'BuildRecord',
+    ('build_num', 'username', 'reponame', 'branch', 'status', 'outcome',
+     'lifecycle', 'vcs_revision', 'subject', 'committer_name', 'why',
+     'queued_at', 'start_time', 'stop_time', 'build_time_millis',
+     'build_url'),
+    ('username', 'reponame', 'branch', 'status', 'outcome', 'lifecycle',
+     'committer_name', 'why'),
+    """Build summary; steps and other rarely used fields decode lazily.""")
+
+ProjectRecord = _record_class(
+    'ProjectRecord',
+    ('username', 'reponame', 'vcs_url', 'vcs_type', 'default_branch',
+     'following', 'oss'),
+    ('username', 'vcs_type', 'default_branch'),
+    """Followed project; branches and settings decode lazily.""")
+
+ArtifactRecord = _record_class(
+    'ArtifactRecord',
+    ('path', 'pretty_path', 'node_index', 'url'),
+    (),
+    """Build artifact.""")
+
+
+def as_dict(value):
+    """Return record as a plain dictionary, other values unchanged."""
+    return value.to_dict() if isinstance(value, Record) else value
+
+
+def json_default(value):
+    """Serialize records for json.dumps(..., default=json_default)."""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError('Object of type {0} is not JSON serializable'.format(
+        value.__class__.__name__))
+
+
+def make_records(json_data, record_type):
+    """Wrap payload, or each item of a list payload, in record_type."""
+    if isinstance(json_data, list):
+        return [record_type.from_dict(item) for item in json_data]
+    return record_type.from_dict(json_data)
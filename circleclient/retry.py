@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Retry policy for transient CircleCI API failures."""
+
+import email.utils
+import random
+import time
+
+from .circleclient import HTTPError, TransportError
+
+
+class RetryPolicy(object):
+    """Decide whether and when a failed request is sent again.
+
+    Delays grow exponentially with full jitter, so many clients throttled
+    at once do not retry in lockstep. A Retry-After header sent with a
+    429 or 503 response takes precedence over the computed delay; if it
+    asks for more than max_backoff, the error is raised instead of
+    blocking the caller that long.
+
+    Only idempotent GET and DELETE requests are retried by default; add
+    'POST' to methods to also retry triggers, retries and cancels.
+    """
+
+    def __init__(self, total=3, backoff_factor=0.5, max_backoff=30.0,
+                 jitter=True, statuses=(429, 502, 503, 504),
+                 methods=('GET', 'DELETE'), respect_retry_after=True,
+                 sleep=time.sleep):
+        """Create retry policy.
+
+        Args:
+            total (int): Maximum number of retries, 0 disables retrying.
+            backoff_factor (float): Base delay in seconds, doubled on
+                every attempt.
+            max_backoff (float): Upper bound for a single delay.
+            jitter (bool): Randomize delays between 0 and the bound.
+            statuses: HTTP status codes worth retrying.
+            methods: HTTP methods that may be retried.
+            respect_retry_after (bool): Honor Retry-After headers.
+        """
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(method.upper() for method in methods)
+        self.respect_retry_after = respect_retry_after
+        self.sleep = sleep
+
+    def is_retryable(self, method, error, attempt):
+        """Return True if request failed with error may be sent again."""
+        if attempt >= self.total or method.upper() not in self.methods:
+            return False
+        if isinstance(error, TransportError):
+            return True
+        if (not isinstance(error, HTTPError) or
+                error.status_code not in self.statuses):
+            return False
+        retry_after = error.retry_after
+        return not (self.respect_retry_after and retry_after is not None and
+                    retry_after > self.max_backoff)
+
+    def backoff(self, attempt, error=None):
+        """Return delay in seconds before retry number attempt + 1."""
+        retry_after = getattr(error, 'retry_after', None)
+        if self.respect_retry_after and retry_after is not None:
+            return min(self.max_backoff, retry_after)
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+
+def parse_retry_after(value):
+    """Return Retry-After header value in seconds, None if unparseable."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        parsed = email.utils.parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(0.0, email.utils.mktime_tz(parsed) - time.time())
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Collapse concurrent identical calls into one."""
+
+import threading
+
+
+class SingleFlight(object):
+    """Run at most one call per key at a time.
+
+    Callers arriving while a call with the same key is in flight wait for
+    it and share its result, or its exception, instead of making their
+    own call. Shared results are the same object, so callers must not
+    mutate them.
+
+    Attributes:
+        coalesced: Number of calls answered by another caller's call.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return number of calls in flight."""
+        return len(self._calls)
+
+    def do(self, key, func, *args, **kwargs):
+        """Return func(*args, **kwargs), shared with concurrent callers."""
+        from concurrent.futures import Future
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as error:
+            call.set_exception(error)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight(object):
+    """Run at most one coroutine per key at a time within an event loop.
+
+    The asyncio counterpart of SingleFlight. The shared call runs in its
+    own task and every caller, the first one included, awaits it through
+    a shield, so cancelling one of them does not cancel the shared call.
+
+    Attributes:
+        coalesced: Number of calls answered by another caller's call.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+
+    def __len__(self):
+        """Return number of calls in flight."""
+        return len(self._calls)
+
+    async def do(self, key, func, *args, **kwargs):
+        """Return await func(*args, **kwargs), shared with concurrent
+        callers."""
+        import asyncio
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+        else:
+            call = self._calls[key] = asyncio.ensure_future(
+                func(*args, **kwargs))
+
+            def done(call):
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                if not call.cancelled():
+                    # Mark the exception retrieved in case every caller
+                    # was cancelled before the call finished.
+                    call.exception()
+            call.add_done_callback(done)
+        return await asyncio.shield(call)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Persistent SQLite store for payloads of finished builds."""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    username TEXT NOT NULL,
+    project TEXT NOT NULL,
+    build_num INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (username, project, build_num, kind)
+);
+CREATE INDEX IF NOT EXISTS builds_accessed ON builds (accessed);
+"""
+
+
+class BuildStore(object):
+    """Store payloads of immutable builds in a local SQLite file.
+
+    A finished build never changes, so its status and artifacts can be
+    served from disk on every later run. Payloads are stored as zlib
+    compressed JSON; when the store grows over its limits the least
+    recently used builds are pruned.
+
+    Attributes:
+        hits: Lookups answered from the store.
+        misses: Lookups that were not in the store.
+    """
+
+    def __init__(self, path, max_entries=100000, max_bytes=None,
+                 prune_every=1000):
+        """Open (or create) store at given path.
+
+        Args:
+            path (str): SQLite database file, ':memory:' for a test store.
+            max_entries (int): Maximum number of stored payloads.
+            max_bytes (int): Maximum total size of compressed payloads.
+            prune_every (int): Enforce limits after this many writes.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def __len__(self):
+        with self._lock:
+            cursor = self._db.execute('SELECT COUNT(*) FROM builds')
+            return cursor.fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, username, project, build_num, kind='status'):
+        """Return stored payload or None."""
+        key = (username, project, int(build_num), kind)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT payload FROM builds WHERE username=? AND project=? '
+                'AND build_num=? AND kind=?', key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._db:
+                self._db.execute(
+                    'UPDATE builds SET accessed=? WHERE username=? AND '
+                    'project=? AND build_num=? AND kind=?',
+                    (time.time(),) + key)
+        return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+
+    def contains(self, username, project, build_num, kind='status'):
+        """Return True if a payload is stored for given build."""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT 1 FROM builds WHERE username=? AND project=? '
+                'AND build_num=? AND kind=?',
+                (username, project, int(build_num), kind)).fetchone()
+        return row is not None
+
+    def put(self, username, project, build_num, payload, kind='status'):
+        """Store payload of a finished build."""
+        blob = zlib.compress(json.dumps(payload).encode('utf-8'))
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO builds '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (username, project, int(build_num), kind,
+                     sqlite3.Binary(blob), len(blob), time.time()))
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune()
+
+    def prune(self):
+        """Delete least recently used payloads over the store limits."""
+        with self._lock:
+            return self._prune()
+
+    def compact(self):
+        """Prune the store and reclaim free pages of the database file."""
+        with self._lock:
+            removed = self._prune()
+            self._db.execute('VACUUM')
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _prune(self):
+        removed = 0
+        with self._db:
+            if self.max_entries is not None:
+                removed += self._db.execute(
+                    'DELETE FROM builds WHERE rowid IN (SELECT rowid FROM '
+                    'builds ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)).rowcount
+            if self.max_bytes is not None:
+                total = 0
+                cutoff = None
+                rows = self._db.execute(
+                    'SELECT size, accessed FROM builds ORDER BY accessed DESC')
+                for size, accessed in rows:
+                    total += size
+                    if total > self.max_bytes:
+                        cutoff = accessed
+                        break
+                if cutoff is not None:
+                    removed += self._db.execute(
+                        'DELETE FROM builds WHERE accessed <= ?',
+                        (cutoff,)).rowcount
+        return removed
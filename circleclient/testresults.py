@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""Incremental cross-build test result aggregate for flaky-test detection."""
+
+import sqlite3
+import threading
+from collections import namedtuple
+from itertools import groupby
+
+from .analytics import percentile
+from .circleclient import is_finished
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    username TEXT NOT NULL,
+    project TEXT NOT NULL,
+    build_num INTEGER NOT NULL,
+    aggregated INTEGER NOT NULL,
+    PRIMARY KEY (username, project, build_num)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    project TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (username, project, name)
+);
+CREATE TABLE IF NOT EXISTS results (
+    test_id INTEGER NOT NULL,
+    build_num INTEGER NOT NULL,
+    outcome INTEGER NOT NULL,
+    run_time REAL,
+    PRIMARY KEY (test_id, build_num)
+) WITHOUT ROWID;
+"""
+
+PASSED, FAILED, SKIPPED = 0, 1, 2
+
+OUTCOMES = {
+    'success': PASSED,
+    'passed': PASSED,
+    'failure': FAILED,
+    'failed': FAILED,
+    'error': FAILED,
+}
+
+
+RefreshResult = namedtuple('RefreshResult', ['username', 'project', 'added',
+                                             'pending', 'requests', 'errors'])
+RefreshResult.__doc__ = """Outcome of refreshing one project.
+
+Attributes:
+    added: Builds whose test results were aggregated.
+    pending: Builds seen running, aggregated once they finish.
+    requests: API requests sent.
+    errors: Builds whose tests could not be fetched; retried next time.
+"""
+
+TestStats = namedtuple('TestStats', ['name', 'runs', 'passed', 'failed',
+                                     'skipped', 'p50', 'p95', 'flip_rate'])
+TestStats.__doc__ = """Aggregated results of one test.
+
+Attributes:
+    name: Test name, 'classname::name' or 'file::name'.
+    runs: Builds the test was reported in.
+    p50, p95: Run time percentiles in seconds, skipped runs excluded.
+    flip_rate: Fraction of consecutive non-skipped runs whose outcome
+        differs from the previous run; 0 for stable, 1 for alternating.
+"""
+
+
+def qualified_name(test):
+    """Return stable name of a test entry of Build.tests."""
+    scope = test.get('classname') or test.get('file') or ''
+    name = test.get('name') or ''
+    return '{0}::{1}'.format(scope, name) if scope else name
+
+
+def summarize(name, runs):
+    """Return TestStats of (build_num, outcome, run_time) rows in build
+    order."""
+    counts = [0, 0, 0]
+    times = []
+    flips = 0
+    previous = None
+    for _, outcome, run_time in runs:
+        counts[outcome] += 1
+        if outcome == SKIPPED:
+            continue
+        if run_time is not None:
+            times.append(run_time)
+        if previous is not None and outcome != previous:
+            flips += 1
+        previous = outcome
+    judged = counts[PASSED] + counts[FAILED]
+    times.sort()
+    return TestStats(name, sum(counts), counts[PASSED], counts[FAILED],
+                     counts[SKIPPED], percentile(times, 50),
+                     percentile(times, 95),
+                     flips / float(judged - 1) if judged > 1 else 0.0)
+
+
+class TestResults(object):
+    """Per-test outcomes of many builds, kept in a local SQLite file.
+
+    refresh() only fetches tests of builds that finished since the last
+    refresh: new builds above the highest one seen, and builds that were
+    still running last time. Statistics are computed from the stored
+    outcomes, one test at a time.
+    """
+
+    def __init__(self, client, path, window=1000, page_size=100,
+                 concurrency=8):
+        """Open (or create) aggregate.
+
+        Args:
+            client: An instance of CircleClient object.
+            path (str): SQLite database file.
+            window (int): Most recent builds considered on every refresh.
+            page_size (int): Builds listed per request, max=100.
+            concurrency (int): Test metadata requests in flight.
+        """
+        self.client = client
+        self.path = path
+        self.window = window
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def builds(self, username, project, aggregated=True):
+        """Return build numbers aggregated, or pending, newest first."""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT build_num FROM builds WHERE username=? AND project=? '
+                'AND aggregated=? ORDER BY build_num DESC',
+                (username, project, 1 if aggregated else 0)).fetchall()
+        return [row[0] for row in rows]
+
+    def scan(self, username, project, known, pending):
+        """Return (finished, running, requests) of builds to aggregate.
+
+        Lists recent builds newest first until it passed every known and
+        pending build, or window builds.
+        """
+        highest = max(known) if known else 0
+        lowest = min(pending) if pending else highest
+        finished, running = [], []
+        offset = requests = 0
+        while offset < self.window:
+            page = self.client.build.recent(username, project,
+                                            limit=self.page_size,
+                                            offset=offset, shallow=True)
+            requests += 1
+            for build in page:
+                num = build['build_num']
+                if num in known:
+                    continue
+                (finished if is_finished(build) else running).append(num)
+            offset += len(page)
+            if (not page or len(page) < self.page_size or
+                    min(build['build_num'] for build in page) <= lowest):
+                break
+        return finished, running, requests
+
+    def refresh(self, username, project):
+        """Aggregate tests of newly finished builds, return RefreshResult."""
+        known = set(self.builds(username, project))
+        pending = set(self.builds(username, project, aggregated=False))
+        finished, running, requests = self.scan(username, project, known,
+                                                pending)
+        names = self._test_ids(username, project)
+        added = 0
+        errors = []
+        keys = [(username, project, num) for num in finished]
+        for result in self.client.build.tests_many(keys, self.concurrency,
+                                                   ordered=False):
+            requests += 1
+            if not result.ok:
+                errors.append(result.key[2])
+                continue
+            self._save(username, project, result.key[2], result.value, names)
+            added += 1
+        waiting = sorted(set(running).union(errors))
+        with self._lock:
+            with self._db:
+                # Pending builds that fell out of the window are given up.
+                self._db.execute(
+                    'DELETE FROM builds WHERE username=? AND project=? AND '
+                    'aggregated=0', (username, project))
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO builds VALUES (?, ?, ?, 0)',
+                    [(username, project, num) for num in waiting])
+        return RefreshResult(username, project, added, len(waiting),
+                             requests, errors)
+
+    def _test_ids(self, username, project):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT name, id FROM tests WHERE username=? AND project=?',
+                (username, project)).fetchall()
+        return dict(rows)
+
+    def _save(self, username, project, build_num, tests, names):
+        rows = {}
+        with self._lock:
+            with self._db:
+                for test in tests:
+                    name = qualified_name(test)
+                    test_id = names.get(name)
+                    if test_id is None:
+                        test_id = names[name] = self._db.execute(
+                            'INSERT INTO tests (username, project, name) '
+                            'VALUES (?, ?, ?)',
+                            (username, project, name)).lastrowid
+                    # A test reported twice, e.g. by parallel containers,
+                    # counts as failed if any of its runs failed.
+                    outcome = OUTCOMES.get(test.get('result'), SKIPPED)
+                    previous = rows.get(test_id)
+                    if previous is not None and previous[2] == FAILED:
+                        continue
+                    rows[test_id] = (test_id, build_num, outcome,
+                                     test.get('run_time'))
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                    rows.values())
+                self._db.execute(
+                    'INSERT OR REPLACE INTO builds VALUES (?, ?, ?, 1)',
+                    (username, project, build_num))
+
+    def stats(self, username, project, last=None):
+        """Yield TestStats of every test of project, ordered by name.
+
+        Args:
+            last (int): Only the most recent aggregated builds.
+        """
+        since = 0
+        if last:
+            recent = self.builds(username, project)[:last]
+            since = recent[-1] if recent else 0
+        with self._lock:
+            cursor = self._db.execute(
+                'SELECT t.name, r.build_num, r.outcome, r.run_time '
+                'FROM tests t JOIN results r ON r.test_id = t.id '
+                'WHERE t.username=? AND t.project=? AND r.build_num>=? '
+                'ORDER BY t.name, r.build_num',
+                (username, project, since))
+
+        def rows():
+            while True:
+                with self._lock:
+                    batch = cursor.fetchmany(10000)
+                if not batch:
+                    return
+                for row in batch:
+                    yield row
+
+        for name, runs in groupby(rows(), key=lambda row: row[0]):
+            yield summarize(name, (row[1:] for row in runs))
+
+    def flaky(self, username, project, last=None, min_runs=5,
+              min_flip_rate=0.05):
+        """Return TestStats of tests that both passed and failed, flakiest
+        first."""
+        found = [stats for stats in self.stats(username, project, last)
+                 if stats.passed and stats.failed and
+                 stats.runs >= min_runs and stats.flip_rate >= min_flip_rate]
+        found.sort(key=lambda stats: (-stats.flip_rate, stats.name))
+        return found
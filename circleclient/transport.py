@@ -0,0 +1,510 @@
+# -*- coding: utf-8 -*-
+"""Pluggable HTTP transports: pooled requests, recording and replay.
+
+CircleClient sends every API request through a transport object with a
+send(method, url, data, headers) method returning a response with
+status_code, reason, headers, content and ok attributes. Artifacts and
+step logs are downloaded with stream(method, url, headers), whose
+response is read in chunks with iter_content(chunk_size) and closed
+with close().
+"""
+
+import base64
+import gzip
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from .circleclient import TransportError
+
+
+SCRUBBED = '<scrubbed>'
+
+# Response headers kept in recordings; everything else is dropped.
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control',
+                    'Retry-After')
+
+
+class Headers(dict):
+    """Minimal case-insensitive header mapping for replayed responses."""
+
+    def __init__(self, headers=()):
+        dict.__init__(self, ((key.lower(), value)
+                             for key, value in dict(headers).items()))
+
+    def __getitem__(self, key):
+        return dict.__getitem__(self, key.lower())
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key.lower())
+
+    def get(self, key, default=None):
+        return dict.get(self, key.lower(), default)
+
+
+class Response(object):
+    """HTTP response served without a network round trip."""
+
+    __slots__ = ('status_code', 'reason', 'headers', 'content')
+
+    def __init__(self, status_code, reason, headers, content):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = Headers(headers)
+        self.content = content
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def iter_content(self, chunk_size=None):
+        """Yield body in chunks of at most chunk_size bytes."""
+        chunk_size = chunk_size or len(self.content) or 1
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class StreamingResponse(object):
+    """requests response read in chunks, raising TransportError on failure."""
+
+    def __init__(self, response):
+        self.response = response
+        self.status_code = response.status_code
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def iter_content(self, chunk_size=None):
+        import requests
+        try:
+            for chunk in self.response.iter_content(chunk_size):
+                yield chunk
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError) as error:
+            raise TransportError(str(error))
+
+    def close(self):
+        self.response.close()
+
+
+def scrub_url(url):
+    """Return path and query of url without host and circle-token."""
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, True)
+             if key != 'circle-token']
+    if not query:
+        return parts.path
+    return parts.path + '?' + urlencode(query)
+
+
+class Transport(object):
+    """Interface of CircleClient transports."""
+
+    def send(self, method, url, data=None, headers=None):
+        """Send one request and return its response.
+
+        Raises:
+            TransportError: Connection failed or timed out.
+        """
+        raise NotImplementedError
+
+    def stream(self, method, url, headers=None):
+        """Send one request and return a response read in chunks.
+
+        The response has iter_content(chunk_size) and close() and is a
+        context manager. Transports that cannot stream, like this
+        default, read the whole body with send().
+
+        Raises:
+            TransportError: Connection failed or timed out.
+        """
+        return self.send(method, url, None, headers)
+
+    def close(self):
+        """Release connections and files held by the transport."""
+
+
+class RequestsTransport(Transport):
+    """Send requests over a keep-alive connection pool shared by threads.
+
+    Every thread gets its own requests session, so cookie and header
+    state is never shared, but all sessions are mounted on the same
+    adapter and draw connections from one thread-safe pool.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False):
+        """Create transport.
+
+        Args:
+            pool_connections (int): Number of per-host pools to keep.
+            pool_maxsize (int): Maximum connections kept open per host.
+            pool_block (bool): Block when the per-host pool is exhausted
+                instead of opening an extra, non-pooled connection.
+        """
+        from requests.adapters import HTTPAdapter
+        self.adapter = HTTPAdapter(pool_connections=pool_connections,
+                                   pool_maxsize=pool_maxsize,
+                                   pool_block=pool_block)
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        """Return the requests session bound to the calling thread."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            session = requests.Session()
+            session.mount('https://', self.adapter)
+            session.mount('http://', self.adapter)
+            self._local.session = session
+        return session
+
+    def send(self, method, url, data=None, headers=None):
+        import requests
+        try:
+            return self.session.request(method, url, data=data,
+                                        headers=headers)
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError) as error:
+            raise TransportError(str(error))
+
+    def stream(self, method, url, headers=None):
+        import requests
+        try:
+            response = self.session.request(method, url, headers=headers,
+                                            stream=True)
+        except (requests.ConnectionError, requests.Timeout) as error:
+            raise TransportError(str(error))
+        return StreamingResponse(response)
+
+    def close(self):
+        self.adapter.close()
+
+
+class RecordingTransport(Transport):
+    """Record every exchange of another transport to a gzipped NDJSON file.
+
+    One line is written per response with its offset from the start of
+    the recording, latency, method, scrubbed URL, status, a few headers
+    and the body. Bodies are stored as text, or base64-encoded if they
+    were streamed or are not UTF-8. The circle-token query parameter is
+    dropped and every secret is replaced in URLs, headers and bodies
+    before writing.
+
+    Attributes:
+        recorded: Number of exchanges written so far.
+    """
+
+    def __init__(self, path, transport=None, secrets=(), clock=time.time):
+        """Create recorder.
+
+        Args:
+            path (str): Recording file, appended to if it exists.
+            transport (Transport): Transport doing the actual requests,
+                a RequestsTransport by default.
+            secrets: Strings, such as API tokens, to scrub.
+        """
+        self.path = path
+        if transport is None:
+            transport = RequestsTransport()
+        self.transport = transport
+        self.secrets = [secret for secret in secrets if secret]
+        self.clock = clock
+        self.recorded = 0
+        self._start = clock()
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+
+    def __getattr__(self, name):
+        # Expose the wrapped transport, e.g. its requests session.
+        transport = self.__dict__.get('transport')
+        if transport is None:
+            raise AttributeError(name)
+        return getattr(transport, name)
+
+    def scrub(self, text):
+        for secret in self.secrets:
+            text = text.replace(secret, SCRUBBED)
+        return text
+
+    def scrub_blocks(self, blocks):
+        """Yield byte blocks with secrets replaced, also across blocks."""
+        secrets = [secret.encode('utf-8') for secret in self.secrets]
+        scrubbed = SCRUBBED.encode('utf-8')
+        keep = max([len(secret) for secret in secrets] or [1]) - 1
+        pending = b''
+        for block in blocks:
+            pending += block
+            for secret in secrets:
+                pending = pending.replace(secret, scrubbed)
+            # Hold back a tail that may start a secret split across blocks.
+            cut = len(pending) - keep
+            if cut > 0:
+                yield pending[:cut]
+                pending = pending[cut:]
+        yield pending
+
+    def send(self, method, url, data=None, headers=None):
+        start = self.clock()
+        response = self.transport.send(method, url, data, headers)
+        self.record(start, self.clock() - start, method, url, response,
+                    response.content)
+        return response
+
+    def stream(self, method, url, headers=None):
+        """Stream response of the wrapped transport, recording its body.
+
+        The body is recorded once it was read to the end; chunks are
+        spooled to a temporary file until then, so memory use stays
+        constant. Error responses are read and recorded immediately.
+        """
+        start = self.clock()
+        response = self.transport.stream(method, url, headers)
+        latency = self.clock() - start
+        if not response.ok:
+            with response:
+                content = b''.join(response.iter_content(64 * 1024))
+            self.record(start, latency, method, url, response, content)
+            return Response(response.status_code, response.reason,
+                            response.headers, content)
+        return RecordingStream(self, response, start, latency, method, url)
+
+    def record(self, start, latency, method, url, response, content):
+        """Write one exchange to the recording."""
+        record = self.exchange(start, latency, method, url, response)
+        try:
+            record['b'] = self.scrub(content.decode('utf-8'))
+        except UnicodeDecodeError:
+            scrubbed = b''.join(self.scrub_blocks([content]))
+            record['b64'] = base64.b64encode(scrubbed).decode('ascii')
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self.recorded += 1
+
+    def record_stream(self, start, latency, method, url, response, body):
+        """Write one exchange whose body was spooled to file body.
+
+        The body is scrubbed and base64-encoded block by block, so it is
+        never held in memory whole.
+        """
+        record = self.exchange(start, latency, method, url, response)
+        head = json.dumps(record, separators=(',', ':'))[:-1] + ',"b64":"'
+        body.seek(0)
+        blocks = self.scrub_blocks(iter(lambda: body.read(64 * 1024), b''))
+        with self._lock:
+            self._file.write(head)
+            for text in _base64(blocks):
+                self._file.write(text)
+            self._file.write('"}\n')
+            self.recorded += 1
+
+    def exchange(self, start, latency, method, url, response):
+        """Return recorded fields of an exchange, except its body."""
+        return {
+            't': round(start - self._start, 4),
+            'd': round(latency, 4),
+            'm': method,
+            'u': self.scrub(scrub_url(url)),
+            's': response.status_code,
+            'r': response.reason,
+            'h': dict((name, self.scrub(response.headers[name]))
+                      for name in RECORDED_HEADERS
+                      if name in response.headers),
+        }
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        self.transport.close()
+
+
+def _base64(blocks):
+    """Yield base64 text of the concatenated byte blocks."""
+    rest = b''
+    for block in blocks:
+        block = rest + block
+        cut = len(block) - len(block) % 3
+        rest = block[cut:]
+        yield base64.b64encode(block[:cut]).decode('ascii')
+    yield base64.b64encode(rest).decode('ascii')
+
+
+class RecordingStream(object):
+    """Streaming response recorded once its body was read to the end."""
+
+    def __init__(self, recorder, response, start, latency, method, url):
+        self.recorder = recorder
+        self.response = response
+        self.status_code = response.status_code
+        self.reason = response.reason
+        self.headers = response.headers
+        self._exchange = (start, latency, method, url)
+        self._body = tempfile.TemporaryFile()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def iter_content(self, chunk_size=None):
+        for chunk in self.response.iter_content(chunk_size):
+            self._body.write(chunk)
+            yield chunk
+        if self._exchange is not None:
+            start, latency, method, url = self._exchange
+            self._exchange = None
+            self.recorder.record_stream(start, latency, method, url,
+                                        self.response, self._body)
+        self._body.close()
+
+    def close(self):
+        self._body.close()
+        self.response.close()
+
+
+def read_recording(path):
+    """Yield recorded exchanges of a recording file in order."""
+    with gzip.open(path, 'rt', encoding='utf-8') as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ReplayTransport(Transport):
+    """Serve recorded responses without touching the network.
+
+    Requests are matched on method and scrubbed URL. Repeated requests
+    get successive recorded responses, the last one repeating; requests
+    that were never recorded get a 404 response. The whole recording,
+    streamed bodies included, is loaded into memory.
+
+    Attributes:
+        served: Number of requests answered from the recording.
+        misses: Number of requests not found in the recording.
+    """
+
+    def __init__(self, path, speed=None, concurrency=None,
+                 sleep=time.sleep):
+        """Load recording.
+
+        Args:
+            path (str): File written by RecordingTransport.
+            speed (float): Replay recorded latencies divided by speed;
+                None answers immediately.
+            concurrency (int): Maximum number of requests answered at
+                once, emulating a server with that many workers.
+        """
+        self.speed = speed
+        self.sleep = sleep
+        self.served = 0
+        self.misses = 0
+        self._responses = {}
+        self._lock = threading.Lock()
+        self._slots = (threading.BoundedSemaphore(concurrency)
+                       if concurrency else None)
+        for record in read_recording(path):
+            self._responses.setdefault((record['m'], record['u']),
+                                       []).append(record)
+        self._next = dict((key, 0) for key in self._responses)
+
+    def __len__(self):
+        """Return number of recorded exchanges."""
+        return sum(len(records) for records in self._responses.values())
+
+    def send(self, method, url, data=None, headers=None):
+        key = (method, scrub_url(url))
+        with self._lock:
+            records = self._responses.get(key)
+            if records is None:
+                self.misses += 1
+                return Response(404, 'Not Recorded', {}, b'{}')
+            index = self._next[key]
+            self._next[key] = min(index + 1, len(records) - 1)
+            self.served += 1
+        record = records[index]
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            if self.speed:
+                self.sleep(record['d'] / self.speed)
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+        if 'b64' in record:
+            content = base64.b64decode(record['b64'])
+        else:
+            content = record['b'].encode('utf-8')
+        return Response(record['s'], record['r'], record['h'], content)
+
+
+def replay_traffic(client, path, speed=None, concurrency=8):
+    """Reissue recorded requests through client, keeping their timing.
+
+    Drives a client, typically one using a ReplayTransport of the same
+    recording, with the request sequence of a recorded session, so the
+    whole client stack can be load-tested and profiled offline.
+
+    Args:
+        client: An instance of CircleClient object.
+        path (str): File written by RecordingTransport.
+        speed (float): Compress recorded request offsets by this factor;
+            None sends requests as fast as the workers allow.
+        concurrency (int): Number of worker threads issuing requests.
+
+    Returns:
+        A dictionary with the number of requests, errors and seconds.
+    """
+    prefix = urlsplit(client.endpoint).path
+    start = time.time()
+    errors = []
+
+    def issue(record):
+        url = record['u']
+        if url.startswith(prefix):
+            url = url[len(prefix):]
+        url += ('&' if '?' in url else '?') + urlencode(
+            {'circle-token': client.api_token or ''})
+        try:
+            client.request(record['m'], url)
+        except Exception as error:
+            errors.append(error)
+
+    sent = 0
+    with ThreadPoolExecutor(concurrency) as executor:
+        for record in read_recording(path):
+            if speed:
+                delay = start + record['t'] / speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(issue, record)
+            sent += 1
+    return {'requests': sent, 'errors': len(errors),
+            'seconds': time.time() - start}
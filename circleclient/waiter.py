@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Wait for many builds with shared, adaptive polling."""
+
+import time
+from collections import namedtuple
+
+from .circleclient import CircleClientError, is_finished, parse_time
+
+
+Transition = namedtuple('Transition', ['key', 'old', 'new', 'build'])
+Transition.__doc__ = """Status change of a build identified by key."""
+
+
+class WaitTimeout(CircleClientError):
+    """Raised when builds do not finish within the timeout."""
+
+    def __init__(self, pending):
+        CircleClientError.__init__(
+            self, '{0} build(s) still running'.format(len(pending)))
+        self.pending = pending
+
+
+def _median(values):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[len(values) // 2]
+
+
+class BuildWaiter(object):
+    """Poll many builds until they finish.
+
+    Builds of one project share a poll: a single Build.recent page
+    refreshes every build number it contains, so N builds of a project
+    cost one request per tick instead of N. Builds that fell off the
+    page are refreshed with Build.status.
+
+    The interval between ticks adapts to each build: it shrinks as a
+    build approaches the typical duration of its project's recent builds
+    and grows again once a build runs longer than expected.
+
+    When the client has webhook-fed build states, builds notified with a
+    full summary are never polled, pauses end as soon as a notification
+    arrives, and the remaining builds are polled at most every
+    fallback_interval seconds.
+    """
+
+    def __init__(self, client, min_interval=2.0, max_interval=60.0,
+                 page_size=30, sleep=time.sleep, clock=time.time,
+                 fallback_interval=300.0):
+        """Create waiter.
+
+        Args:
+            client: An instance of CircleClient object.
+            min_interval (float): Shortest pause between polls in seconds.
+            max_interval (float): Longest pause between polls in seconds.
+            page_size (int): Builds fetched per project poll, max=100.
+            fallback_interval (float): Pause between polls of builds not
+                yet notified, when the client has build states.
+        """
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.fallback_interval = fallback_interval
+        self.page_size = page_size
+        self.sleep = sleep
+        self.clock = clock
+        self.durations = {}
+
+    def poll(self, keys):
+        """Return current summaries of given builds keyed by key."""
+        builds = {}
+        projects = {}
+        for key in keys:
+            build = self.client.build.local_status(*key)
+            if build is not None:
+                builds[key] = build
+                continue
+            projects.setdefault(tuple(key[:2]), []).append(key)
+        for (username, project), project_keys in projects.items():
+            page = self.client.build.recent(username, project,
+                                            limit=self.page_size)
+            by_num = dict((build.get('build_num'), build) for build in page)
+            durations = [build['build_time_millis'] / 1000.0
+                         for build in page if is_finished(build) and
+                         build.get('build_time_millis')]
+            if durations:
+                self.durations[(username, project)] = _median(durations)
+            for key in project_keys:
+                build = by_num.get(key[2])
+                if build is None:
+                    build = self.client.build.status(*key)
+                builds[key] = build
+        return builds
+
+    def interval(self, key, build, waited):
+        """Return pause before the next poll of given build."""
+        started = parse_time(build.get('start_time'))
+        elapsed = waited
+        if started is not None:
+            elapsed = max(0.0, self.clock() - started.timestamp())
+        expected = self.durations.get(tuple(key[:2]))
+        if expected is None:
+            pause = elapsed * 0.1
+        elif elapsed < expected:
+            pause = (expected - elapsed) / 2.0
+        else:
+            pause = (elapsed - expected) * 0.1
+        return min(self.max_interval, max(self.min_interval, pause))
+
+    def watch(self, keys, timeout=None, until='all'):
+        """Yield a Transition each time a build changes status.
+
+        Args:
+            keys: Iterable of (username, project, build_num) tuples.
+            timeout (float): Give up after this many seconds.
+            until (str): Stop when 'all' builds or 'any' build finished.
+
+        Raises:
+            WaitTimeout: Builds did not finish in time.
+        """
+        pending = set(tuple(key) for key in keys)
+        states = {}
+        start = self.clock()
+        notifications = self.client.build_states
+        while pending:
+            if notifications is not None:
+                seen = notifications.notifications
+            builds = self.poll(sorted(pending))
+            for key, build in builds.items():
+                status = build.get('status')
+                if states.get(key) != status:
+                    yield Transition(key, states.get(key), status, build)
+                    states[key] = status
+                if is_finished(build):
+                    pending.discard(key)
+                    if until == 'any':
+                        return
+            if not pending:
+                return
+            waited = self.clock() - start
+            pause = min(self.interval(key, builds[key], waited)
+                        for key in pending)
+            if notifications is not None:
+                pause = max(pause, self.fallback_interval)
+            if timeout is not None:
+                if waited >= timeout:
+                    raise WaitTimeout(sorted(pending))
+                pause = min(pause, timeout - waited)
+            if notifications is not None:
+                notifications.wait(pending, pause, since=seen)
+            else:
+                self.sleep(pause)
+
+    def wait_all(self, keys, timeout=None, callback=None):
+        """Block until every build finished and return final summaries.
+
+        Args:
+            keys: Iterable of (username, project, build_num) tuples.
+            timeout (float): Give up after this many seconds.
+            callback: Optional callable receiving every Transition.
+
+        Returns:
+            A dictionary of build summaries keyed by key.
+        """
+        builds = {}
+        for transition in self.watch(keys, timeout, 'all'):
+            builds[transition.key] = transition.build
+            if callback is not None:
+                callback(transition)
+        return builds
+
+    def wait_any(self, keys, timeout=None, callback=None):
+        """Block until one of the builds finished.
+
+        Returns:
+            A (key, build summary) tuple of the first finished build.
+        """
+        for transition in self.watch(keys, timeout, 'any'):
+            if callback is not None:
+                callback(transition)
+            if is_finished(transition.build):
+                return transition.key, transition.build
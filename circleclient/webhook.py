@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""Receive CircleCI build notifications instead of polling for them."""
+
+import hashlib
+import hmac
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from .circleclient import is_finished
+
+
+def notified_build(event):
+    """Return build summary carried by a webhook event, None if unknown.
+
+    Understands the 1.0 ``notify: webhooks`` body, which wraps the build
+    summary in ``payload``, and ``job-completed`` webhook events. The
+    latter only carry project, number and status, so a stub with just
+    those keys is returned for them; see is_full_notification().
+    """
+    if not isinstance(event, dict):
+        return None
+    build = event.get('payload')
+    if build is None and event.get('type') == 'job-completed':
+        job = event.get('job') or {}
+        slug = (event.get('project') or {}).get('slug', '').split('/')
+        if len(slug) != 3:
+            return None
+        build = {'username': slug[1], 'reponame': slug[2],
+                 'build_num': job.get('number'), 'status': job.get('status'),
+                 'lifecycle': 'finished'}
+    if not isinstance(build, dict):
+        return None
+    if not (build.get('username') and build.get('reponame') and
+            isinstance(build.get('build_num'), int)):
+        return None
+    return build
+
+
+def is_full_notification(event):
+    """Return True if event carries a complete v1 build summary."""
+    return isinstance(event, dict) and isinstance(event.get('payload'), dict)
+
+
+class BuildStates(object):
+    """In-memory build summaries pushed by webhook notifications.
+
+    Build.status and BuildWaiter consult the states of a client created
+    with build_states, so notified builds resolve without a request.
+    Stub notifications, which only tell that a build finished, wake
+    waiters so they refresh the build, but are never served as its
+    summary.
+
+    Attributes:
+        notifications: Number of notifications received so far.
+    """
+
+    def __init__(self, max_entries=10000):
+        """Create store keeping at most max_entries most recent builds."""
+        self.max_entries = max_entries
+        self.notifications = 0
+        self._builds = OrderedDict()
+        self._changed = threading.Condition()
+
+    def __len__(self):
+        return len(self._builds)
+
+    def get(self, username, project, build_num):
+        """Return notified summary of build, None if none or a stub arrived."""
+        entry = self._builds.get((username, project, int(build_num)))
+        if entry is None or not entry[1]:
+            return None
+        return entry[0]
+
+    def put(self, build, full=True):
+        """Record build summary and wake threads waiting for it.
+
+        Args:
+            build (dict): Summary returned by notified_build().
+            full (bool): build is a complete summary rather than a stub.
+        """
+        key = (build['username'], build['reponame'], int(build['build_num']))
+        with self._changed:
+            self.notifications += 1
+            self._builds[key] = (build, full, self.notifications)
+            self._builds.move_to_end(key)
+            while len(self._builds) > self.max_entries:
+                self._builds.popitem(last=False)
+            self._changed.notify_all()
+
+    def wait(self, keys, timeout=None, since=0):
+        """Block until one of keys was notified as finished.
+
+        Args:
+            since (int): Ignore notifications up to this value of the
+                notifications counter, e.g. ones already acted upon.
+
+        Returns:
+            False if timeout expired first.
+        """
+        keys = [tuple(key) for key in keys]
+
+        def notified():
+            for key in keys:
+                entry = self._builds.get(key)
+                if (entry is not None and entry[2] > since and
+                        is_finished(entry[0])):
+                    return True
+            return False
+
+        with self._changed:
+            return self._changed.wait_for(notified, timeout)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Accept webhook POSTs and hand them to the receiver."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if self.path.split('?')[0] != self.server.path:
+            status = 404
+        elif length > self.server.max_body:
+            status = 413
+        else:
+            status = self.server.receive(self.rfile.read(length),
+                                         self.headers)
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class WebhookReceiver(ThreadingMixIn, HTTPServer):
+    """Local HTTP endpoint feeding build notifications into BuildStates.
+
+    Point a CircleCI webhook at url (through a tunnel or reverse proxy
+    when running behind NAT) and create the client with
+    build_states=receiver.states.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, states=None, host='127.0.0.1', port=0, secret=None,
+                 path='/', max_body=1024 * 1024):
+        """Create receiver; call start() to serve in a background thread.
+
+        Args:
+            states (BuildStates): Store to update, a new one by default.
+            host (str): Interface to listen on.
+            port (int): Port to listen on, 0 picks a free one.
+            secret (str): Webhook signing secret. Unsigned or wrongly
+                signed notifications are rejected when set.
+            path (str): URL path accepting notifications.
+            max_body (int): Largest accepted body in bytes.
+        """
+        HTTPServer.__init__(self, (host, port), WebhookHandler)
+        self.states = BuildStates() if states is None else states
+        self.secret = secret.encode('utf-8') if secret else None
+        self.path = path
+        self.max_body = max_body
+        self.rejected = 0
+        self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def url(self):
+        return 'http://{0}:{1}{2}'.format(self.server_address[0],
+                                          self.server_address[1], self.path)
+
+    def verify(self, body, signature):
+        """Return True if signature header matches body, or no secret is set.
+
+        The header holds comma separated ``version=digest`` pairs; the
+        ``v1`` digest is the hex HMAC-SHA256 of the body.
+        """
+        if self.secret is None:
+            return True
+        expected = hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+        for part in (signature or '').split(','):
+            version, _, digest = part.strip().partition('=')
+            if version == 'v1' and hmac.compare_digest(digest, expected):
+                return True
+        return False
+
+    def receive(self, body, headers):
+        """Verify and store one notification, return HTTP status code."""
+        if not self.verify(body, headers.get('Circleci-Signature')):
+            self.rejected += 1
+            return 401
+        try:
+            event = json.loads(body.decode('utf-8'))
+        except ValueError:
+            event = None
+        build = notified_build(event)
+        if build is None:
+            self.rejected += 1
+            return 400
+        self.states.put(build, is_full_notification(event))
+        return 204
+
+    def start(self):
+        """Serve notifications in a daemon thread."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.serve_forever,
+                                           name='circleclient-webhook')
+            self.thread.daemon = True
+            self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the listening socket."""
+        if self.thread is not None:
+            self.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server_close()
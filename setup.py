@@ -32,7 +32,15 @@ setup(
     ],
     package_dir={'circleclient': 'circleclient'},
     include_package_data=True,
+    python_requires='>=3.7',
     install_requires=['requests'],
+    extras_require={
+        'async': ['aiohttp'],
+        'analytics': ['numpy'],
+    },
+    entry_points={
+        'console_scripts': ['circleclient = circleclient.cli:main'],
+    },
     license='MIT',
     zip_safe=False,
     keywords=['ci', 'testing', 'qa', 'circleclient'],
@@ -42,13 +50,13 @@ setup(
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
         'Natural Language :: English',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
         'Topic :: Software Development :: Testing',
         'Topic :: Software Development :: Quality Assurance'
     ],
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""Activate HTTPretty for tests marked with @pytest.mark.httpretty.
+
+Replaces the pytest-httpretty plugin, which does not run on the pytest
+releases that support Python 3.10 and newer.
+"""
+
+import httpretty
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers',
+                            'httpretty: mark tests to activate HTTPretty.')
+
+
+def pytest_runtest_setup(item):
+    if item.get_closest_marker('httpretty') is not None:
+        httpretty.reset()
+        httpretty.enable()
+
+
+def pytest_runtest_teardown(item, nextitem):
+    if item.get_closest_marker('httpretty') is not None:
+        httpretty.disable()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import TestServer  # noqa: E402
+
+from circleclient import aio  # noqa: E402
+
+
+def run(coro_fn):
+    return asyncio.run(coro_fn())
+
+
+async def start_server(routes):
+    app = web.Application()
+    app.add_routes(routes)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def endpoint(server):
+    return str(server.make_url('/api/v1.1'))
+
+
+class TestAsyncClient(object):
+
+    def test_client_has_instances(self):
+        client = aio.AsyncCircleClient(api_token='token')
+        assert isinstance(client.user, aio.AsyncUser)
+        assert isinstance(client.projects, aio.AsyncProjects)
+        assert isinstance(client.build, aio.AsyncBuild)
+        assert isinstance(client.cache, aio.AsyncCache)
+
+    def test_status(self):
+        async def handler(request):
+            assert request.query['circle-token'] == 'token'
+            return web.json_response(
+                {'build_num': int(request.match_info['num'])})
+
+        async def main():
+            server = await start_server(
+                [web.get('/api/v1.1/project/qba73/nc/{num}', handler)])
+            async with aio.AsyncCircleClient(
+                    'token', endpoint=endpoint(server)) as client:
+                response = await client.build.status('qba73', 'nc', 32)
+            await server.close()
+            return response
+
+        assert run(main) == {'build_num': 32}
+
+    def test_trigger_posts_build_parameters(self):
+        async def handler(request):
+            return web.json_response(await request.json())
+
+        async def main():
+            server = await start_server(
+                [web.post('/api/v1.1/project/qba73/nc/tree/master', handler)])
+            async with aio.AsyncCircleClient(
+                    'token', endpoint=endpoint(server)) as client:
+                response = await client.build.trigger(
+                    'qba73', 'nc', 'master', TEST_PARAM='TP')
+            await server.close()
+            return response
+
+        assert run(main) == {'build_parameters': {'TEST_PARAM': 'TP'}}
+
+    def test_error_status_raises(self):
+        async def handler(request):
+            return web.Response(status=404)
+
+        async def main():
+            server = await start_server([web.get('/api/v1.1/me', handler)])
+            try:
+                async with aio.AsyncCircleClient(
+                        'token', endpoint=endpoint(server)) as client:
+                    await client.user.info()
+            finally:
+                await server.close()
+
+        with pytest.raises(Exception) as error:
+            run(main)
+        assert '404' in str(error.value)
+
+    def test_gather_bounds_concurrency(self):
+        state = {'active': 0, 'peak': 0}
+
+        async def handler(request):
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            await asyncio.sleep(0.01)
+            state['active'] -= 1
+            return web.json_response(
+                {'build_num': int(request.match_info['num'])})
+
+        async def main():
+            server = await start_server(
+                [web.get('/api/v1.1/project/qba73/nc/{num}', handler)])
+            async with aio.AsyncCircleClient(
+                    'token', endpoint=endpoint(server)) as client:
+                results = await client.gather(
+                    (client.build.status('qba73', 'nc', n)
+                     for n in range(20)), concurrency=5)
+            await server.close()
+            return results
+
+        results = run(main)
+        assert [r['build_num'] for r in results] == list(range(20))
+        assert state['peak'] == 5
+
+    def test_identical_gets_coalesced(self):
+        hits = []
+
+        async def handler(request):
+            hits.append(request.path)
+            await asyncio.sleep(0.05)
+            return web.json_response({'build_num': 7})
+
+        async def main():
+            server = await start_server(
+                [web.get('/api/v1.1/project/qba73/nc/{num}', handler)])
+            async with aio.AsyncCircleClient(
+                    'token', endpoint=endpoint(server)) as client:
+                results = await client.gather(
+                    client.build.status('qba73', 'nc', 7) for _ in range(4))
+                coalesced = client.coalesced
+            await server.close()
+            return results, coalesced
+
+        results, coalesced = run(main)
+        assert results == [{'build_num': 7}] * 4
+        assert results[0] is not results[1]
+        assert len(hits) == 1
+        assert coalesced == 3
+
+    def test_sync_only_helpers_not_inherited(self):
+        client = aio.AsyncCircleClient(api_token='token')
+        for name in ('wait_for', 'wait_all', 'watch', 'download_artifacts',
+                     'search_logs', 'test_results'):
+            assert not hasattr(client.build, name)
+        assert not hasattr(client.projects, 'catalog')
+
+    def test_status_many(self):
+        async def handler(request):
+            num = int(request.match_info['num'])
+            if num == 3:
+                return web.Response(status=404)
+            return web.json_response({'build_num': num})
+
+        async def main():
+            server = await start_server(
+                [web.get('/api/v1.1/project/qba73/nc/{num}', handler)])
+            async with aio.AsyncCircleClient(
+                    'token', endpoint=endpoint(server)) as client:
+                results = await client.build.status_many(
+                    [('qba73', 'nc', n) for n in range(1, 5)], concurrency=2)
+            await server.close()
+            return results
+
+        results = run(main)
+        assert [r.key[2] for r in results] == [1, 2, 3, 4]
+        assert [r.ok for r in results] == [True, True, False, True]
+        assert results[0].value == {'build_num': 1}
+        assert '404' in str(results[2].error)
+
+    def test_trigger_many_coalesces_identical_triggers(self):
+        hits = []
+
+        async def handler(request):
+            hits.append(request.match_info['branch'])
+            await asyncio.sleep(0.05)
+            return web.json_response({'branch': request.match_info['branch']})
+
+        async def main():
+            server = await start_server(
+                [web.post('/api/v1.1/project/qba73/nc/tree/{branch}',
+                          handler)])
+            async with aio.AsyncCircleClient(
+                    'token', endpoint=endpoint(server)) as client:
+                results = await client.build.trigger_many(
+                    [('qba73', 'nc', 'master', None)] * 3 +
+                    [('qba73', 'nc', 'dev', {'A': '1'})])
+            await server.close()
+            return results
+
+        results = run(main)
+        assert [r.value['branch'] for r in results] == ['master'] * 3 + ['dev']
+        assert sorted(hits) == ['dev', 'master']
+
+    def test_iter_recent(self):
+        async def handler(request):
+            offset = int(request.query['offset'])
+            limit = int(request.query['limit'])
+            nums = range(25 - offset, max(0, 25 - offset - limit), -1)
+            return web.json_response([{'build_num': n} for n in nums])
+
+        async def main():
+            server = await start_server(
+                [web.get('/api/v1.1/project/qba73/nc', handler)])
+            async with aio.AsyncCircleClient(
+                    'token', endpoint=endpoint(server)) as client:
+                builds = [build['build_num'] async for build in
+                          client.build.iter_recent('qba73', 'nc',
+                                                   page_size=10, since=5)]
+            await server.close()
+            return builds
+
+        assert run(main) == list(range(25, 4, -1))
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import warnings
+
+from circleclient import analytics
+from circleclient.analytics import BuildFrame, epoch
+from circleclient.records import BuildRecord
+import pytest
+
+
+DAY = 86400
+
+
+def build(num, project='nc', branch='master', status='success', day=1,
+          duration=60, queued=30):
+    return {'build_num': num, 'username': 'qba73', 'reponame': project,
+            'branch': branch, 'status': status,
+            'queued_at': '2015-09-{0:02d}T10:00:00.000Z'.format(day),
+            'start_time': '2015-09-{0:02d}T10:00:{1:02d}.000Z'.format(
+                day, queued),
+            'build_time_millis': duration * 1000}
+
+
+HISTORY = [
+    build(1, duration=10),
+    build(2, duration=20, status='failed'),
+    build(3, duration=30),
+    build(4, duration=40, branch='dev', status='failed', day=10),
+    build(5, project='bs', duration=100, status='canceled', day=10),
+    build(6, project='bs', duration=200, queued=50, day=11),
+]
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def frame(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(analytics, 'numpy', None)
+    return BuildFrame.from_builds(HISTORY)
+
+
+class TestBuildFrame(object):
+
+    def test_epoch(self):
+        assert epoch('1970-01-02T00:00:01.500Z') == DAY + 1.5
+        assert epoch('1970-01-02T00:00:01Z') == DAY + 1
+        assert epoch('1970-01-02T00:00:01+00:00') == DAY + 1
+        assert epoch('1970-01-02T00:00:01.500+00:00') == DAY + 1.5
+        assert epoch(None) != epoch(None)
+
+    @pytest.mark.parametrize('suffix', ['Z', '.000Z', '+00:00',
+                                        '.000+00:00'])
+    def test_timestamp_suffixes(self, suffix):
+        builds = [dict(build, queued_at=build['queued_at'][:19] + suffix,
+                       start_time=build['start_time'][:19] + suffix)
+                  for build in HISTORY]
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            frame = BuildFrame.from_builds(builds)
+
+        assert frame.queue_times(q=(50,))[('qba73/nc',)] == (30.0,)
+
+    def test_duration_percentiles_by_project_and_branch(self, frame):
+        result = frame.duration_percentiles(by=('project', 'branch'),
+                                            q=(50, 100))
+
+        assert result[('qba73/nc', 'master')] == (20.0, 30.0)
+        assert result[('qba73/nc', 'dev')] == (40.0, 40.0)
+        assert result[('qba73/bs', 'master')] == (150.0, 200.0)
+
+    def test_queue_times(self, frame):
+        result = frame.queue_times(q=(50,))
+
+        assert result[('qba73/nc',)] == (30.0,)
+        assert result[('qba73/bs',)] == (40.0,)
+
+    def test_failure_rates_ignore_canceled(self, frame):
+        result = frame.failure_rates()
+
+        assert result[('qba73/nc',)] == (2, 4, 0.5)
+        assert result[('qba73/bs',)] == (0, 1, 0.0)
+
+    def test_filter(self, frame):
+        recent = frame.filter(since=epoch('2015-09-10T00:00:00Z'),
+                              project='qba73/nc')
+
+        assert len(recent) == 1
+        assert recent.failure_rates() == {('qba73/nc',): (1, 1, 1.0)}
+
+    def test_rolling_failure_rate(self, frame):
+        result = frame.rolling_failure_rate(window=2 * DAY, step=DAY)
+
+        rates = [rate for _, rate in result[('qba73/nc',)]]
+        assert rates == [1 / 3.0, 1 / 3.0, 1.0, 1.0]
+
+    def test_rolling_failure_rate_of_many_groups(self, frame):
+        builds = [build(num, project=project, day=day,
+                        status='failed' if day % 2 else 'success')
+                  for num, (project, day) in enumerate(
+                      ((project, day) for project in ('nc', 'bs')
+                       for day in range(1, 11)), 1)]
+        frame = BuildFrame.from_builds(builds)
+
+        result = frame.rolling_failure_rate(window=2 * DAY, step=DAY)
+
+        assert sorted(result) == [('qba73/bs',), ('qba73/nc',)]
+        for points in result.values():
+            assert len(points) == 10
+            assert [rate for _, rate in points] == [1.0] + [0.5] * 9
+
+    def test_failure_rate_change(self, frame):
+        now = epoch('2015-09-12T00:00:00Z')
+
+        result = frame.failure_rate_change(now, recent=5 * DAY,
+                                           baseline=30 * DAY)
+
+        assert list(result) == [('qba73/nc',), ('qba73/bs',)]
+        assert result[('qba73/nc',)] == pytest.approx((1 / 3.0, 1.0, 2 / 3.0))
+
+    def test_loads_records(self):
+        frame = BuildFrame.from_builds(BuildRecord.from_dict(b)
+                                       for b in HISTORY)
+
+        assert len(frame) == len(HISTORY)
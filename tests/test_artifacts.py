@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+from circleclient import circleclient
+from circleclient.artifacts import local_path
+from circleclient.transport import RecordingTransport, ReplayTransport
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+ARTIFACTS = "https://circle-artifacts.com/0/tmp/circle-artifacts"
+
+
+@pytest.fixture()
+def client():
+    return circleclient.CircleClient(api_token='token')
+
+
+def register_artifacts(paths):
+    httpretty.register_uri(
+        httpretty.GET, ENDPOINT + '/project/qba73/nc/34/artifacts',
+        body=json.dumps([{'path': path, 'pretty_path': path,
+                          'url': ARTIFACTS + '/' + path} for path in paths]))
+
+
+class TestDownloadArtifacts(object):
+
+    def test_local_path_stays_in_dest(self, tmpdir):
+        dest = str(tmpdir)
+
+        assert local_path(dest, {'path': '$CIRCLE_ARTIFACTS/a/b.txt'}) == \
+            os.path.join(dest, 'a', 'b.txt')
+        with pytest.raises(ValueError):
+            local_path(dest, {'path': '../../etc/passwd'})
+        with pytest.raises(ValueError):
+            local_path(dest, {'path': '../../etc/passwd', 'node_index': 1})
+
+    def test_local_path_per_container(self, tmpdir):
+        dest = str(tmpdir)
+
+        assert local_path(dest, {'path': 'a/b.txt', 'node_index': 0}) == \
+            os.path.join(dest, '0', 'a', 'b.txt')
+        assert local_path(dest, {'path': 'a/b.txt', 'node_index': 1}) == \
+            os.path.join(dest, '1', 'a', 'b.txt')
+
+    @pytest.mark.httpretty
+    def test_parallel_containers_do_not_collide(self, client, tmpdir):
+        artifacts = 'https://circle-artifacts.com/{0}/tmp/circle-artifacts'
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc/34/artifacts',
+            body=json.dumps([{'path': 'junit.xml', 'pretty_path': 'junit.xml',
+                              'node_index': node,
+                              'url': artifacts.format(node) + '/junit.xml'}
+                             for node in (0, 1)]))
+        for node in (0, 1):
+            httpretty.register_uri(
+                httpretty.GET, artifacts.format(node) + '/junit.xml',
+                body='<testsuite node="{0}"/>'.format(node))
+
+        downloads = client.build.download_artifacts('qba73', 'nc', 34,
+                                                    str(tmpdir))
+
+        assert [download.ok for download in downloads] == [True, True]
+        assert tmpdir.join('0', 'junit.xml').read() == '<testsuite node="0"/>'
+        assert tmpdir.join('1', 'junit.xml').read() == '<testsuite node="1"/>'
+
+    @pytest.mark.httpretty
+    def test_downloads_matching_files(self, client, tmpdir):
+        register_artifacts(['reports/junit.xml', 'coverage/index.html'])
+        httpretty.register_uri(httpretty.GET,
+                               ARTIFACTS + '/reports/junit.xml',
+                               body='<testsuite/>')
+
+        downloads = client.build.download_artifacts(
+            'qba73', 'nc', 34, str(tmpdir), pattern='reports/*')
+
+        assert len(downloads) == 1
+        assert downloads[0].ok
+        assert downloads[0].bytes == len('<testsuite/>')
+        assert tmpdir.join('reports', 'junit.xml').read() == '<testsuite/>'
+        assert not tmpdir.join('reports', 'junit.xml.part').check()
+
+    @pytest.mark.httpretty
+    def test_resumes_partial_file(self, client, tmpdir):
+        register_artifacts(['bundle.tar'])
+
+        def callback(request, uri, headers):
+            assert request.headers['Range'] == 'bytes=5-'
+            headers['Content-Range'] = 'bytes 5-9/10'
+            return 206, headers, '56789'
+
+        httpretty.register_uri(httpretty.GET, ARTIFACTS + '/bundle.tar',
+                               body=callback)
+        tmpdir.join('bundle.tar.part').write('01234')
+
+        downloads = client.build.download_artifacts('qba73', 'nc', 34,
+                                                    str(tmpdir))
+
+        assert downloads[0].resumed
+        assert downloads[0].bytes == 5
+        assert tmpdir.join('bundle.tar').read() == '0123456789'
+
+    @pytest.mark.httpretty
+    def test_failed_file_reported(self, client, tmpdir):
+        register_artifacts(['missing.log', 'present.log'])
+        httpretty.register_uri(httpretty.GET, ARTIFACTS + '/missing.log',
+                               status=404, body='')
+        httpretty.register_uri(httpretty.GET, ARTIFACTS + '/present.log',
+                               body='ok')
+
+        missing, present = client.build.download_artifacts(
+            'qba73', 'nc', 34, str(tmpdir))
+
+        assert isinstance(missing.error, circleclient.ClientError)
+        assert present.ok
+
+    @pytest.mark.httpretty
+    def test_downloads_through_client_transport(self, tmpdir):
+        register_artifacts(['reports/junit.xml'])
+        httpretty.register_uri(httpretty.GET,
+                               ARTIFACTS + '/reports/junit.xml',
+                               body='<testsuite/>')
+        recording = str(tmpdir.join('session.ndjson.gz'))
+        with circleclient.CircleClient(
+                'token', transport=RecordingTransport(recording)) as client:
+            client.build.download_artifacts('qba73', 'nc', 34,
+                                            str(tmpdir.join('recorded')))
+        httpretty.disable()
+
+        client = circleclient.CircleClient(
+            'token', transport=ReplayTransport(recording))
+        events = []
+        client.add_hook(after=events.append)
+        downloads = client.build.download_artifacts(
+            'qba73', 'nc', 34, str(tmpdir.join('replayed')))
+
+        assert downloads[0].ok
+        assert tmpdir.join('replayed', 'reports', 'junit.xml').read() == \
+            '<testsuite/>'
+        assert [event.route for event in events] == [
+            '/project/{username}/{project}/{build_num}/artifacts',
+            'https://circle-artifacts.com/{path}']
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from circleclient import circleclient
+from benchmarks.run import bench_mixed, regressions
+from benchmarks.stubserver import StubServer
+import pytest
+
+
+@pytest.fixture()
+def client():
+    with StubServer(history=150, steps=1) as server:
+        with circleclient.CircleClient('token',
+                                       endpoint=server.endpoint) as client:
+            yield client
+
+
+class TestStubServer(object):
+
+    def test_serves_every_endpoint(self, client):
+        result = bench_mixed(client, rounds=1)
+
+        assert result['requests'] == 10
+
+    def test_paginates_history(self, client):
+        builds = list(client.build.iter_recent('qba73', 'nc'))
+
+        assert [b['build_num'] for b in builds] == list(range(150, 0, -1))
+
+    def test_unknown_endpoint(self, client):
+        with pytest.raises(circleclient.ClientError):
+            client.request('GET', '/unknown')
+
+
+class TestRegressions(object):
+
+    def test_only_throughput_drops_beyond_tolerance_reported(self):
+        baseline = {'results': {'status': {'requests_per_sec': 100.0,
+                                           'p50_ms': 1.0},
+                                'pagination': {'builds_per_sec': 100.0}}}
+        report = {'results': {'status': {'requests_per_sec': 85.0,
+                                         'p50_ms': 9.0},
+                              'pagination': {'builds_per_sec': 70.0}}}
+
+        found = regressions(report, baseline, tolerance=0.2)
+
+        assert found == ['pagination.builds_per_sec: 70.0 < 100.0']
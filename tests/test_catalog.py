@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+
+from circleclient import circleclient
+from circleclient.catalog import ProjectCatalog, project_key
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+
+
+@pytest.fixture()
+def client():
+    return circleclient.CircleClient(api_token='token')
+
+
+def project(username, reponame, branches=('master',), vcs_type='github'):
+    payload = {'username': username, 'reponame': reponame,
+               'vcs_url': 'https://github.com/{0}/{1}'.format(
+                   username, reponame),
+               'branches': dict((b.replace('/', '%2F'), {'last_success': 1})
+                                for b in branches)}
+    if vcs_type:
+        payload['vcs_type'] = vcs_type
+    return payload
+
+
+def serve(projects):
+    httpretty.register_uri(httpretty.GET, ENDPOINT + '/projects',
+                           body=json.dumps(projects))
+
+
+class TestProjectCatalog(object):
+
+    def test_project_key_falls_back_to_vcs_url(self):
+        payload = project('qba73', 'nc', vcs_type=None)
+        assert project_key(payload) == ('github', 'qba73', 'nc')
+
+    @pytest.mark.httpretty
+    def test_lookup_by_key_and_branch(self, client):
+        serve([project('qba73', 'nc', ('master', 'feature/x')),
+               project('qba73', 'bs', ('develop',))])
+
+        catalog = client.projects.catalog()
+
+        assert len(catalog) == 2
+        assert 'github/qba73/nc' in catalog
+        assert catalog[('github', 'qba73', 'bs')]['reponame'] == 'bs'
+        assert catalog.get('github/qba73/missing') is None
+        assert catalog.branch('github/qba73/nc', 'feature/x') == {
+            'last_success': 1}
+        assert catalog.with_branch('feature/x') == [('github', 'qba73', 'nc')]
+        assert catalog.with_branch('develop') == [('github', 'qba73', 'bs')]
+
+    @pytest.mark.httpretty
+    def test_refresh_diff(self, client):
+        serve([project('qba73', 'nc'), project('qba73', 'bs')])
+        catalog = ProjectCatalog(client)
+        first = catalog.refresh()
+
+        serve([project('qba73', 'nc'), project('qba73', 'new')])
+        diff = catalog.refresh()
+
+        assert len(first.added) == 2
+        assert diff.added == [('github', 'qba73', 'new')]
+        assert diff.removed == [('github', 'qba73', 'bs')]
+        assert 'github/qba73/bs' not in catalog
+
+    @pytest.mark.httpretty
+    def test_background_refresh(self, client):
+        serve([project('qba73', 'nc')])
+        changed = threading.Event()
+        diffs = []
+
+        def callback(diff):
+            diffs.append(diff)
+            if len(diffs) == 2:
+                changed.set()
+
+        with ProjectCatalog(client, interval=0.01,
+                            callback=callback).start() as catalog:
+            serve([project('qba73', 'nc'), project('qba73', 'bs')])
+            assert changed.wait(5)
+
+        assert diffs[1].added == [('github', 'qba73', 'bs')]
+        assert 'github/qba73/bs' in catalog
+        assert catalog.error is None
+
+    @pytest.mark.httpretty
+    def test_background_error_keeps_catalog(self, client):
+        serve([project('qba73', 'nc')])
+        catalog = ProjectCatalog(client, interval=0.01).start()
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/projects',
+                               status=404)
+        try:
+            for _ in range(500):
+                if catalog.error is not None:
+                    break
+                threading.Event().wait(0.01)
+        finally:
+            catalog.stop()
+
+        assert isinstance(catalog.error, circleclient.ClientError)
+        assert 'github/qba73/nc' in catalog
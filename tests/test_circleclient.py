@@ -1,5 +1,11 @@
 # -*- coding: utf-8 -*-
 
+import datetime
+import json
+import re
+import threading
+import time
+
 from circleclient import circleclient
 import pytest
 import httpretty
@@ -29,6 +35,35 @@ class TestClient(object):
         assert 'application/json' == headers['Content-Type']
         assert 'application/json' == headers['Accept']
 
+    def test_client_reuses_session_within_thread(self, client):
+        assert client.session is client.session
+
+    def test_client_sessions_share_connection_pool(self, client):
+        sessions = []
+        worker = threading.Thread(
+            target=lambda: sessions.append(client.session))
+        worker.start()
+        worker.join()
+
+        assert sessions[0] is not client.session
+        assert sessions[0].get_adapter(ENDPOINT) is client.adapter
+        assert client.session.get_adapter(ENDPOINT) is client.adapter
+
+    def test_client_pool_is_configurable(self):
+        client = circleclient.CircleClient(api_token='token',
+                                           pool_connections=2,
+                                           pool_maxsize=32,
+                                           pool_block=True)
+
+        assert client.adapter._pool_connections == 2
+        assert client.adapter._pool_maxsize == 32
+        assert client.adapter._pool_block is True
+
+    def test_client_without_keep_alive(self):
+        client = circleclient.CircleClient(api_token='token', keep_alive=False)
+
+        assert client.headers['Connection'] == 'close'
+
 
 class TestUser(object):
 
@@ -254,3 +289,269 @@ class TestCache(object):
 
         assert isinstance(response, dict)
         assert 'status' in response
+
+
+def paged_builds(builds):
+    """Return httpretty callback serving builds by limit and offset."""
+    def callback(request, uri, headers):
+        limit = int(request.querystring['limit'][0])
+        offset = int(request.querystring['offset'][0])
+        page = builds[offset:offset + limit]
+        return 200, headers, json.dumps(page)
+    return callback
+
+
+class TestBuildIterators(object):
+
+    builds = [{'build_num': num,
+               'queued_at': '2015-09-{0:02d}T10:00:00.000Z'.format(num)}
+              for num in range(25, 0, -1)]
+
+    @pytest.mark.httpretty
+    def test_iter_recent_yields_all_pages(self, client):
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/project/qba73/nc',
+                               body=paged_builds(self.builds))
+
+        builds = list(client.build.iter_recent('qba73', 'nc', page_size=10))
+
+        assert [b['build_num'] for b in builds] == list(range(25, 0, -1))
+
+    @pytest.mark.httpretty
+    def test_iter_recent_stops_at_since_build_num(self, client):
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/project/qba73/nc',
+                               body=paged_builds(self.builds))
+
+        builds = list(client.build.iter_recent('qba73', 'nc', since=18,
+                                               until=22, page_size=5,
+                                               prefetch=False))
+
+        assert [b['build_num'] for b in builds] == [22, 21, 20, 19, 18]
+        assert len(httpretty.latest_requests()) == 2
+
+    @pytest.mark.httpretty
+    def test_iter_recent_all_projects_date_bounds(self, client):
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/recent-builds',
+                               body=paged_builds(self.builds))
+
+        builds = client.build.iter_recent_all_projects(
+            since=datetime.datetime(2015, 9, 3),
+            until=datetime.datetime(2015, 9, 4, 12), page_size=10)
+
+        assert [b['build_num'] for b in builds] == [4, 3]
+
+    def test_iter_recent_all_projects_rejects_build_num(self, client):
+        with pytest.raises(TypeError):
+            client.build.iter_recent_all_projects(since=3)
+
+
+class TestBuildBatches(object):
+
+    @pytest.mark.httpretty
+    def test_status_many_ordered_with_errors(self, client):
+        def callback(request, uri, headers):
+            build_num = int(request.path.split('?')[0].rsplit('/', 1)[1])
+            if build_num == 2:
+                return 404, headers, '{}'
+            return 200, headers, json.dumps({'build_num': build_num})
+
+        httpretty.register_uri(
+            httpretty.GET,
+            re.compile(ENDPOINT + r'/project/qba73/nc/\d+'),
+            body=callback)
+
+        keys = [('qba73', 'nc', num) for num in (1, 2, 3)]
+        results = client.build.status_many(keys, concurrency=2)
+
+        assert [r.key for r in results] == keys
+        assert results[0].ok and results[0].value == {'build_num': 1}
+        assert not results[1].ok and '404' in str(results[1].error)
+        assert results[2].value == {'build_num': 3}
+
+    @pytest.mark.httpretty
+    def test_artifacts_many_as_completed(self, client):
+        httpretty.register_uri(
+            httpretty.GET,
+            re.compile(ENDPOINT + r'/project/qba73/nc/\d+/artifacts'),
+            body='[]')
+
+        keys = [('qba73', 'nc', num) for num in range(10)]
+        results = client.build.artifacts_many(keys, ordered=False)
+
+        results = list(results)
+        assert sorted(r.key for r in results) == keys
+        assert all(r.value == [] for r in results)
+
+
+class TestBuildListingModes(object):
+
+    @pytest.mark.httpretty
+    def test_recent_shallow(self, client):
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/project/qba73/nc',
+                               body='[]')
+
+        client.build.recent('qba73', 'nc', shallow=True)
+
+        assert httpretty.last_request().querystring['shallow'] == ['true']
+
+    @pytest.mark.httpretty
+    def test_recent_all_projects_field_projection(self, client):
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/recent-builds',
+            body=json.dumps([{'build_num': 3, 'status': 'success',
+                              'steps': [], 'subject': 'Fix'}]))
+
+        response = client.build.recent_all_projects(
+            fields=['build_num', 'status'])
+
+        assert response == [{'build_num': 3, 'status': 'success'}]
+
+    @pytest.mark.httpretty
+    def test_field_projection_decodes_items_one_at_a_time(self):
+        def loads(content):
+            raise AssertionError('whole listing decoded')
+
+        client = circleclient.CircleClient(api_token='token', json_loads=loads)
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc',
+            body=json.dumps([{'build_num': 2, 'steps': [{'name': 'test'}]},
+                             {'build_num': 1, 'steps': []}]))
+
+        response = client.build.recent('qba73', 'nc', fields=['build_num'])
+
+        assert response == [{'build_num': 2}, {'build_num': 1}]
+
+    def test_decode_fields(self):
+        assert circleclient.decode_fields(
+            b' [ {"a": 1, "b": [2]} , {"b": 3} ] ', ['a']) == [{'a': 1}, {}]
+        assert circleclient.decode_fields(
+            '{"a": 1, "b": 2}', ['b']) == {'b': 2}
+        assert circleclient.decode_fields('[]', ['a']) == []
+        with pytest.raises(ValueError):
+            circleclient.decode_fields('[{"a": 1}', ['a'])
+
+    @pytest.mark.httpretty
+    def test_iter_recent_keeps_bound_fields(self, client):
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc',
+            body=paged_builds([{'build_num': 2, 'status': 'success'},
+                               {'build_num': 1, 'status': 'failed'}]))
+
+        builds = client.build.iter_recent('qba73', 'nc', since=2,
+                                          fields=['status'])
+
+        assert list(builds) == [{'build_num': 2, 'status': 'success'}]
+
+    @pytest.mark.httpretty
+    def test_custom_json_decoder(self):
+        decoded = []
+
+        def loads(content):
+            decoded.append(content)
+            return json.loads(content)
+
+        client = circleclient.CircleClient(api_token='token',
+                                           json_loads=loads)
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/me',
+                               body='{"login": "qba73"}')
+
+        assert client.user.info() == {'login': 'qba73'}
+        assert decoded == [b'{"login": "qba73"}']
+
+    def test_fast_json_loads_decodes(self):
+        loads = circleclient.fast_json_loads()
+
+        assert loads('{"build_num": 1}') == {'build_num': 1}
+
+
+class TestTriggerMany(object):
+
+    @pytest.mark.httpretty
+    def test_identical_triggers_coalesced(self, client):
+        triggered = []
+
+        def callback(request, uri, headers):
+            time.sleep(0.1)
+            triggered.append((request.path.split('?')[0],
+                              json.loads(request.body)))
+            return 201, headers, json.dumps({'build_num': len(triggered)})
+
+        httpretty.register_uri(
+            httpretty.POST,
+            re.compile(ENDPOINT + r'/project/qba73/\w+/tree/\w+'),
+            body=callback)
+
+        items = [('qba73', 'nc', 'master', {'DEPLOY': '1'}),
+                 ('qba73', 'nc', 'master', {'DEPLOY': '1'}),
+                 ('qba73', 'nc', 'master', None),
+                 ('qba73', 'bs', 'master', {'DEPLOY': '1'})]
+        results = client.build.trigger_many(items, concurrency=4)
+
+        assert all(result.ok for result in results)
+        assert len(triggered) == 3
+        assert results[0].value is results[1].value
+        assert client.build.triggers.coalesced == 1
+        assert len(client.build.triggers) == 0
+
+    @pytest.mark.httpretty
+    def test_rate_cap(self, client):
+        httpretty.register_uri(
+            httpretty.POST,
+            re.compile(ENDPOINT + r'/project/qba73/\w+/tree/\w+'),
+            body='{"build_num": 1}')
+
+        items = [('qba73', 'p{0}'.format(n), 'master', None)
+                 for n in range(3)]
+        start = time.time()
+        results = client.build.trigger_many(items, concurrency=3, rate=20)
+
+        assert time.time() - start >= 0.09
+        assert [r.key for r in results] == items
+
+
+class TestGetCoalescing(object):
+
+    def fetch_concurrently(self, client, callers):
+        results = []
+
+        def call():
+            results.append(client.build.status('qba73', 'nc', 7))
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    @pytest.mark.httpretty
+    def test_identical_gets_share_one_request(self, client):
+        requests_seen = []
+
+        def callback(request, uri, headers):
+            requests_seen.append(uri)
+            deadline = time.time() + 5
+            while client.coalesced < 3 and time.time() < deadline:
+                time.sleep(0.001)
+            return 200, headers, json.dumps({'build_num': 7})
+
+        httpretty.register_uri(httpretty.GET,
+                               ENDPOINT + '/project/qba73/nc/7',
+                               body=callback)
+
+        results = self.fetch_concurrently(client, 4)
+
+        assert results == [{'build_num': 7}] * 4
+        assert len(requests_seen) == 1
+        assert client.coalesced == 3
+        assert len(set(id(result) for result in results)) == 4
+
+    @pytest.mark.httpretty
+    def test_coalescing_disabled(self):
+        client = circleclient.CircleClient('token', coalesce=False)
+        httpretty.register_uri(httpretty.GET,
+                               ENDPOINT + '/project/qba73/nc/7',
+                               body='{"build_num": 7}')
+
+        assert self.fetch_concurrently(client, 3) == [{'build_num': 7}] * 3
+        assert len(httpretty.latest_requests()) == 3
+        assert client.coalesced == 0
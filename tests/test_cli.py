@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import re
+import subprocess
+import sys
+
+import circleclient
+from circleclient import cli
+from circleclient.records import BuildRecord
+from benchmarks import bench_startup
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+
+
+def run(argv, stdin=''):
+    stdout = io.StringIO()
+    status = cli.main(['--token', 'token'] + argv, io.StringIO(stdin), stdout)
+    lines = stdout.getvalue().splitlines()
+    return status, [json.loads(line) for line in lines]
+
+
+def serve_builds():
+    def callback(request, uri, headers):
+        num = int(request.path.split('?')[0].rsplit('/', 1)[1])
+        if num == 404:
+            return 404, headers, '{"message": "Build not found"}'
+        return 200, headers, json.dumps({'build_num': num})
+
+    httpretty.register_uri(httpretty.GET,
+                           re.compile(ENDPOINT + r'/project/qba73/nc/\d+'),
+                           body=callback)
+
+
+class TestTargets(object):
+
+    def test_branch_may_contain_slashes(self):
+        assert cli.branch_target('qba73/nc/feature/x') == (
+            'qba73', 'nc', 'feature/x')
+
+    def test_invalid_build_target(self):
+        with pytest.raises(ValueError):
+            cli.build_target('qba73/nc')
+
+
+class TestMain(object):
+
+    @pytest.mark.httpretty
+    def test_status_of_many_targets(self):
+        serve_builds()
+
+        status, lines = run(['--ordered', 'status', 'qba73/nc/1',
+                             'qba73/nc/2'])
+
+        assert status == 0
+        assert lines == [{'target': 'qba73/nc/1', 'result': {'build_num': 1}},
+                         {'target': 'qba73/nc/2', 'result': {'build_num': 2}}]
+
+    @pytest.mark.httpretty
+    def test_targets_from_stdin_and_errors(self):
+        serve_builds()
+
+        status, lines = run(['status', '-'],
+                            stdin='qba73/nc/3\nqba73/nc/404\n')
+
+        assert status == 1
+        by_target = dict((line['target'], line) for line in lines)
+        assert by_target['qba73/nc/3']['result'] == {'build_num': 3}
+        assert by_target['qba73/nc/404']['type'] == 'ClientError'
+
+    @pytest.mark.httpretty
+    def test_trigger_with_parameters(self):
+        httpretty.register_uri(
+            httpretty.POST, ENDPOINT + '/project/qba73/nc/tree/feature/x',
+            body=lambda request, uri, headers: (
+                201, headers, request.body))
+
+        status, lines = run(['trigger', 'qba73/nc/feature/x',
+                             '-p', 'DEPLOY=true'])
+
+        assert status == 0
+        assert lines[0]['result'] == {'build_parameters': {'DEPLOY': 'true'}}
+
+    @pytest.mark.httpretty
+    def test_cache_clear(self):
+        httpretty.register_uri(
+            httpretty.DELETE, ENDPOINT + '/project/qba73/nc/build-cache',
+            body='{"status": "build caches deleted"}')
+
+        status, lines = run(['cache', 'clear', 'qba73/nc'])
+
+        assert status == 0
+        assert lines[0]['result'] == {'status': 'build caches deleted'}
+
+    def test_emit_serializes_records(self):
+        stdout = io.StringIO()
+
+        cli.emit(stdout, 'qba73/nc/1',
+                 BuildRecord.from_dict({'build_num': 1, 'status': 'success'}))
+
+        assert json.loads(stdout.getvalue()) == {
+            'target': 'qba73/nc/1',
+            'result': {'build_num': 1, 'status': 'success'}}
+
+    def test_missing_token(self, monkeypatch):
+        monkeypatch.delenv('CIRCLE_TOKEN', raising=False)
+        with pytest.raises(SystemExit):
+            cli.main(['status', 'qba73/nc/1'], io.StringIO(), io.StringIO())
+
+
+class TestColdStart(object):
+
+    def test_loading_cli_imports_no_heavy_modules(self):
+        assert bench_startup.heavy_imports() == []
+
+    def test_client_module_imported_on_first_access(self):
+        probe = ('import sys, circleclient; '
+                 'loaded = "circleclient.circleclient" in sys.modules; '
+                 'circleclient.circleclient.CircleClient; '
+                 'print(loaded)')
+        output = subprocess.check_output([sys.executable, '-c', probe])
+        assert output.decode('utf-8').strip() == 'False'
+
+    def test_unknown_package_attribute(self):
+        assert hasattr(circleclient, 'circleclient')
+        with pytest.raises(AttributeError):
+            circleclient.missing
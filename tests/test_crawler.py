@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+from circleclient import circleclient
+from circleclient.crawler import (FORMATS, HistoryCrawler, Shard,
+                                  crawl_shard, plan_project, read_builds)
+from benchmarks.stubserver import StubServer
+import pytest
+
+
+@pytest.fixture()
+def server():
+    with StubServer(history=250, steps=1) as server:
+        yield server
+
+
+def crawler(server, tmpdir, **options):
+    return HistoryCrawler('token', str(tmpdir.join('crawl')),
+                          endpoint=server.endpoint, processes=2,
+                          shard_size=100, page_size=30, **options)
+
+
+def build_nums(crawler):
+    return sorted(build['build_num'] for build in crawler.iter_builds())
+
+
+class TestPlan(object):
+
+    def test_plan_project(self):
+        shards = plan_project('qba73', 'nc', 250, 100)
+
+        assert shards == [Shard('qba73', 'nc', 150, 250, 0),
+                          Shard('qba73', 'nc', 50, 150, 100),
+                          Shard('qba73', 'nc', 0, 50, 200)]
+
+
+class TestCrawlShard(object):
+
+    def test_steps_back_when_offset_overshoots(self, server, tmpdir):
+        client = circleclient.CircleClient('token', endpoint=server.endpoint)
+        path = str(tmpdir.join('shard.ndjson'))
+
+        written, requests = crawl_shard(
+            client, Shard('qba73', 'nc', 100, 200, 120), path, page_size=30)
+
+        nums = [build['build_num'] for build in read_builds(path)]
+        assert nums == list(range(200, 100, -1))
+        assert written == 100
+        assert not os.path.exists(path + '.part')
+
+    @pytest.mark.parametrize('format', ['ndjson', 'columns'])
+    def test_writes_records_as_plain_json(self, server, tmpdir, format):
+        client = circleclient.CircleClient('token', endpoint=server.endpoint,
+                                           records=True)
+        path = str(tmpdir.join('shard' + FORMATS[format]))
+
+        crawl_shard(client, Shard('qba73', 'nc', 190, 200, 50), path,
+                    format=format, page_size=30)
+
+        builds = list(read_builds(path))
+        assert [build['build_num'] for build in builds] == \
+            list(range(200, 190, -1))
+        assert 'steps' in builds[0]
+
+
+class TestHistoryCrawler(object):
+
+    def test_crawls_all_projects(self, server, tmpdir):
+        finished = []
+        history = crawler(server, tmpdir)
+
+        result = history.crawl([('qba73', 'nc'), ('qba73', 'bs')],
+                               callback=lambda shard, n: finished.append(n))
+
+        assert result.shards == 6
+        assert result.builds == 500
+        assert result.failed == []
+        assert sum(finished) == 500
+        assert build_nums(history) == sorted(list(range(1, 251)) * 2)
+
+    def test_columnar_output(self, server, tmpdir):
+        history = crawler(server, tmpdir, format='columns')
+
+        history.crawl([('qba73', 'nc')])
+
+        with open(history.paths()[0]) as output:
+            block = json.loads(output.readline())
+        assert block['build_num'][:2] == [250, 249]
+        assert build_nums(history) == list(range(1, 251))
+
+    def test_resumes_from_checkpoint(self, server, tmpdir):
+        history = crawler(server, tmpdir)
+        history.crawl([('qba73', 'nc')])
+        shards, done = history.load_checkpoint()
+        lost = shards[1]
+        os.remove(history.shard_path(lost))
+        history.save_checkpoint(shards, done - set([lost]))
+
+        result = history.crawl([('qba73', 'nc')])
+
+        assert result.shards == 1
+        assert result.builds == 100
+        assert build_nums(history) == list(range(1, 251))
+
+    def test_unknown_format(self, tmpdir):
+        with pytest.raises(ValueError):
+            HistoryCrawler('token', str(tmpdir), format='csv')
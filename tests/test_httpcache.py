@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+from circleclient import circleclient
+from circleclient.httpcache import ResponseCache
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+
+
+class FakeResponse(object):
+
+    def __init__(self, content, headers=None):
+        self.content = content
+        self.headers = headers or {}
+
+
+@pytest.fixture()
+def client():
+    cache = ResponseCache(ttls={'/me': 60, '/projects': 0})
+    return circleclient.CircleClient(api_token='token', response_cache=cache)
+
+
+class TestResponseCache(object):
+
+    def test_ttl_per_endpoint(self):
+        cache = ResponseCache(default_ttl=5,
+                              ttls={'/me': 60, '/project/*/*/*/artifacts': 0})
+
+        assert cache.ttl('/me?circle-token=token') == 60
+        assert cache.ttl('/project/qba73/nc/3/artifacts?circle-token=t') == 0
+        assert cache.ttl('/project/qba73/nc/3?circle-token=t') == 5
+
+    def test_lru_eviction_bounded_by_bytes(self):
+        cache = ResponseCache(max_bytes=10)
+        cache.store('/a', FakeResponse(b'aaaa'))
+        cache.store('/b', FakeResponse(b'bbbb'))
+        cache.lookup('/a')
+        cache.store('/c', FakeResponse(b'cccc'))
+
+        assert cache.lookup('/b') is None
+        assert cache.lookup('/a') is not None
+        assert cache.evictions == 1
+        assert cache.size == 8
+
+    def test_no_store_is_respected(self):
+        cache = ResponseCache()
+        cache.store('/a', FakeResponse(b'{}', {'Cache-Control': 'no-store'}))
+
+        assert len(cache) == 0
+
+
+class TestCachedClient(object):
+
+    @pytest.mark.httpretty
+    def test_fresh_response_served_from_cache(self, client):
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/me',
+                               body='{"login": "qba73"}')
+
+        assert client.user.info() == {'login': 'qba73'}
+        assert client.user.info() == {'login': 'qba73'}
+
+        assert len(httpretty.latest_requests()) == 1
+        stats = client.response_cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+    @pytest.mark.httpretty
+    def test_stale_response_revalidated_with_etag(self, client):
+        responses = [
+            httpretty.Response(body='[{"reponame": "nc"}]',
+                               adding_headers={'ETag': '"v1"'}),
+            httpretty.Response(body='', status=304),
+        ]
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/projects',
+                               responses=responses)
+
+        assert client.projects.list_projects() == [{'reponame': 'nc'}]
+        assert client.projects.list_projects() == [{'reponame': 'nc'}]
+
+        request = httpretty.last_request()
+        assert request.headers['If-None-Match'] == '"v1"'
+        assert client.response_cache.revalidations == 1
+
+    @pytest.mark.httpretty
+    def test_posts_bypass_cache(self, client):
+        url = ENDPOINT + '/project/qba73/nc/54/retry'
+        httpretty.register_uri(httpretty.POST, url, body='{"build_num": 55}')
+
+        client.build.retry('qba73', 'nc', 54)
+        client.build.retry('qba73', 'nc', 54)
+
+        assert len(client.response_cache) == 0
+        assert client.response_cache.misses == 0
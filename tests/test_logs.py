@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+import json
+import re
+
+from circleclient import circleclient
+from circleclient.logs import (LogFetcher, action_logs, iter_json_array,
+                               iter_lines)
+from circleclient.transport import RecordingTransport, ReplayTransport
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+OUTPUT = "https://circle-production-action-output.s3.amazonaws.com"
+
+
+@pytest.fixture()
+def client():
+    return circleclient.CircleClient(api_token='token')
+
+
+def action(step, status, index=0):
+    return {'index': index, 'status': status, 'has_output': True,
+            'failed': True if status == 'failed' else None,
+            'output_url': '{0}/{1}-{2}'.format(OUTPUT, step, index)}
+
+
+BUILD = {'build_num': 7, 'steps': [
+    {'name': 'checkout', 'actions': [action('checkout', 'success')]},
+    {'name': 'test', 'actions': [action('test', 'success', 0),
+                                 action('test', 'failed', 1)]},
+    {'name': 'deploy', 'actions': [{'index': 0, 'has_output': False,
+                                    'status': 'not_run'}]},
+]}
+
+
+def serve_logs():
+    httpretty.register_uri(httpretty.GET, ENDPOINT + '/project/qba73/nc/7',
+                           body=json.dumps(BUILD))
+    outputs = {
+        'checkout-0': ['Cloning into nc\n'],
+        'test-0': ['test_a ok\ntest_b ', 'ok\n'],
+        'test-1': ['test_c ok\n', 'test_d FAILED\nAssertionError: 1 != 2\n'],
+    }
+    for name, messages in outputs.items():
+        httpretty.register_uri(
+            httpretty.GET, '{0}/{1}'.format(OUTPUT, name),
+            body=json.dumps([{'type': 'out', 'message': message}
+                             for message in messages]))
+
+
+class TestDecoding(object):
+
+    def test_iter_json_array_across_chunk_boundaries(self):
+        data = json.dumps([{'message': 'line\n' * 3, 'n': n}
+                           for n in range(20)] + [12345, 'tail']).encode()
+        for size in (1, 7, 4096):
+            chunks = [data[i:i + size] for i in range(0, len(data), size)]
+            assert list(iter_json_array(chunks)) == json.loads(data)
+
+    def test_iter_json_array_tricky_strings(self):
+        data = json.dumps([{'message': 'a\\b "c" ]} {[ \u001b[0m\r\n'},
+                           ['x]', {'y': '\\'}], '"', True, None, -1.5e3,
+                           {}]).encode()
+        for size in (1, 2, 3, 5):
+            chunks = [data[i:i + size] for i in range(0, len(data), size)]
+            assert list(iter_json_array(chunks)) == json.loads(data)
+
+    def test_iter_json_array_truncated(self):
+        with pytest.raises(ValueError):
+            list(iter_json_array([b'[{"message": "a"}, {"mess']))
+
+    def test_iter_json_array_empty_body(self):
+        assert list(iter_json_array([b''])) == []
+
+    def test_iter_lines_joins_split_lines(self):
+        messages = [{'message': 'a\nb'}, {'message': 'c\r\nd'}]
+        assert list(iter_lines(messages)) == ['a', 'bc', 'd']
+
+    def test_action_logs_failed_only(self):
+        logs = action_logs(('qba73', 'nc', 7), BUILD, failed=True)
+        assert [(log.step, log.index) for log in logs] == [('test', 1)]
+
+
+class TestLogFetcher(object):
+
+    @pytest.mark.httpretty
+    def test_search_all_actions(self, client):
+        serve_logs()
+
+        matches = list(client.build.search_logs([('qba73', 'nc', 7)],
+                                                r'test_(\w) ok'))
+
+        found = sorted((m.log.step, m.log.index, m.line_number,
+                        m.match.group(1)) for m in matches)
+        assert found == [('test', 0, 1, 'a'), ('test', 0, 2, 'b'),
+                         ('test', 1, 1, 'c')]
+
+    @pytest.mark.httpretty
+    def test_search_failed_actions(self, client):
+        serve_logs()
+        fetcher = LogFetcher(client, concurrency=2)
+
+        matches = list(fetcher.search([('qba73', 'nc', 7)], 'error',
+                                      failed=True, flags=re.IGNORECASE))
+
+        assert [(m.line_number, m.line) for m in matches] == [
+            (3, 'AssertionError: 1 != 2')]
+        assert fetcher.errors == []
+
+    @pytest.mark.httpretty
+    def test_search_stops_when_closed(self, client):
+        serve_logs()
+        fetcher = LogFetcher(client, concurrency=1, queue_size=1)
+
+        search = fetcher.search([('qba73', 'nc', 7)], 'ok')
+        first = next(search)
+        search.close()
+
+        assert first.line.endswith('ok')
+
+    @pytest.mark.httpretty
+    def test_search_through_replay_transport(self, tmpdir):
+        serve_logs()
+        recording = str(tmpdir.join('session.ndjson.gz'))
+        with circleclient.CircleClient(
+                'token', transport=RecordingTransport(recording)) as client:
+            fetcher = client.build.logs()
+            recorded = list(fetcher.search([('qba73', 'nc', 7)], 'FAILED'))
+        assert fetcher.errors == []
+        httpretty.disable()
+
+        client = circleclient.CircleClient(
+            'token', transport=ReplayTransport(recording))
+        events = []
+        client.add_hook(after=events.append)
+        fetcher = client.build.logs()
+        replayed = list(fetcher.search([('qba73', 'nc', 7)], 'FAILED'))
+
+        assert [m.line for m in replayed] == [m.line for m in recorded] == [
+            'test_d FAILED']
+        assert fetcher.errors == []
+        assert len(events) == 4
+
+    @pytest.mark.httpretty
+    def test_missing_log_recorded_as_error(self, client):
+        serve_logs()
+        httpretty.register_uri(httpretty.GET, OUTPUT + '/test-1', status=403)
+        fetcher = LogFetcher(client)
+
+        matches = list(fetcher.search([('qba73', 'nc', 7)], 'FAILED'))
+
+        assert matches == []
+        assert fetcher.errors[0][0].url == OUTPUT + '/test-1'
+        assert isinstance(fetcher.errors[0][1], circleclient.ClientError)
+
+    @pytest.mark.httpretty
+    def test_save(self, client, tmpdir):
+        serve_logs()
+        fetcher = client.build.logs()
+
+        paths = fetcher.save([('qba73', 'nc', 7)], str(tmpdir), failed=True)
+
+        assert len(paths) == 1
+        with open(paths[0]) as log:
+            assert log.read() == ('test_c ok\ntest_d FAILED\n'
+                                  'AssertionError: 1 != 2\n')
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+from circleclient import circleclient
+from circleclient.metrics import MetricsCollector, RequestEvent, route_template
+from circleclient.retry import RetryPolicy
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+
+
+@pytest.fixture()
+def client():
+    policy = RetryPolicy(sleep=lambda seconds: None)
+    return circleclient.CircleClient(api_token='token', retry_policy=policy)
+
+
+class TestRouteTemplate(object):
+
+    @pytest.mark.parametrize('url, route', [
+        ('/me?circle-token=secret', '/me'),
+        ('/recent-builds?circle-token=secret&limit=3', '/recent-builds'),
+        ('/project/qba73/nc?circle-token=secret',
+         '/project/{username}/{project}'),
+        ('/project/qba73/nc/32?circle-token=secret',
+         '/project/{username}/{project}/{build_num}'),
+        ('/project/qba73/nc/32/artifacts?circle-token=secret',
+         '/project/{username}/{project}/{build_num}/artifacts'),
+        ('/project/qba73/nc/tree/feature/x?circle-token=secret',
+         '/project/{username}/{project}/tree/{branch}'),
+        ('/project/qba73/nc/build-cache?circle-token=secret',
+         '/project/{username}/{project}/build-cache'),
+    ])
+    def test_route_template(self, url, route):
+        assert route_template(url) == route
+
+
+class TestHooks(object):
+
+    @pytest.mark.httpretty
+    def test_hooks_receive_request_details(self, client):
+        before = []
+        after = []
+        client.add_hook(before=lambda *args: before.append(args),
+                        after=after.append)
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc/32',
+            responses=[httpretty.Response(body='', status=503),
+                       httpretty.Response(body='{"build_num": 32}')])
+
+        client.build.status('qba73', 'nc', 32)
+
+        route = '/project/{username}/{project}/{build_num}'
+        assert before == [('GET', route)]
+        event = after[0]
+        assert (event.method, event.route, event.status) == ('GET', route, 200)
+        assert event.retries == 1
+        assert event.response_size == len('{"build_num": 32}')
+        assert event.latency >= 0
+        assert event.error is None
+
+    @pytest.mark.httpretty
+    def test_failed_request_reported(self, client):
+        events = []
+        client.add_hook(after=events.append)
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/me',
+                               body='', status=404)
+
+        with pytest.raises(circleclient.ClientError):
+            client.user.info()
+
+        assert events[0].status == 404
+        assert isinstance(events[0].error, circleclient.ClientError)
+
+    def test_remove_hook(self, client):
+        client.add_hook(after=print)
+        client.remove_hook(print)
+
+        assert client.after_hooks == []
+
+
+class TestMetricsCollector(object):
+
+    def events(self):
+        return [RequestEvent('GET', '/me', 200, 0.02, 100, 0, None),
+                RequestEvent('GET', '/me', 200, 0.2, 100, 2, None),
+                RequestEvent('GET', '/me', None, 3.0, 0, 3, Exception())]
+
+    def test_snapshot(self):
+        collector = MetricsCollector(buckets=(0.1, 1.0))
+        for event in self.events():
+            collector(event)
+
+        snapshot = collector.snapshot()
+
+        assert snapshot['requests'] == {('GET', '/me', '200'): 2,
+                                        ('GET', '/me', 'error'): 1}
+        assert snapshot['response_bytes'] == {('GET', '/me'): 200}
+        assert snapshot['retries'] == {('GET', '/me'): 5}
+        latency = snapshot['latency'][('GET', '/me')]
+        assert latency['buckets'] == {0.1: 1, 1.0: 2, float('inf'): 3}
+        assert latency['count'] == 3
+
+    def test_prometheus_text(self):
+        collector = MetricsCollector(buckets=(0.1, 1.0))
+        for event in self.events():
+            collector(event)
+
+        text = collector.to_prometheus()
+
+        assert ('circleclient_requests_total{method="GET",route="/me",'
+                'status="200"} 2') in text
+        assert ('circleclient_request_duration_seconds_bucket{method="GET",'
+                'route="/me",le="+Inf"} 3') in text
+        assert '# TYPE circleclient_request_duration_seconds histogram' in text
+        assert 'token' not in text
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+import json
+import re
+
+from circleclient import circleclient
+from circleclient.mirror import BuildMirror
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+
+
+@pytest.fixture()
+def client():
+    return circleclient.CircleClient(api_token='token')
+
+
+@pytest.fixture()
+def mirror(client, tmpdir):
+    return BuildMirror(client, str(tmpdir.join('mirror.db')), page_size=10)
+
+
+class FakeHistory(object):
+    """Serve project history by limit and offset, newest first."""
+
+    def __init__(self, count):
+        self.builds = [{'build_num': num, 'status': 'success',
+                        'lifecycle': 'finished'}
+                       for num in range(count, 0, -1)]
+
+    def add(self, status='success', lifecycle='finished'):
+        num = self.builds[0]['build_num'] + 1
+        self.builds.insert(0, {'build_num': num, 'status': status,
+                               'lifecycle': lifecycle})
+
+    def find(self, num):
+        return next(b for b in self.builds if b['build_num'] == num)
+
+    def listing(self, request, uri, headers):
+        limit = int(request.querystring['limit'][0])
+        offset = int(request.querystring['offset'][0])
+        return 200, headers, json.dumps(self.builds[offset:offset + limit])
+
+    def status(self, request, uri, headers):
+        num = int(request.path.split('?')[0].rsplit('/', 1)[1])
+        return 200, headers, json.dumps(self.find(num))
+
+    def register(self):
+        httpretty.register_uri(httpretty.GET,
+                               ENDPOINT + '/project/qba73/nc',
+                               body=self.listing)
+        httpretty.register_uri(
+            httpretty.GET,
+            re.compile(re.escape(ENDPOINT) + r'/project/qba73/nc/\d+'),
+            body=self.status)
+
+
+class TestBuildMirror(object):
+
+    @pytest.mark.httpretty
+    def test_initial_sync_fetches_full_history(self, mirror):
+        history = FakeHistory(25)
+        history.register()
+
+        result = mirror.sync_project('qba73', 'nc')
+
+        assert result.added == 25
+        assert result.requests == 3
+        assert len(mirror) == 25
+        assert mirror.highest('qba73', 'nc') == 25
+
+    @pytest.mark.httpretty
+    def test_up_to_date_sync_costs_one_page(self, mirror):
+        history = FakeHistory(25)
+        history.register()
+        mirror.sync_project('qba73', 'nc')
+
+        history.add()
+        history.add()
+        result = mirror.sync_project('qba73', 'nc')
+
+        assert result.added == 2
+        assert result.requests == 1
+        assert [b['build_num'] for b in mirror.builds('qba73', 'nc', 26)] == \
+            [27, 26]
+
+    @pytest.mark.httpretty
+    def test_interrupted_sync_backfilled_by_next_sync(self, mirror):
+        history = FakeHistory(25)
+        listing = history.listing
+        failures = []
+
+        def flaky_listing(request, uri, headers):
+            if request.querystring['offset'] != ['0'] and not failures:
+                failures.append(uri)
+                return 500, headers, ''
+            return listing(request, uri, headers)
+        history.listing = flaky_listing
+        history.register()
+        mirror.client.retry_policy.total = 0
+
+        with pytest.raises(circleclient.ServerError):
+            mirror.sync_project('qba73', 'nc')
+        assert len(mirror) == 10
+        assert mirror.synced('qba73', 'nc') == 0
+
+        history.add()
+        result = mirror.sync_project('qba73', 'nc')
+
+        assert result.added == 16
+        assert len(mirror) == 26
+        assert mirror.synced('qba73', 'nc') == 26
+
+    @pytest.mark.httpretty
+    def test_running_builds_on_latest_page_refreshed(self, mirror):
+        history = FakeHistory(4)
+        history.add(status='running', lifecycle='running')
+        history.register()
+        mirror.sync_project('qba73', 'nc')
+        assert mirror.unfinished('qba73', 'nc') == [5]
+
+        history.find(5).update(status='success', lifecycle='finished')
+        history.add()
+        result = mirror.sync_project('qba73', 'nc')
+
+        assert result.updated == 1
+        assert result.requests == 1
+        assert mirror.unfinished('qba73', 'nc') == []
+
+    @pytest.mark.httpretty
+    def test_running_builds_off_page_rechecked_with_status(self, mirror):
+        history = FakeHistory(4)
+        history.add(status='running', lifecycle='running')
+        for _ in range(10):
+            history.add()
+        history.register()
+        mirror.sync_project('qba73', 'nc')
+
+        history.find(5).update(status='failed', lifecycle='finished')
+        history.add()
+        result = mirror.sync_project('qba73', 'nc')
+
+        assert result.added == 1
+        assert result.updated == 1
+        assert result.requests == 2
+        assert mirror.unfinished('qba73', 'nc') == []
+        oldest = list(mirror.builds('qba73', 'nc', 5))[-1]
+        assert oldest == {'build_num': 5, 'status': 'failed',
+                          'lifecycle': 'finished'}
+
+    @pytest.mark.httpretty
+    def test_sync_many_projects(self, mirror):
+        FakeHistory(3).register()
+
+        results = mirror.sync([('qba73', 'nc')])
+
+        assert results[0].ok
+        assert results[0].value.added == 3
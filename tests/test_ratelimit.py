@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+
+from circleclient import circleclient
+from circleclient import ratelimit
+from circleclient.ratelimit import (FileTokenBucket, RateLimiter,
+                                    TokenBucket, classify)
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+
+
+@pytest.fixture()
+def frozen_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, 'time', lambda: now[0])
+    return now
+
+
+def drain(path, count):
+    bucket = FileTokenBucket(path, rate=1, capacity=10)
+    for _ in range(count):
+        bucket.reserve()
+
+
+class TestTokenBucket(object):
+
+    def test_burst_then_paced_reservations(self, frozen_time):
+        bucket = TokenBucket(rate=2, capacity=2)
+
+        delays = [bucket.reserve() for _ in range(5)]
+
+        assert delays == [0, 0, 0.5, 1.0, 1.5]
+
+    def test_refills_over_time(self, frozen_time):
+        bucket = TokenBucket(rate=2, capacity=2)
+        bucket.reserve(2)
+
+        frozen_time[0] += 0.5
+
+        assert bucket.reserve() == 0
+
+    def test_file_bucket_shared_between_instances(self, tmpdir, frozen_time):
+        path = str(tmpdir.join('token.bucket'))
+        first = FileTokenBucket(path, rate=1, capacity=2)
+        second = FileTokenBucket(path, rate=1, capacity=2)
+
+        assert first.reserve() == 0
+        assert second.reserve() == 0
+        assert first.reserve() == 1.0
+        assert second.reserve() == 2.0
+
+    def test_file_bucket_shared_between_processes(self, tmpdir):
+        path = str(tmpdir.join('token.bucket'))
+        workers = [multiprocessing.Process(target=drain, args=(path, 4))
+                   for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        bucket = FileTokenBucket(path, rate=1, capacity=10)
+        assert 1 < bucket.reserve(4) <= 2
+
+    def test_for_token_does_not_leak_token(self, tmpdir):
+        bucket = FileTokenBucket.for_token('secret', 1, directory=str(tmpdir))
+
+        assert 'secret' not in bucket.path
+
+
+class TestRateLimiter(object):
+
+    def test_classify(self):
+        assert classify('GET', '/project/qba73/nc?circle-token=t') == 'read'
+        assert classify('POST', '/project/qba73/nc/tree/master') == 'trigger'
+        assert classify('POST', '/project/qba73/nc/3/retry') == 'write'
+        assert classify('DELETE', '/project/qba73/nc/build-cache') == 'write'
+
+    def test_class_bucket_applies_on_top_of_default(self, frozen_time):
+        limiter = RateLimiter(default=TokenBucket(10),
+                              classes={'trigger': TokenBucket(1)})
+
+        limiter.reserve('POST', '/project/qba73/nc/tree/master')
+
+        assert limiter.reserve('GET', '/me') == 0
+        assert limiter.reserve('POST', '/project/qba73/nc/tree/dev') == 1.0
+
+    @pytest.mark.httpretty
+    def test_client_consults_limiter(self):
+        calls = []
+
+        class RecordingLimiter(RateLimiter):
+            def acquire(self, method, url):
+                calls.append((method, url))
+
+        client = circleclient.CircleClient(api_token='token',
+                                           rate_limiter=RecordingLimiter())
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/me', body='{}')
+
+        client.user.info()
+
+        assert calls == [('GET', '/me?circle-token=token')]
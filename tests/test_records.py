@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from circleclient import circleclient
+from circleclient.records import (ArtifactRecord, BuildRecord, ProjectRecord,
+                                  json_default)
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+
+BUILD = {'build_num': 32, 'username': 'qba73', 'reponame': 'nc',
+         'status': 'failed', 'lifecycle': 'finished',
+         'steps': [{'name': 'make test', 'actions': []}],
+         'user': {'login': 'qba73'}}
+
+
+@pytest.fixture()
+def client():
+    return circleclient.CircleClient(api_token='token', records=True)
+
+
+class TestRecords(object):
+
+    def test_record_has_no_instance_dict(self):
+        record = BuildRecord.from_dict(BUILD)
+
+        assert not hasattr(record, '__dict__')
+
+    def test_slotted_and_lazy_fields(self):
+        record = BuildRecord.from_dict(BUILD)
+
+        assert record.build_num == 32
+        assert record.status == 'failed'
+        assert record.steps == [{'name': 'make test', 'actions': []}]
+        assert record.user['login'] == 'qba73'
+
+    def test_dict_interface(self):
+        record = BuildRecord.from_dict(BUILD)
+
+        assert record['reponame'] == 'nc'
+        assert record.get('steps')[0]['name'] == 'make test'
+        assert record.get('missing', 'default') == 'default'
+        assert 'steps' in record
+        assert 'missing' not in record
+        with pytest.raises(KeyError):
+            record['missing']
+        with pytest.raises(AttributeError):
+            record.missing
+
+    def test_absent_fields_differ_from_none(self):
+        record = BuildRecord.from_dict({'build_num': 1, 'status': 'success',
+                                        'outcome': None})
+
+        assert 'outcome' in record
+        assert record.get('outcome', 'x') is None
+        assert 'lifecycle' not in record
+        assert record.get('lifecycle', 'x') == 'x'
+        assert record.lifecycle is None
+        with pytest.raises(KeyError):
+            record['lifecycle']
+
+    def test_round_trip(self):
+        record = BuildRecord.from_dict(BUILD)
+
+        assert record.to_dict() == BUILD
+        assert record == BUILD
+        assert record == BuildRecord.from_dict(BUILD)
+        assert record != dict(BUILD, outcome=None)
+
+    def test_json_serialization(self):
+        record = BuildRecord.from_dict(BUILD)
+
+        text = json.dumps([record], default=json_default)
+
+        assert json.loads(text) == [BUILD]
+        with pytest.raises(TypeError):
+            json.dumps(object(), default=json_default)
+
+    def test_statuses_are_interned(self):
+        first = BuildRecord.from_dict(json.loads(json.dumps(BUILD)))
+        second = BuildRecord.from_dict(json.loads(json.dumps(BUILD)))
+
+        assert first.status is second.status
+
+
+class TestRecordsClient(object):
+
+    @pytest.mark.httpretty
+    def test_status_returns_build_record(self, client):
+        httpretty.register_uri(httpretty.GET,
+                               ENDPOINT + '/project/qba73/nc/32',
+                               body=json.dumps(BUILD))
+
+        response = client.build.status('qba73', 'nc', 32)
+
+        assert isinstance(response, BuildRecord)
+        assert response.status == 'failed'
+
+    @pytest.mark.httpretty
+    def test_listings_return_records(self, client):
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/projects',
+                               body='[{"reponame": "nc", "branches": {}}]')
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc/32/artifacts',
+            body='[{"path": "a.txt", "url": "https://x/a.txt"}]')
+
+        projects = client.projects.list_projects()
+        artifacts = client.build.artifacts('qba73', 'nc', 32)
+
+        assert isinstance(projects[0], ProjectRecord)
+        assert projects[0].branches == {}
+        assert isinstance(artifacts[0], ArtifactRecord)
+        assert artifacts[0].path == 'a.txt'
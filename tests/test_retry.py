@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+from circleclient import circleclient
+from circleclient.retry import RetryPolicy, parse_retry_after
+import pytest
+import httpretty
+import requests
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+
+
+@pytest.fixture()
+def delays():
+    return []
+
+
+@pytest.fixture()
+def client(delays):
+    policy = RetryPolicy(total=3, jitter=False, sleep=delays.append)
+    return circleclient.CircleClient(api_token='token', retry_policy=policy)
+
+
+class TestRetryPolicy(object):
+
+    def test_exponential_backoff_is_capped(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+
+        assert [policy.backoff(n) for n in range(5)] == [1, 2, 4, 5, 5]
+
+    def test_jitter_stays_within_bound(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5)
+
+        assert all(0 <= policy.backoff(3) <= 5 for _ in range(100))
+
+    def test_posts_not_retried_by_default(self):
+        error = circleclient.ServerError(503, 'Service Unavailable')
+
+        assert RetryPolicy().is_retryable('GET', error, 0)
+        assert not RetryPolicy().is_retryable('POST', error, 0)
+        assert RetryPolicy(methods=('GET', 'POST')).is_retryable(
+            'POST', error, 0)
+
+    def test_long_retry_after_not_retried(self):
+        policy = RetryPolicy(max_backoff=30)
+        short = circleclient.RateLimitError(429, 'Too Many Requests', 20)
+        long = circleclient.RateLimitError(429, 'Too Many Requests', 3600)
+
+        assert policy.is_retryable('GET', short, 0)
+        assert not policy.is_retryable('GET', long, 0)
+        assert policy.backoff(0, long) == 30
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after('7') == 7
+        assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+        assert parse_retry_after('soon') is None
+
+
+class TestErrors(object):
+
+    def test_error_for_status(self):
+        assert isinstance(circleclient.error_for(429, 'Too Many Requests'),
+                          circleclient.RateLimitError)
+        assert isinstance(circleclient.error_for(404, 'Not Found'),
+                          circleclient.ClientError)
+        assert isinstance(circleclient.error_for(502, 'Bad Gateway'),
+                          circleclient.ServerError)
+
+    def test_errors_keep_message_format(self):
+        error = circleclient.error_for(404, 'Not Found')
+
+        assert str(error) == '404: Not Found.\nCircleCI Status NOT OK'
+        assert error.status_code == 404
+
+
+class TestRetryingClient(object):
+
+    @pytest.mark.httpretty
+    def test_transient_errors_retried(self, client, delays):
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/me',
+            responses=[httpretty.Response(body='', status=502),
+                       httpretty.Response(body='', status=503),
+                       httpretty.Response(body='{"login": "qba73"}')])
+
+        assert client.user.info() == {'login': 'qba73'}
+        assert delays == [0.5, 1.0]
+
+    @pytest.mark.httpretty
+    def test_retry_after_honored(self, client, delays):
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/me',
+            responses=[httpretty.Response(
+                           body='', status=429,
+                           adding_headers={'Retry-After': '12'}),
+                       httpretty.Response(body='{"login": "qba73"}')])
+
+        client.user.info()
+
+        assert delays == [12]
+
+    @pytest.mark.httpretty
+    def test_gives_up_with_typed_error(self, client, delays):
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/me',
+                               body='', status=429)
+
+        with pytest.raises(circleclient.RateLimitError) as error:
+            client.user.info()
+
+        assert error.value.status_code == 429
+        assert len(delays) == 3
+
+    @pytest.mark.httpretty
+    def test_retry_after_beyond_max_backoff_raises(self, client, delays):
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/me',
+            responses=[httpretty.Response(
+                body='', status=429, adding_headers={'Retry-After': '3600'}),
+                httpretty.Response(body='{"login": "qba73"}')])
+
+        with pytest.raises(circleclient.RateLimitError) as error:
+            client.user.info()
+
+        assert error.value.retry_after == 3600
+        assert delays == []
+
+    @pytest.mark.httpretty
+    def test_not_found_not_retried(self, client, delays):
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/project/qba73/nc/1',
+                               body='', status=404)
+
+        with pytest.raises(circleclient.ClientError):
+            client.build.status('qba73', 'nc', 1)
+
+        assert delays == []
+
+    @pytest.mark.httpretty
+    def test_post_not_retried_by_default(self, client, delays):
+        httpretty.register_uri(
+            httpretty.POST, ENDPOINT + '/project/qba73/nc/54/retry',
+            body='', status=503)
+
+        with pytest.raises(circleclient.ServerError):
+            client.build.retry('qba73', 'nc', 54)
+
+        assert delays == []
+
+    def test_connection_errors_wrapped(self, client, delays, monkeypatch):
+        def refuse(*args, **kwargs):
+            raise requests.ConnectionError('connection reset')
+        monkeypatch.setattr(client.session, 'request', refuse)
+
+        with pytest.raises(circleclient.TransportError):
+            client.user.info()
+
+        assert len(delays) == 3
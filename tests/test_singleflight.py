@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+
+from circleclient.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def run_concurrently(flight, func, callers):
+    results = []
+    release = threading.Event()
+
+    def leader():
+        release.wait()
+        return func()
+
+    def call():
+        try:
+            results.append(flight.do('key', leader))
+        except Exception as error:
+            results.append(error)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    while len(flight) == 0 or flight.coalesced < callers - 1:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSingleFlight(object):
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+
+        results = run_concurrently(
+            flight, lambda: calls.append(1) or 'done', 5)
+
+        assert results == ['done'] * 5
+        assert len(calls) == 1
+        assert flight.coalesced == 4
+        assert len(flight) == 0
+
+    def test_exception_shared(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError('boom')
+
+        results = run_concurrently(flight, fail, 3)
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_sequential_calls_not_coalesced(self):
+        flight = SingleFlight()
+
+        assert flight.do('key', lambda: 1) == 1
+        assert flight.do('key', lambda: 2) == 2
+        assert flight.coalesced == 0
+
+
+class TestAsyncSingleFlight(object):
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'done'
+
+        async def main():
+            return await asyncio.gather(
+                *[flight.do('key', fetch) for _ in range(5)])
+
+        assert asyncio.run(main()) == ['done'] * 5
+        assert len(calls) == 1
+        assert flight.coalesced == 4
+        assert len(flight) == 0
+
+    def test_exception_shared(self):
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError('boom')
+
+        async def main():
+            return await asyncio.gather(
+                *[flight.do('key', fail) for _ in range(3)],
+                return_exceptions=True)
+
+        results = asyncio.run(main())
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.coalesced == 2
+
+    def test_cancelling_first_caller_does_not_cancel_others(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        async def main():
+            leader = asyncio.ensure_future(flight.do('key', fetch))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do('key', fetch))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return leader, await follower
+
+        leader, result = asyncio.run(main())
+
+        assert leader.cancelled()
+        assert result == 'done'
+        assert len(calls) == 1
+        assert len(flight) == 0
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from circleclient import circleclient
+from circleclient.store import BuildStore
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+
+
+@pytest.fixture()
+def store(tmpdir):
+    return BuildStore(str(tmpdir.join('builds.db')))
+
+
+@pytest.fixture()
+def client(store):
+    return circleclient.CircleClient(api_token='token', build_store=store)
+
+
+class TestBuildStore(object):
+
+    def test_put_and_get(self, store):
+        store.put('qba73', 'nc', 12, {'status': 'success'})
+
+        assert store.get('qba73', 'nc', 12) == {'status': 'success'}
+        assert store.get('qba73', 'nc', 12, 'artifacts') is None
+        assert store.hits == 1
+        assert store.misses == 1
+
+    def test_persists_across_instances(self, tmpdir):
+        path = str(tmpdir.join('builds.db'))
+        with BuildStore(path) as store:
+            store.put('qba73', 'nc', 12, {'status': 'success'})
+
+        with BuildStore(path) as store:
+            assert store.get('qba73', 'nc', 12) == {'status': 'success'}
+
+    def test_compact_keeps_most_recently_used(self, store):
+        store.max_entries = 2
+        for build_num in range(3):
+            store.put('qba73', 'nc', build_num, {'build_num': build_num})
+        store.get('qba73', 'nc', 0)
+
+        assert store.compact() == 1
+        assert len(store) == 2
+        assert not store.contains('qba73', 'nc', 1)
+
+    def test_prune_by_size(self, store):
+        store.max_bytes = 1
+        store.put('qba73', 'nc', 1, {'build_num': 1})
+
+        store.prune()
+
+        assert len(store) == 0
+
+
+class TestStoredBuilds(object):
+
+    @pytest.mark.httpretty
+    def test_finished_build_served_from_store(self, client):
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc/32',
+            body=json.dumps({'build_num': 32, 'lifecycle': 'finished',
+                             'status': 'success'}))
+
+        first = client.build.status('qba73', 'nc', 32)
+        second = client.build.status('qba73', 'nc', 32)
+
+        assert first == second
+        assert len(httpretty.latest_requests()) == 1
+
+    @pytest.mark.httpretty
+    def test_running_build_always_fetched(self, client):
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc/33',
+            body=json.dumps({'build_num': 33, 'lifecycle': 'running',
+                             'status': 'running'}))
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc/33/artifacts',
+            body='[]')
+
+        client.build.status('qba73', 'nc', 33)
+        client.build.status('qba73', 'nc', 33)
+        client.build.artifacts('qba73', 'nc', 33)
+
+        assert len(httpretty.latest_requests()) == 3
+        assert len(client.build_store) == 0
+
+    @pytest.mark.httpretty
+    def test_artifacts_of_finished_build_stored(self, client):
+        client.build_store.put('qba73', 'nc', 34, {'status': 'failed'})
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc/34/artifacts',
+            body='[{"path": "report.xml"}]')
+
+        client.build.artifacts('qba73', 'nc', 34)
+        artifacts = client.build.artifacts('qba73', 'nc', 34)
+
+        assert artifacts == [{'path': 'report.xml'}]
+        assert len(httpretty.latest_requests()) == 1
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+import json
+import re
+
+from circleclient import circleclient, testresults
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+
+
+@pytest.fixture()
+def client():
+    return circleclient.CircleClient(api_token='token')
+
+
+@pytest.fixture()
+def results(client, tmpdir):
+    return testresults.TestResults(client, str(tmpdir.join('tests.db')),
+                                   page_size=10)
+
+
+class FakeProject(object):
+    """Serve builds newest first and the tests of each build."""
+
+    def __init__(self):
+        self.builds = []
+        self.fetched = []
+
+    def add(self, running=False):
+        num = len(self.builds) + 1
+        self.builds.insert(0, {'build_num': num,
+                               'lifecycle': ('running' if running
+                                             else 'finished'),
+                               'status': 'running' if running else 'success'})
+        return num
+
+    def finish(self, num):
+        build = next(b for b in self.builds if b['build_num'] == num)
+        build.update(lifecycle='finished', status='success')
+
+    def listing(self, request, uri, headers):
+        limit = int(request.querystring['limit'][0])
+        offset = int(request.querystring['offset'][0])
+        return 200, headers, json.dumps(self.builds[offset:offset + limit])
+
+    def tests(self, request, uri, headers):
+        num = int(request.path.split('?')[0].split('/')[-2])
+        self.fetched.append(num)
+        flaky = 'success' if num % 2 else 'failure'
+        return 200, headers, json.dumps({'tests': [
+            {'classname': 'suite', 'name': 'stable', 'result': 'success',
+             'run_time': 1.0},
+            {'classname': 'suite', 'name': 'flaky', 'result': flaky,
+             'run_time': float(num)},
+            {'file': 'skip.py', 'name': 'skipped', 'result': 'skipped',
+             'run_time': 0.0},
+        ]})
+
+    def register(self):
+        httpretty.register_uri(httpretty.GET, ENDPOINT + '/project/qba73/nc',
+                               body=self.listing)
+        httpretty.register_uri(
+            httpretty.GET,
+            re.compile(re.escape(ENDPOINT) + r'/project/qba73/nc/\d+/tests'),
+            body=self.tests)
+
+
+class TestBuildTests(object):
+
+    @pytest.mark.httpretty
+    def test_tests(self, client):
+        project = FakeProject()
+        project.register()
+
+        tests = client.build.tests('qba73', 'nc', 3)
+
+        assert [test['name'] for test in tests] == ['stable', 'flaky',
+                                                    'skipped']
+
+
+class TestTestResults(object):
+
+    @pytest.mark.httpretty
+    def test_refresh_aggregates_finished_builds(self, results):
+        project = FakeProject()
+        for _ in range(12):
+            project.add()
+        project.add(running=True)
+        project.register()
+
+        result = results.refresh('qba73', 'nc')
+
+        assert result.added == 12
+        assert result.pending == 1
+        assert result.errors == []
+        assert sorted(project.fetched) == list(range(1, 13))
+        assert results.builds('qba73', 'nc', aggregated=False) == [13]
+
+    @pytest.mark.httpretty
+    def test_refresh_fetches_only_new_completed_builds(self, results):
+        project = FakeProject()
+        for _ in range(12):
+            project.add()
+        running = project.add(running=True)
+        project.register()
+        results.refresh('qba73', 'nc')
+        del project.fetched[:]
+
+        project.finish(running)
+        project.add()
+        result = results.refresh('qba73', 'nc')
+
+        assert sorted(project.fetched) == [13, 14]
+        assert result.added == 2
+        assert result.pending == 0
+        assert result.requests == 3
+
+    @pytest.mark.httpretty
+    def test_stats(self, results):
+        project = FakeProject()
+        for _ in range(10):
+            project.add()
+        project.register()
+        results.refresh('qba73', 'nc')
+
+        stats = dict((s.name, s) for s in results.stats('qba73', 'nc'))
+
+        assert stats['suite::stable'].passed == 10
+        assert stats['suite::stable'].flip_rate == 0.0
+        assert stats['suite::flaky'].passed == 5
+        assert stats['suite::flaky'].failed == 5
+        assert stats['suite::flaky'].flip_rate == 1.0
+        assert stats['suite::flaky'].p50 == pytest.approx(5.5)
+        assert stats['skip.py::skipped'].skipped == 10
+        assert stats['skip.py::skipped'].runs == 10
+
+        last = dict((s.name, s) for s in results.stats('qba73', 'nc', last=4))
+        assert last['suite::flaky'].runs == 4
+        assert last['suite::flaky'].p95 == pytest.approx(9.85)
+
+    @pytest.mark.httpretty
+    def test_flaky(self, client, tmpdir):
+        project = FakeProject()
+        for _ in range(6):
+            project.add()
+        project.register()
+        results = client.build.test_results(str(tmpdir.join('tests.db')))
+        results.refresh('qba73', 'nc')
+
+        flaky = results.flaky('qba73', 'nc')
+
+        assert [stats.name for stats in flaky] == ['suite::flaky']
+
+    def test_summarize_ignores_skipped_runs_for_flips(self):
+        rows = [(1, testresults.PASSED, 1.0), (2, testresults.SKIPPED, None),
+                (3, testresults.PASSED, 2.0), (4, testresults.FAILED, 3.0)]
+
+        stats = testresults.summarize('t', rows)
+
+        assert stats.runs == 4
+        assert stats.flip_rate == pytest.approx(0.5)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import gzip
+import json
+
+from circleclient import circleclient
+from circleclient.transport import (RecordingTransport, ReplayTransport,
+                                    read_recording, replay_traffic, scrub_url)
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+TOKEN = 's3cr3t-t0ken'
+ARTIFACT = "https://circle-artifacts.com/0/tmp/circle-artifacts/a.bin"
+
+
+@pytest.fixture()
+def recording(tmpdir):
+    return str(tmpdir.join('session.ndjson.gz'))
+
+
+def record_session(path):
+    statuses = iter(['running', 'success'])
+
+    def status(request, uri, headers):
+        return 200, headers, json.dumps({'build_num': 7,
+                                         'status': next(statuses),
+                                         'user': {'token': TOKEN}})
+
+    httpretty.register_uri(httpretty.GET, ENDPOINT + '/project/qba73/nc/7',
+                           body=status)
+    httpretty.register_uri(httpretty.GET, ENDPOINT + '/project/qba73/nc',
+                           body='[{"build_num": 7}]',
+                           adding_headers={'ETag': '"abc"'})
+    transport = RecordingTransport(path, secrets=[TOKEN])
+    with circleclient.CircleClient(TOKEN, transport=transport) as client:
+        client.build.status('qba73', 'nc', 7)
+        client.build.status('qba73', 'nc', 7)
+        client.build.recent('qba73', 'nc', limit=1)
+    return transport
+
+
+class TestRecordingTransport(object):
+
+    def test_scrub_url_drops_host_and_token(self):
+        url = ENDPOINT + '/project/qba73/nc?circle-token=abc&limit=1'
+        assert scrub_url(url) == '/api/v1.1/project/qba73/nc?limit=1'
+
+    @pytest.mark.httpretty
+    def test_records_scrubbed_exchanges(self, recording):
+        transport = record_session(recording)
+
+        with gzip.open(recording, 'rt') as raw:
+            text = raw.read()
+        records = list(read_recording(recording))
+
+        assert transport.recorded == 3
+        assert TOKEN not in text
+        assert [record['u'] for record in records] == [
+            '/api/v1.1/project/qba73/nc/7', '/api/v1.1/project/qba73/nc/7',
+            '/api/v1.1/project/qba73/nc?limit=1&offset=0&filter=']
+        assert records[2]['h']['ETag'] == '"abc"'
+
+    @pytest.mark.httpretty
+    def test_streamed_body_spooled_and_scrubbed(self, recording):
+        body = bytes(range(256)) + TOKEN.encode('utf-8') + b'\xff\xfe'
+        httpretty.register_uri(httpretty.GET, ARTIFACT, body=body)
+        transport = RecordingTransport(recording, secrets=[TOKEN])
+        with circleclient.CircleClient(TOKEN, transport=transport) as client:
+            with client.stream(ARTIFACT) as response:
+                assert b''.join(response.iter_content(7)) == body
+
+        with gzip.open(recording, 'rt') as raw:
+            text = raw.read()
+        record, = read_recording(recording)
+
+        assert 'b' not in record
+        assert TOKEN not in text
+        assert base64.b64decode(record['b64']) == \
+            body.replace(TOKEN.encode('utf-8'), b'<scrubbed>')
+
+
+class TestReplayTransport(object):
+
+    @pytest.mark.httpretty
+    def test_replays_responses_in_order(self, recording):
+        record_session(recording)
+        httpretty.disable()
+        transport = ReplayTransport(recording)
+        client = circleclient.CircleClient('other', transport=transport,
+                                           coalesce=False)
+
+        first = client.build.status('qba73', 'nc', 7)
+        second = client.build.status('qba73', 'nc', 7)
+        third = client.build.status('qba73', 'nc', 7)
+
+        assert [first['status'], second['status'], third['status']] == [
+            'running', 'success', 'success']
+        assert second['user']['token'] == '<scrubbed>'
+        assert len(transport) == 3
+        assert transport.served == 3
+
+    @pytest.mark.httpretty
+    def test_unrecorded_request_is_not_found(self, recording):
+        record_session(recording)
+        httpretty.disable()
+        transport = ReplayTransport(recording)
+        client = circleclient.CircleClient('token', transport=transport)
+
+        with pytest.raises(circleclient.ClientError) as error:
+            client.build.status('qba73', 'nc', 8)
+        assert error.value.status_code == 404
+        assert transport.misses == 1
+
+    @pytest.mark.httpretty
+    def test_speed_scales_latency(self, recording):
+        record_session(recording)
+        httpretty.disable()
+        delays = []
+        transport = ReplayTransport(recording, speed=2, concurrency=2,
+                                    sleep=delays.append)
+        recorded = [record['d'] for record in read_recording(recording)]
+        client = circleclient.CircleClient('token', transport=transport)
+
+        client.build.recent('qba73', 'nc', limit=1)
+
+        assert delays == [recorded[2] / 2]
+
+    @pytest.mark.httpretty
+    def test_replay_traffic(self, recording):
+        record_session(recording)
+        httpretty.disable()
+        client = circleclient.CircleClient(
+            'token', transport=ReplayTransport(recording))
+
+        summary = replay_traffic(client, recording, concurrency=2)
+
+        assert summary['requests'] == 3
+        assert summary['errors'] == 0
+        assert client.transport.misses == 0
+
+    @pytest.mark.httpretty
+    def test_binary_bodies_round_trip(self, recording):
+        body = bytes(range(256)) * 3
+        httpretty.register_uri(httpretty.GET, ARTIFACT, body=body)
+        httpretty.register_uri(httpretty.GET, ARTIFACT + '?raw=1', body=body)
+        transport = RecordingTransport(recording)
+        with circleclient.CircleClient('token', transport=transport) as client:
+            with client.stream(ARTIFACT) as response:
+                b''.join(response.iter_content(100))
+            transport.send('GET', ARTIFACT + '?raw=1')
+        httpretty.disable()
+
+        replay = ReplayTransport(recording)
+        client = circleclient.CircleClient('token', transport=replay)
+        with client.stream(ARTIFACT) as response:
+            streamed = b''.join(response.iter_content(100))
+
+        assert streamed == body
+        assert replay.send('GET', ARTIFACT + '?raw=1').content == body
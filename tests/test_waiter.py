@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from circleclient import circleclient
+from circleclient.waiter import BuildWaiter, WaitTimeout
+import pytest
+import httpretty
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+
+
+@pytest.fixture()
+def client():
+    return circleclient.CircleClient(api_token='token')
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000000.0
+        self.pauses = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.pauses.append(seconds)
+        self.now += seconds
+
+
+def recent_pages(pages):
+    """Serve successive pages of Build.recent, repeating the last one."""
+    def callback(request, uri, headers):
+        page = pages.pop(0) if len(pages) > 1 else pages[0]
+        return 200, headers, json.dumps(page)
+    return callback
+
+
+def build(num, status, lifecycle=None):
+    if lifecycle is None:
+        lifecycle = 'running' if status == 'running' else 'finished'
+    return {'build_num': num, 'status': status, 'lifecycle': lifecycle}
+
+
+@pytest.fixture()
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture()
+def waiter(client, clock):
+    return BuildWaiter(client, sleep=clock.sleep, clock=clock)
+
+
+class TestBuildWaiter(object):
+
+    @pytest.mark.httpretty
+    def test_builds_of_one_project_share_a_poll(self, waiter, clock):
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc',
+            body=recent_pages([
+                [build(3, 'running'), build(2, 'running')],
+                [build(3, 'running'), build(2, 'success')],
+                [build(3, 'failed'), build(2, 'success')],
+            ]))
+
+        keys = [('qba73', 'nc', 2), ('qba73', 'nc', 3)]
+        builds = waiter.wait_all(keys)
+
+        assert builds[('qba73', 'nc', 2)]['status'] == 'success'
+        assert builds[('qba73', 'nc', 3)]['status'] == 'failed'
+        assert len(httpretty.latest_requests()) == 3
+        assert len(clock.pauses) == 2
+
+    @pytest.mark.httpretty
+    def test_builds_missing_from_page_use_status(self, waiter):
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc',
+            body=json.dumps([build(40, 'success')]))
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc/7',
+            body=json.dumps(build(7, 'canceled')))
+
+        key, summary = waiter.wait_any([('qba73', 'nc', 7)])
+
+        assert key == ('qba73', 'nc', 7)
+        assert summary['status'] == 'canceled'
+
+    @pytest.mark.httpretty
+    def test_transitions_reported_to_callback(self, client, clock):
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc',
+            body=recent_pages([
+                [build(5, 'queued', 'queued')],
+                [build(5, 'running')],
+                [build(5, 'running')],
+                [build(5, 'success')],
+            ]))
+
+        transitions = []
+        result = client.build.wait_for('qba73', 'nc', 5,
+                                       callback=transitions.append,
+                                       sleep=clock.sleep, clock=clock)
+
+        assert result['status'] == 'success'
+        assert [(t.old, t.new) for t in transitions] == [
+            (None, 'queued'), ('queued', 'running'), ('running', 'success')]
+
+    @pytest.mark.httpretty
+    def test_timeout(self, waiter):
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc',
+            body=json.dumps([build(5, 'running')]))
+
+        with pytest.raises(WaitTimeout) as error:
+            waiter.wait_all([('qba73', 'nc', 5)], timeout=30)
+        assert error.value.pending == [('qba73', 'nc', 5)]
+
+    def test_interval_adapts_to_typical_duration(self, waiter, clock):
+        key = ('qba73', 'nc', 5)
+        waiter.durations[('qba73', 'nc')] = 600.0
+
+        early = waiter.interval(key, {}, waited=0)
+        near_end = waiter.interval(key, {}, waited=598)
+        overdue = waiter.interval(key, {}, waited=900)
+
+        assert early == waiter.max_interval
+        assert near_end == waiter.min_interval
+        assert waiter.min_interval < overdue < waiter.max_interval
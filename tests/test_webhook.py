@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+from circleclient import circleclient
+from circleclient.waiter import BuildWaiter
+from circleclient.webhook import BuildStates, WebhookReceiver, notified_build
+import pytest
+import httpretty
+import requests
+
+
+ENDPOINT = "https://circleci.com/api/v1.1"
+
+
+def notification(num, status='success'):
+    return {'payload': {'username': 'qba73', 'reponame': 'nc',
+                        'build_num': num, 'status': status,
+                        'lifecycle': 'finished'}}
+
+
+def job_completed(num, status='success'):
+    return {'type': 'job-completed', 'project': {'slug': 'gh/qba73/nc'},
+            'job': {'number': num, 'status': status}}
+
+
+def sign(secret, body):
+    return 'v1=' + hmac.new(secret.encode('utf-8'), body,
+                            hashlib.sha256).hexdigest()
+
+
+@pytest.fixture()
+def receiver():
+    receiver = WebhookReceiver(secret='s3cret').start()
+    yield receiver
+    receiver.stop()
+
+
+class TestNotifiedBuild(object):
+
+    def test_payload_body(self):
+        assert notified_build(notification(7))['build_num'] == 7
+
+    def test_job_completed_event(self):
+        build = notified_build({'type': 'job-completed',
+                                'project': {'slug': 'gh/qba73/nc'},
+                                'job': {'number': 9, 'status': 'failed'}})
+        assert build == {'username': 'qba73', 'reponame': 'nc',
+                         'build_num': 9, 'status': 'failed',
+                         'lifecycle': 'finished'}
+
+    def test_unknown_body(self):
+        assert notified_build({'payload': {'status': 'success'}}) is None
+        assert notified_build([]) is None
+
+
+class TestWebhookReceiver(object):
+
+    def test_signed_notification_stored(self, receiver):
+        body = json.dumps(notification(7)).encode('utf-8')
+        response = requests.post(receiver.url, data=body, headers={
+            'Circleci-Signature': sign('s3cret', body)})
+
+        assert response.status_code == 204
+        assert receiver.states.get('qba73', 'nc', 7)['status'] == 'success'
+
+    def test_bad_signature_rejected(self, receiver):
+        body = json.dumps(notification(7)).encode('utf-8')
+        response = requests.post(receiver.url, data=body, headers={
+            'Circleci-Signature': sign('wrong', body)})
+
+        assert response.status_code == 401
+        assert len(receiver.states) == 0
+        assert receiver.rejected == 1
+
+    def test_malformed_body_rejected(self, receiver):
+        body = b'not json'
+        response = requests.post(receiver.url, data=body, headers={
+            'Circleci-Signature': sign('s3cret', body)})
+
+        assert response.status_code == 400
+
+
+class TestBuildStates(object):
+
+    def test_evicts_oldest(self):
+        states = BuildStates(max_entries=2)
+        for num in (1, 2, 3):
+            states.put(notification(num)['payload'])
+
+        assert states.get('qba73', 'nc', 1) is None
+        assert len(states) == 2
+        assert states.notifications == 3
+
+    def test_wait_ignores_unfinished(self):
+        states = BuildStates()
+        states.put({'username': 'qba73', 'reponame': 'nc', 'build_num': 1,
+                    'status': 'running', 'lifecycle': 'running'})
+
+        assert states.wait([('qba73', 'nc', 1)], timeout=0.01) is False
+
+    @pytest.mark.httpretty
+    def test_status_served_from_notification(self):
+        states = BuildStates()
+        states.put(notification(7)['payload'])
+        client = circleclient.CircleClient('token', build_states=states)
+
+        assert client.build.status('qba73', 'nc', 7)['status'] == 'success'
+        assert len(httpretty.latest_requests()) == 0
+
+    @pytest.mark.httpretty
+    def test_status_not_served_from_stub(self):
+        states = BuildStates()
+        states.put(notified_build(job_completed(7)), full=False)
+        client = circleclient.CircleClient('token', build_states=states)
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc/7',
+            body=json.dumps({'build_num': 7, 'status': 'success',
+                             'lifecycle': 'finished', 'steps': []}))
+
+        build = client.build.status('qba73', 'nc', 7)
+
+        assert build['steps'] == []
+        assert len(httpretty.latest_requests()) == 1
+
+    def test_receiver_marks_job_events_as_stubs(self):
+        receiver = WebhookReceiver()
+        body = json.dumps(job_completed(9)).encode('utf-8')
+
+        assert receiver.receive(body, {}) == 204
+        assert receiver.states.get('qba73', 'nc', 9) is None
+        assert receiver.states.wait([('qba73', 'nc', 9)], timeout=0)
+        receiver.server_close()
+
+    @pytest.mark.httpretty
+    def test_waiter_refreshes_build_on_stub_notification(self):
+        states = BuildStates()
+        client = circleclient.CircleClient('token', build_states=states)
+        running = {'build_num': 7, 'status': 'running', 'lifecycle': 'running'}
+        finished = {'build_num': 7, 'status': 'failed',
+                    'lifecycle': 'finished', 'steps': []}
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc',
+            responses=[httpretty.Response(body=json.dumps([running])),
+                       httpretty.Response(body=json.dumps([finished]))])
+        waiter = BuildWaiter(client, fallback_interval=30)
+        timer = threading.Timer(0.05, states.put,
+                                [notified_build(job_completed(7, 'failed')),
+                                 False])
+
+        start = time.time()
+        timer.start()
+        builds = waiter.wait_all([('qba73', 'nc', 7)], timeout=10)
+
+        assert builds[('qba73', 'nc', 7)] == finished
+        assert time.time() - start < 5
+        assert len(httpretty.latest_requests()) == 2
+
+    def test_wait_ignores_seen_notifications(self):
+        states = BuildStates()
+        states.put(notified_build(job_completed(7)), full=False)
+
+        assert not states.wait([('qba73', 'nc', 7)], timeout=0.01,
+                               since=states.notifications)
+
+    @pytest.mark.httpretty
+    def test_waiter_wakes_on_notification(self):
+        states = BuildStates()
+        client = circleclient.CircleClient('token', build_states=states)
+        httpretty.register_uri(
+            httpretty.GET, ENDPOINT + '/project/qba73/nc',
+            body=json.dumps([{'build_num': 7, 'status': 'running',
+                              'lifecycle': 'running'}]))
+        waiter = BuildWaiter(client, fallback_interval=30)
+        timer = threading.Timer(0.05, states.put, [notification(7)['payload']])
+
+        start = time.time()
+        timer.start()
+        builds = waiter.wait_all([('qba73', 'nc', 7)], timeout=10)
+
+        assert builds[('qba73', 'nc', 7)]['status'] == 'success'
+        assert time.time() - start < 5
+        assert len(httpretty.latest_requests()) == 1